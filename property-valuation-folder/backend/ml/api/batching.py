@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collects single-row inference requests from the event loop and scores
+    them together. A batch closes after max_wait_ms or max_batch_size rows,
+    whichever comes first, and runs on a dedicated executor thread so the
+    event loop never blocks on model.predict. Pass a shared executor to
+    run several batchers' inference on a common thread pool.
+    """
+
+    def __init__(self, predict_batch: Callable[[List[Any]], Sequence[float]],
+                 max_batch_size: int = 64, max_wait_ms: float = 2.0, name: str = "model",
+                 executor: Optional[Executor] = None):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.name = name
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-inference")
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+        self.failed_batches = 0
+        self._recent_batch_sizes = deque(maxlen=1000)
+        self._recent_queue_waits = deque(maxlen=1000)
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        return self._queue
+
+    async def submit(self, item: Any) -> float:
+        queue = self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        queue.put_nowait((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> List[tuple]:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _predict_isolated(self, items: List[Any]) -> List[Any]:
+        try:
+            return list(np.asarray(self.predict_batch(items), dtype=float))
+        except Exception as e:
+            if len(items) == 1:
+                return [e]
+            self.failed_batches += 1
+            logger.warning(f"{self.name} batch of {len(items)} failed, scoring rows individually: {str(e)}")
+
+        results = []
+        for item in items:
+            try:
+                results.append(float(np.asarray(self.predict_batch([item]), dtype=float)[0]))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                self._recent_queue_waits.append(started - enqueued)
+
+            items = [item for item, _, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self._predict_isolated, items)
+            except Exception as e:
+                results = [e] * len(batch)
+
+            self.batches += 1
+            self.rows += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self._recent_batch_sizes.append(len(batch))
+
+            for (_, future, _), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        waits_ms = np.array(self._recent_queue_waits) * 1000 if self._recent_queue_waits else np.zeros(1)
+        sizes = np.array(self._recent_batch_sizes) if self._recent_batch_sizes else np.zeros(1)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "rows": self.rows,
+            "largest_batch": self.largest_batch,
+            "failed_batches": self.failed_batches,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "recent_mean_batch_size": round(float(sizes.mean()), 2),
+            "recent_queue_wait_ms": {
+                "p50": round(float(np.percentile(waits_ms, 50)), 3),
+                "p99": round(float(np.percentile(waits_ms, 99)), 3),
+                "max": round(float(waits_ms.max()), 3)
+            }
+        }
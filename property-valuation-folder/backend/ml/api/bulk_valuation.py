@@ -0,0 +1,352 @@
+"""
+Offline bulk valuation for large transaction files.
+
+Streams the input in fixed-size chunks, scores chunks in a process pool
+with the same model loading and feature code as the HDB and private
+APIs, and appends predictions to the output as each chunk finishes:
+
+    python -m api.bulk_valuation hdb hdb_resale_data_onemap_enriched.csv valuations.csv
+    python -m api.bulk_valuation private portfolio.csv valuations --format parquet --workers 8
+
+Side files the HDB model reads (feature store, location index) are built
+once in the parent process; the workers only load the model and open
+those files read-only. A checkpoint file next to the output records how
+many chunks have been written and with which model version; rerunning
+with --resume continues from there if the model has not changed.
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("bulk_valuation")
+
+# module, side-file preparation run once in the parent, worker loader, warm-up
+SERVICES = {
+    "hdb": ("api.simple_api", "prepare_hdb_side_files", "load_hdb_scoring_service", "warm_up_hdb_model"),
+    "private": ("api.private_only_api", None, "load_private_model", "warm_up_private_model")
+}
+
+HDB_COLUMN_MAP = {
+    "town": "precinct",
+    "floor_area_sqm": "area_sqm",
+    "nearest_mrt_distance_km": "distance_to_mrt",
+    "region": "sector"
+}
+
+_service = None
+
+
+def prepare_side_files(service: str, fallback_dir: str) -> Dict[str, Optional[str]]:
+    module_name, prepare_name, _, _ = SERVICES[service]
+    if prepare_name is None:
+        return {}
+    return getattr(importlib.import_module(module_name), prepare_name)(fallback_dir)
+
+
+def _init_worker(service: str, side_files: Optional[Dict[str, Optional[str]]] = None) -> None:
+    global _service
+    module_name, _, load_name, warm_up_name = SERVICES[service]
+    _service = importlib.import_module(module_name)
+    _service.startup_state.run(partial(getattr(_service, load_name), **(side_files or {})), getattr(_service, warm_up_name))
+
+
+def _parse_remaining_lease(value) -> Optional[int]:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    match = re.match(r"\s*(\d+)", str(value))
+    return int(match.group(1)) if match else None
+
+
+def hdb_records(chunk: pd.DataFrame) -> List[Dict[str, Any]]:
+    frame = chunk.rename(columns={k: v for k, v in HDB_COLUMN_MAP.items() if k in chunk.columns and v not in chunk.columns})
+    if "floor_level" not in frame.columns and "storey_range" in frame.columns:
+        frame["floor_level"] = frame["storey_range"].astype(str).str.replace(" TO ", "-", regex=False)
+    if "remaining_lease" in frame.columns:
+        frame["remaining_lease"] = frame["remaining_lease"].map(_parse_remaining_lease)
+    if "property_type" not in frame.columns:
+        frame["property_type"] = "HDB " + frame.get("flat_type", pd.Series("4 ROOM", index=frame.index)).astype(str)
+    return _records(frame)
+
+
+def _records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    fields = set(_service.PropertyFeatures.__fields__)
+    columns = [column for column in frame.columns if column in fields]
+    subset = frame[columns].astype(object).where(frame[columns].notna(), None)
+    return subset.to_dict("records")
+
+
+def _build_features(records: List[Dict[str, Any]], errors: Dict[int, str]) -> Dict[int, Any]:
+    features = {}
+    for i, record in enumerate(records):
+        try:
+            features[i] = _service.PropertyFeatures(**record)
+        except Exception as e:
+            errors[i] = str(e)
+    return features
+
+
+def score_hdb_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    records = hdb_records(chunk)
+    errors: Dict[int, str] = {}
+    features = _build_features(records, errors)
+    for i, f in list(features.items()):
+        property_type = f.property_type.upper()
+        if not _service.is_hdb_property_type(property_type):
+            errors[i] = f"Not an HDB property type: {f.property_type}"
+            del features[i]
+            continue
+        _service.normalize_hdb_features(f, property_type)
+
+    estimated = np.full(len(records), np.nan)
+    lower_pct = np.full(len(records), np.nan)
+    upper_pct = np.full(len(records), np.nan)
+    if features:
+        positions = list(features)
+        features_list = list(features.values())
+        raw, chunk_errors = _service.predict_hdb_chunk(features_list)
+        corrected, lower, upper, _ = _service.apply_correction_factors_batch(raw, features_list)
+        estimated[positions] = corrected
+        lower_pct[positions] = lower
+        upper_pct[positions] = upper
+        for i, error in chunk_errors.items():
+            errors[positions[i]] = error
+    return _result_frame(estimated, lower_pct, upper_pct, errors, "ml_model")
+
+
+def score_private_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    records = _records(chunk)
+    errors: Dict[int, str] = {}
+    features = _build_features(records, errors)
+
+    estimated = np.full(len(records), np.nan)
+    lower_pct = np.full(len(records), _service.PRIVATE_INTERVAL_PCT)
+    upper_pct = np.full(len(records), _service.PRIVATE_INTERVAL_PCT)
+    method = "private_fallback"
+    if features:
+        positions = list(features)
+        features_list = list(features.values())
+        predictions, chunk_errors, method = _service.predict_private_chunk(features_list)
+        estimated[positions] = predictions
+        lower_pct[positions], upper_pct[positions] = _service.private_interval_bounds(predictions, method, features_list)
+        for i, error in chunk_errors.items():
+            errors[positions[i]] = error
+    return _result_frame(estimated, lower_pct, upper_pct, errors, method)
+
+
+def _result_frame(estimated: np.ndarray, lower_pct: np.ndarray, upper_pct: np.ndarray,
+                  errors: Dict[int, str], method: str) -> pd.DataFrame:
+    error_column = np.full(len(estimated), None, dtype=object)
+    for i, error in errors.items():
+        error_column[i] = " ".join(error.split())
+        estimated[i] = np.nan
+    return pd.DataFrame({
+        "estimated_value": np.round(estimated, 2),
+        "confidence_low": np.round(estimated * (1 - lower_pct / 100), 2),
+        "confidence_high": np.round(estimated * (1 + upper_pct / 100), 2),
+        "calculation_method": np.where(np.isnan(estimated), None, method),
+        "error": error_column
+    })
+
+
+def score_chunk(service: str, chunk: pd.DataFrame, id_columns: List[str]) -> pd.DataFrame:
+    scored = score_hdb_chunk(chunk) if service == "hdb" else score_private_chunk(chunk)
+    ids = chunk[[column for column in id_columns if column in chunk.columns]].reset_index(drop=True)
+    return pd.concat([ids, scored], axis=1)
+
+
+def _model_version(service: str) -> Optional[str]:
+    return getattr(_service, "hdb_model_version" if service == "hdb" else "private_model_version", None)
+
+
+def _score_chunk_with_version(service: str, chunk: pd.DataFrame, id_columns: List[str]):
+    return _model_version(service), score_chunk(service, chunk, id_columns)
+
+
+def read_chunks(path: str, chunk_size: int, skip_rows: int = 0) -> Iterator[pd.DataFrame]:
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        skipped = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            if skipped < skip_rows:
+                skipped += batch.num_rows
+                continue
+            yield batch.to_pandas()
+        return
+    skip = range(1, skip_rows + 1) if skip_rows else None
+    yield from pd.read_csv(path, chunksize=chunk_size, skiprows=skip, low_memory=False)
+
+
+class OutputWriter:
+    def __init__(self, path: str, output_format: str):
+        self.path = path
+        self.format = output_format
+        if output_format == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise SystemExit("Parquet output requires pyarrow (pip install pyarrow)")
+            os.makedirs(path, exist_ok=True)
+
+    def position(self) -> int:
+        if self.format == "parquet":
+            return len([name for name in os.listdir(self.path) if name.endswith(".parquet")])
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def truncate(self, position: int) -> None:
+        if self.format == "parquet":
+            for name in os.listdir(self.path):
+                if name.endswith(".parquet") and int(name[5:10]) >= position:
+                    os.remove(os.path.join(self.path, name))
+        elif os.path.exists(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(position)
+
+    def write(self, chunk_index: int, frame: pd.DataFrame) -> None:
+        if self.format == "parquet":
+            frame.to_parquet(os.path.join(self.path, f"part-{chunk_index:05d}.parquet"), index=False)
+            return
+        header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, "a", newline="") as f:
+            frame.to_csv(f, header=header, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: str, checkpoint: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def run(service: str, input_path: str, output_path: str, output_format: str = "csv",
+        chunk_size: int = 50000, workers: int = 0, resume: bool = False,
+        checkpoint_path: Optional[str] = None, id_columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    workers = workers or os.cpu_count() or 1
+    id_columns = id_columns if id_columns is not None else ["_id"]
+    checkpoint_path = checkpoint_path or f"{output_path.rstrip('/')}.checkpoint.json"
+    writer = OutputWriter(output_path, output_format)
+
+    checkpoint = load_checkpoint(checkpoint_path) if resume else None
+    if checkpoint and (checkpoint["input"] != os.path.abspath(input_path) or checkpoint["chunk_size"] != chunk_size):
+        raise SystemExit("Checkpoint was written for a different input or chunk size")
+
+    with tempfile.TemporaryDirectory(prefix="bulk_valuation_") as side_file_dir, ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=(service, prepare_side_files(service, side_file_dir))) as pool:
+        # The workers load the model; the parent only asks one of them which version that is
+        model_version = pool.submit(_model_version, service).result()
+        if checkpoint:
+            if checkpoint.get("model_version") != model_version:
+                raise SystemExit(f"Checkpoint was written with model version {checkpoint.get('model_version')}, "
+                                 f"but {model_version} is loaded now; rerun without --resume")
+            writer.truncate(checkpoint["output_position"])
+            logger.info(f"Resuming after chunk {checkpoint['chunks_done']} ({checkpoint['rows_done']} rows)")
+        else:
+            writer.truncate(0)
+            checkpoint = {
+                "input": os.path.abspath(input_path),
+                "chunk_size": chunk_size,
+                "model_version": model_version,
+                "chunks_done": 0,
+                "rows_done": 0,
+                "output_position": 0
+            }
+
+        started = time.perf_counter()
+        rows_this_run = 0
+        chunks = read_chunks(input_path, chunk_size, skip_rows=checkpoint["rows_done"])
+        chunk_index = checkpoint["chunks_done"]
+        in_flight = []
+        exhausted = False
+        while in_flight or not exhausted:
+            while not exhausted and len(in_flight) < workers * 2:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                in_flight.append((len(chunk), pool.submit(_score_chunk_with_version, service, chunk, id_columns)))
+            if not in_flight:
+                break
+
+            rows, future = in_flight.pop(0)
+            chunk_version, scored = future.result()
+            if chunk_version != checkpoint["model_version"]:
+                # A worker started after the active model changed; the checkpoint lets a rerun pick up from here
+                raise SystemExit(f"Chunk {chunk_index + 1} was scored with model version {chunk_version}, "
+                                 f"not {checkpoint['model_version']}")
+            writer.write(chunk_index, scored)
+            chunk_index += 1
+            rows_this_run += rows
+
+            checkpoint.update(
+                chunks_done=chunk_index,
+                rows_done=checkpoint["rows_done"] + rows,
+                output_position=writer.position()
+            )
+            save_checkpoint(checkpoint_path, checkpoint)
+
+            elapsed = time.perf_counter() - started
+            logger.info(f"Chunk {chunk_index}: {checkpoint['rows_done']} rows written, "
+                        f"{rows_this_run / elapsed:.0f} rows/s")
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "rows": checkpoint["rows_done"],
+        "rows_this_run": rows_this_run,
+        "elapsed_seconds": round(elapsed, 2),
+        "rows_per_second": round(rows_this_run / elapsed, 1) if elapsed > 0 else 0.0,
+        "model_version": checkpoint["model_version"]
+    }
+    logger.info(f"Bulk valuation finished: {summary}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a transaction file through the valuation models")
+    parser.add_argument("service", choices=list(SERVICES))
+    parser.add_argument("input", help="Input CSV or Parquet file")
+    parser.add_argument("output", help="Output CSV file, or directory of part files for --format parquet")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: all cores)")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint next to the output")
+    parser.add_argument("--checkpoint", default=None)
+    parser.add_argument("--id-columns", default="_id", help="Comma-separated input columns copied to the output")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    for name in ("api.simple_api", "api.private_only_api"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    run(
+        args.service, args.input, args.output,
+        output_format=args.format,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        resume=args.resume,
+        checkpoint_path=args.checkpoint,
+        id_columns=[column for column in args.id_columns.split(",") if column]
+    )
+
+
+if __name__ == "__main__":
+    main()
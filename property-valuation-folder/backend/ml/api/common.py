@@ -0,0 +1,119 @@
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+
+from api.logging_setup import RequestSamplingMiddleware
+from api.metrics import MetricsMiddleware
+from api.prediction_cache import PredictionCache
+
+HDB_PROPERTY_TYPES = ["HDB", "1-ROOM", "2-ROOM", "3-ROOM", "4-ROOM", "5-ROOM", "EXECUTIVE"]
+
+FLOOR_RANGES = {
+    "01-05": 3, "06-10": 8, "11-15": 13,
+    "16-20": 18, "21-25": 23, "26-30": 28,
+    "31-35": 33, "36-40": 38, "41+": 43
+}
+
+_prediction_cache: Optional[PredictionCache] = None
+_inference_executor: Optional[ThreadPoolExecutor] = None
+
+
+def create_app(title: str, service: str) -> FastAPI:
+    app = FastAPI(title=title)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_middleware(RequestSamplingMiddleware)
+    app.add_middleware(MetricsMiddleware, service=service)
+    return app
+
+
+def shared_prediction_cache() -> PredictionCache:
+    """One response cache per process, shared by every service mounted in it (keys are namespaced by service)."""
+    global _prediction_cache
+    if _prediction_cache is None:
+        _prediction_cache = PredictionCache(
+            max_size=int(os.environ.get("PREDICTION_CACHE_SIZE", "10000")),
+            ttl_seconds=float(os.environ.get("PREDICTION_CACHE_TTL", "600"))
+        )
+    return _prediction_cache
+
+
+def is_model_response(response) -> bool:
+    """Only model valuations are cached; a fallback estimate after a transient model error is not pinned for the TTL."""
+    return getattr(response, "calculation_method", None) == "ml_model"
+
+
+def shared_inference_executor() -> ThreadPoolExecutor:
+    """Threads that run model.predict for the micro-batchers of every service in the process."""
+    global _inference_executor
+    if _inference_executor is None:
+        _inference_executor = ThreadPoolExecutor(
+            max_workers=int(os.environ.get("INFERENCE_THREADS", "2")),
+            thread_name_prefix="inference"
+        )
+    return _inference_executor
+
+
+def check_admin_token(token: Optional[str]) -> None:
+    """Admin endpoints are disabled unless ADMIN_TOKEN is set, and then require it in X-Admin-Token."""
+    expected = os.environ.get("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not token or not hmac.compare_digest(token, expected):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def is_hdb_property_type(property_type: str) -> bool:
+    return any(hdb_type in property_type for hdb_type in HDB_PROPERTY_TYPES)
+
+
+def get_floor_number(floor_level: Optional[str]) -> int:
+    if not floor_level:
+        return 5
+
+    try:
+        if "-" in floor_level:
+            parts = floor_level.split("-")
+            return (int(parts[0]) + int(parts[1])) // 2
+        elif floor_level.isdigit():
+            return int(floor_level)
+        elif floor_level.lower() in ["ground", "g"]:
+            return 1
+        elif "+" in floor_level:
+            return int(floor_level.replace("+", ""))
+        return FLOOR_RANGES.get(floor_level, 5)
+    except (ValueError, TypeError):
+        return 5
+
+
+def ensure_numeric(value: Any, default_value=0):
+    if value is None:
+        return default_value
+
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return default_value
+
+
+def mock_comparable_properties(predicted_value: float, area_sqm: float, property_type: str,
+                               street: Optional[str], postal_code: Optional[str], block_prefix: str = "") -> List[Dict]:
+    return [
+        {
+            "address": f"{block_prefix}{100 + i} {street or 'Sample Street'}, Singapore {postal_code or '123456'}",
+            "transaction_date": f"2024-0{i + 1}-15",
+            "price": round(predicted_value * (0.95 + i * 0.05), 2),
+            "area_sqm": round(area_sqm * (0.9 + i * 0.05), 1),
+            "property_type": property_type
+        }
+        for i in range(3)
+    ]
@@ -0,0 +1,113 @@
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+# Neighbours fetched per comparable asked for, and the factor the fetch grows by when too few pass the filters
+OVERFETCH = 8
+
+COMPARABLE_COLUMNS = [
+    "flat_type", "town", "block", "street_name", "floor_area_sqm", "storey_mid",
+    "resale_price", "transaction_date", "latitude", "longitude"
+]
+
+
+class _FlatTypePartition:
+    def __init__(self, frame: pd.DataFrame):
+        from sklearn.neighbors import BallTree
+
+        coordinates = np.radians(frame[["latitude", "longitude"]].to_numpy(dtype=np.float64))
+        self.tree = BallTree(coordinates, metric="haversine")
+        self.price = frame["resale_price"].to_numpy(dtype=np.float64)
+        self.area = frame["floor_area_sqm"].to_numpy(dtype=np.float64)
+        self.storey = frame["storey_mid"].to_numpy(dtype=np.float64)
+        self.date = frame["transaction_date"].to_numpy(dtype="datetime64[D]")
+        self.town = frame["town"].to_numpy(dtype=object)
+        self.address = (frame["block"].astype(str) + " " + frame["street_name"].astype(str)).to_numpy(dtype=object)
+
+
+class ComparablesIndex:
+    """
+    In-memory index of real HDB resale transactions for comparable lookups:
+    one haversine BallTree per flat type over latitude/longitude.
+    """
+
+    def __init__(self, transactions: pd.DataFrame):
+        transactions = transactions.dropna(subset=["latitude", "longitude", "resale_price", "floor_area_sqm"])
+        transactions = transactions.assign(
+            transaction_date=pd.to_datetime(transactions["transaction_date"]),
+            storey_mid=transactions["storey_mid"].fillna(0)
+        )
+        self.size = len(transactions)
+        self.latest_date = transactions["transaction_date"].max().to_datetime64().astype("datetime64[D]")
+        self.partitions = {
+            flat_type: _FlatTypePartition(group.reset_index(drop=True))
+            for flat_type, group in transactions.groupby("flat_type")
+        }
+        self.town_centroids = {
+            town: (float(group["latitude"].mean()), float(group["longitude"].mean()))
+            for town, group in transactions.groupby("town")
+        }
+
+    @classmethod
+    def from_csv(cls, path: str) -> "ComparablesIndex":
+        started = time.perf_counter()
+        index = cls(pd.read_csv(path, usecols=COMPARABLE_COLUMNS))
+        logger.info(f"Built comparables index over {index.size} transactions from {path} "
+                    f"in {time.perf_counter() - started:.2f}s")
+        return index
+
+    def locate(self, town: Optional[str], latitude: Optional[float] = None,
+               longitude: Optional[float] = None) -> Optional[Tuple[float, float]]:
+        if latitude is not None and longitude is not None:
+            return latitude, longitude
+        if town:
+            return self.town_centroids.get(town.upper())
+        return None
+
+    def query(self, flat_type: str, latitude: float, longitude: float, area_sqm: Optional[float] = None,
+              k: int = 3, max_radius_km: float = 2.0, recency_days: Optional[int] = 730,
+              area_tolerance: float = 0.15, as_of: Optional[np.datetime64] = None) -> List[Dict[str, Any]]:
+        partition = self.partitions.get(flat_type)
+        if partition is None:
+            return []
+
+        # Nearest neighbours first, widening only when the filters leave fewer than k: a radius query would
+        # return and sort every transaction within max_radius_km in dense towns
+        point = np.radians([[latitude, longitude]])
+        size = len(partition.price)
+        fetch = min(size, k * OVERFETCH)
+        as_of = self.latest_date if as_of is None else as_of
+        while True:
+            distances, indices = partition.tree.query(point, k=fetch)
+            indices, distances_km = indices[0], distances[0] * EARTH_RADIUS_KM
+
+            keep = distances_km <= max_radius_km
+            if recency_days is not None:
+                keep &= partition.date[indices] >= as_of - np.timedelta64(recency_days, "D")
+            if area_sqm:
+                keep &= np.abs(partition.area[indices] - area_sqm) <= area_sqm * area_tolerance
+            if keep.sum() >= k or fetch == size or distances_km[-1] > max_radius_km:
+                break
+            fetch = min(size, fetch * OVERFETCH)
+
+        selected = indices[keep][:k]
+        selected_distances = distances_km[keep][:k]
+
+        return [
+            {
+                "address": f"Blk {partition.address[i]}, {partition.town[i]}",
+                "transaction_date": str(partition.date[i]),
+                "price": round(float(partition.price[i]), 2),
+                "area_sqm": round(float(partition.area[i]), 1),
+                "storey_mid": float(partition.storey[i]),
+                "distance_km": round(float(distance), 3),
+                "property_type": flat_type
+            }
+            for i, distance in zip(selected, selected_distances)
+        ]
@@ -0,0 +1,229 @@
+"""
+Split-conformal prediction intervals, precomputed per segment.
+
+calibrate() takes predictions on a calibration split (rows the model was
+not trained on) and the actual prices. For every segment (e.g. region x
+flat_type) and predicted-price band it stores the quantiles of the
+relative under- and over-prediction that give the requested coverage.
+Segment/band cells with too few rows fall back to the band as a whole.
+Serving turns predictions into intervals with one array gather and no
+extra model evaluations:
+
+    python -m api.conformal calibrate --data calibration.csv --dimensions region flat_type --out hdb/conformal_intervals.json
+    python -m api.conformal check --intervals hdb/conformal_intervals.json --data holdout.csv
+"""
+import argparse
+import json
+import math
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+CONFORMAL_FORMAT_VERSION = 1
+DEFAULT_COVERAGE = 0.9
+DEFAULT_BANDS = 4
+MIN_CELL_ROWS = 30
+SEGMENT_SEPARATOR = "|"
+
+
+def conformal_quantile(scores: np.ndarray, level: float) -> float:
+    """The ceil((n + 1) * level)-th smallest score, the finite-sample conformal quantile."""
+    rank = min(len(scores), math.ceil((len(scores) + 1) * level))
+    return float(np.partition(scores, rank - 1)[rank - 1])
+
+
+def _cell(predicted: np.ndarray, actual: np.ndarray, level: float) -> Tuple[float, float]:
+    under = np.maximum((predicted - actual) / predicted, 0.0)
+    over = np.maximum((actual - predicted) / predicted, 0.0)
+    return round(100 * conformal_quantile(under, level), 3), round(100 * conformal_quantile(over, level), 3)
+
+
+def calibrate(segments: pd.DataFrame, predicted: np.ndarray, actual: np.ndarray,
+              coverage: float = DEFAULT_COVERAGE, bands: int = DEFAULT_BANDS, min_rows: int = MIN_CELL_ROWS,
+              band_edges: Optional[Sequence[float]] = None) -> Dict[str, Any]:
+    """
+    Interval table for `coverage` from calibration predictions. `segments`
+    holds one column per dimension; band edges default to quantiles of
+    the predictions. Each side uses level 1 - (1 - coverage) / 2, so the
+    two-sided interval covers at least `coverage`.
+    """
+    predicted = np.asarray(predicted, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    valid = np.isfinite(predicted) & np.isfinite(actual) & (predicted > 0)
+    segments, predicted, actual = segments[valid].reset_index(drop=True), predicted[valid], actual[valid]
+    level = 1 - (1 - coverage) / 2
+
+    if band_edges is None:
+        band_edges = np.unique(np.quantile(predicted, np.linspace(0, 1, bands + 1)[1:-1])) if bands > 1 else []
+    band_edges = [float(edge) for edge in band_edges]
+    band = np.searchsorted(band_edges, predicted, side="right")
+    n_bands = len(band_edges) + 1
+
+    def table(mask: np.ndarray, allow_empty: bool) -> Dict[str, List[Any]]:
+        lower, upper, counts = [], [], []
+        for b in range(n_bands):
+            rows = mask & (band == b)
+            count = int(rows.sum())
+            if count >= min_rows or (not allow_empty and count > 0):
+                low, high = _cell(predicted[rows], actual[rows], level)
+            else:
+                low = high = None
+            lower.append(low)
+            upper.append(high)
+            counts.append(count)
+        return {"lower_pct": lower, "upper_pct": upper, "count": counts}
+
+    everything = np.ones(len(predicted), dtype=bool)
+    band_table = table(everything, allow_empty=False)
+    overall = _cell(predicted, actual, level)
+    for side, value in (("lower_pct", overall[0]), ("upper_pct", overall[1])):
+        band_table[side] = [value if cell is None else cell for cell in band_table[side]]
+
+    keys = segments.astype(str).agg(SEGMENT_SEPARATOR.join, axis=1).to_numpy()
+    segment_tables = {}
+    for key in np.unique(keys):
+        cells = table(keys == key, allow_empty=True)
+        if any(cell is not None for cell in cells["lower_pct"]):
+            segment_tables[str(key)] = cells
+
+    return {
+        "format_version": CONFORMAL_FORMAT_VERSION,
+        "coverage": coverage,
+        "dimensions": list(segments.columns),
+        "band_edges": band_edges,
+        "bands": band_table,
+        "segments": segment_tables,
+        "calibration_rows": int(len(predicted))
+    }
+
+
+def merge(previous: Optional[Dict[str, Any]], fitted: Dict[str, Any]) -> Dict[str, Any]:
+    """Fitted cells replace previous ones; cells the new calibration had too few rows for keep their values."""
+    if not previous or previous.get("band_edges") != fitted["band_edges"] or previous.get("dimensions") != fitted["dimensions"]:
+        return fitted
+    merged = json.loads(json.dumps(previous))
+    for key, cells in fitted["segments"].items():
+        target = merged["segments"].setdefault(key, {side: [None] * len(cells["count"]) for side in cells})
+        for b, count in enumerate(cells["count"]):
+            if cells["lower_pct"][b] is not None:
+                target["lower_pct"][b] = cells["lower_pct"][b]
+                target["upper_pct"][b] = cells["upper_pct"][b]
+                target["count"][b] = count
+    merged["calibration_rows"] = previous.get("calibration_rows", 0) + fitted["calibration_rows"]
+    return merged
+
+
+class ConformalIntervals:
+    """
+    A calibrate() table compiled into dense arrays indexed by
+    (segment code per dimension..., price band). Code 0 of a dimension is
+    "unknown value" and holds the band-wide fallback.
+    """
+
+    def __init__(self, spec: Dict[str, Any]):
+        if spec.get("format_version") != CONFORMAL_FORMAT_VERSION:
+            raise ValueError(f"Unsupported conformal interval format {spec.get('format_version')}")
+        self.coverage = float(spec["coverage"])
+        self.dimensions: List[str] = list(spec["dimensions"])
+        self.band_edges = np.asarray(spec["band_edges"], dtype=float)
+        n_bands = len(self.band_edges) + 1
+
+        keys = [key.split(SEGMENT_SEPARATOR) for key in spec["segments"]]
+        self.vocabularies: List[Dict[str, int]] = []
+        for i in range(len(self.dimensions)):
+            values = sorted({key[i] for key in keys})
+            self.vocabularies.append({value: code for code, value in enumerate(values, start=1)})
+
+        shape = tuple(len(vocabulary) + 1 for vocabulary in self.vocabularies) + (n_bands,)
+        fallback_lower = np.asarray(spec["bands"]["lower_pct"], dtype=float)
+        fallback_upper = np.asarray(spec["bands"]["upper_pct"], dtype=float)
+        self.lower_pct = np.broadcast_to(fallback_lower, shape).copy()
+        self.upper_pct = np.broadcast_to(fallback_upper, shape).copy()
+        for key, cells in spec["segments"].items():
+            index = tuple(vocabulary[value] for vocabulary, value in zip(self.vocabularies, key.split(SEGMENT_SEPARATOR)))
+            lower = np.array([np.nan if cell is None else cell for cell in cells["lower_pct"]], dtype=float)
+            upper = np.array([np.nan if cell is None else cell for cell in cells["upper_pct"]], dtype=float)
+            self.lower_pct[index] = np.where(np.isnan(lower), fallback_lower, lower)
+            self.upper_pct[index] = np.where(np.isnan(upper), fallback_upper, upper)
+
+    @classmethod
+    def from_file(cls, path: str) -> Optional["ConformalIntervals"]:
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def encode(self, dimension: str, values: Sequence[Any]) -> np.ndarray:
+        vocabulary = self.vocabularies[self.dimensions.index(dimension)]
+        return np.fromiter((vocabulary.get(str(value), 0) if value is not None else 0 for value in values),
+                           dtype=np.intp, count=len(values))
+
+    def bounds(self, codes: Sequence[np.ndarray], predictions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Lower and upper interval widths in percent of each prediction."""
+        band = np.searchsorted(self.band_edges, np.asarray(predictions, dtype=float), side="right")
+        index = tuple(codes) + (band,)
+        return self.lower_pct[index], self.upper_pct[index]
+
+    def bounds_for(self, columns: Dict[str, Sequence[Any]], predictions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return self.bounds([self.encode(dimension, columns[dimension]) for dimension in self.dimensions], predictions)
+
+    def coverage_on(self, segments: pd.DataFrame, predicted: np.ndarray, actual: np.ndarray) -> Dict[str, float]:
+        """Empirical coverage and mean width on labelled rows, for checking a table on fresh data."""
+        predicted = np.asarray(predicted, dtype=float)
+        actual = np.asarray(actual, dtype=float)
+        lower, upper = self.bounds_for({d: segments[d].tolist() for d in self.dimensions}, predicted)
+        low, high = predicted * (1 - lower / 100), predicted * (1 + upper / 100)
+        return {
+            "target": self.coverage,
+            "coverage": round(float(np.mean((actual >= low) & (actual <= high))), 4),
+            "mean_width_pct": round(float(np.mean(lower + upper)), 2),
+            "rows": int(len(predicted))
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate or check conformal prediction intervals")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    calibrate_parser = subparsers.add_parser("calibrate", help="Build an interval table from calibration predictions")
+    calibrate_parser.add_argument("--data", required=True, help="CSV with predictions, actual prices and segment columns")
+    calibrate_parser.add_argument("--dimensions", nargs="+", required=True)
+    calibrate_parser.add_argument("--prediction-column", default="predicted")
+    calibrate_parser.add_argument("--actual-column", default="resale_price")
+    calibrate_parser.add_argument("--coverage", type=float, default=DEFAULT_COVERAGE)
+    calibrate_parser.add_argument("--bands", type=int, default=DEFAULT_BANDS)
+    calibrate_parser.add_argument("--min-rows", type=int, default=MIN_CELL_ROWS)
+    calibrate_parser.add_argument("--out", required=True)
+
+    check_parser = subparsers.add_parser("check", help="Coverage of an interval table on labelled predictions")
+    check_parser.add_argument("--intervals", required=True)
+    check_parser.add_argument("--data", required=True)
+    check_parser.add_argument("--prediction-column", default="predicted")
+    check_parser.add_argument("--actual-column", default="resale_price")
+
+    args = parser.parse_args()
+    data = pd.read_csv(args.data)
+    if args.command == "calibrate":
+        spec = calibrate(
+            data[args.dimensions], data[args.prediction_column].to_numpy(), data[args.actual_column].to_numpy(),
+            coverage=args.coverage, bands=args.bands, min_rows=args.min_rows
+        )
+        tmp_path = f"{args.out}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(spec, f, indent=2)
+        os.replace(tmp_path, args.out)
+        print(json.dumps({"segments": len(spec["segments"]), "band_edges": spec["band_edges"], "bands": spec["bands"]}, indent=2))
+    else:
+        intervals = ConformalIntervals.from_file(args.intervals)
+        if intervals is None:
+            raise SystemExit(f"No interval table at {args.intervals}")
+        result = intervals.coverage_on(
+            data, data[args.prediction_column].to_numpy(), data[args.actual_column].to_numpy()
+        )
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_INTERVAL_PCT = 10.0
+
+
+class CorrectionTables:
+    """
+    correction_factors.json and confidence_intervals.json compiled into
+    dense lookup arrays. Each segment dimension is integer-coded (code 0
+    means "no factor for this value"), and the combined multiplier and
+    interval half-width for any (region, flat_type, town, flat_model)
+    combination are a single fancy-indexed gather.
+    """
+
+    DIMENSIONS = ["region", "flat_type", "town", "flat_model"]
+
+    def __init__(self, correction_factors: Optional[Dict[str, Dict[str, float]]],
+                 confidence_intervals: Optional[Dict[str, Any]],
+                 default_interval_pct: float = DEFAULT_INTERVAL_PCT):
+        correction_factors = correction_factors or {}
+        confidence_intervals = confidence_intervals or {}
+        self.default_interval_pct = default_interval_pct
+
+        self.vocabularies: Dict[str, Dict[str, int]] = {}
+        self.labels: Dict[str, List[Optional[str]]] = {}
+        self.factors: Dict[str, np.ndarray] = {}
+        for dimension in self.DIMENSIONS:
+            values = list(correction_factors.get(dimension, {}))
+            for value in confidence_intervals.get(dimension, {}):
+                if value not in values:
+                    values.append(value)
+            self.vocabularies[dimension] = {value: code for code, value in enumerate(values, start=1)}
+            self.labels[dimension] = [None] + values
+            factors = correction_factors.get(dimension, {})
+            self.factors[dimension] = np.array([1.0] + [float(factors.get(value, 1.0)) for value in values])
+            self.factors[dimension][[0] + [i for i, v in enumerate(values, start=1) if v not in factors]] = np.nan
+
+        region, flat_type, town, flat_model = (self.factors[dimension] for dimension in self.DIMENSIONS)
+        self.multiplier = (
+            np.nan_to_num(region, nan=1.0)[:, None, None, None]
+            * np.nan_to_num(flat_type, nan=1.0)[None, :, None, None]
+            * np.nan_to_num(town, nan=1.0)[None, None, :, None]
+            * np.nan_to_num(flat_model, nan=1.0)[None, None, None, :]
+        )
+        self.interval_pct = self._compile_intervals(confidence_intervals)
+
+    def _segment_pct(self, confidence_intervals: Dict[str, Any], dimension: str) -> np.ndarray:
+        intervals = confidence_intervals.get(dimension, {})
+        pct = np.full(len(self.labels[dimension]), np.nan)
+        for value, code in self.vocabularies[dimension].items():
+            stats = intervals.get(value)
+            if stats:
+                pct[code] = float(stats.get("mean", 0.0)) + float(stats.get("ci_95", 0.0))
+        return pct
+
+    def _compile_intervals(self, confidence_intervals: Dict[str, Any]) -> np.ndarray:
+        region_pct = self._segment_pct(confidence_intervals, "region")
+        flat_type_pct = self._segment_pct(confidence_intervals, "flat_type")
+
+        stacked = np.stack(np.broadcast_arrays(region_pct[:, None], flat_type_pct[None, :]))
+        counts = (~np.isnan(stacked)).sum(axis=0)
+        table = np.where(counts > 0, np.nansum(stacked, axis=0) / np.maximum(counts, 1), self.default_interval_pct)
+
+        for key, stats in (confidence_intervals.get("combined") or {}).items():
+            region, _, flat_type = key.partition("|")
+            region_code = self.vocabularies["region"].get(region)
+            flat_type_code = self.vocabularies["flat_type"].get(flat_type)
+            if region_code and flat_type_code and stats:
+                table[region_code, flat_type_code] = float(stats.get("mean", 0.0)) + float(stats.get("ci_95", 0.0))
+        return table
+
+    def encode(self, dimension: str, values: Sequence[Any]) -> np.ndarray:
+        vocabulary = self.vocabularies[dimension]
+        return np.fromiter((vocabulary.get(value, 0) if isinstance(value, str) else 0 for value in values),
+                           dtype=np.intp, count=len(values))
+
+    def gather(self, codes: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        region, flat_type, town, flat_model = codes
+        return self.multiplier[region, flat_type, town, flat_model], self.interval_pct[region, flat_type]
+
+    def details(self, codes: Tuple[np.ndarray, ...]) -> List[Dict[str, Dict[str, Any]]]:
+        details = [{} for _ in range(len(codes[0]))]
+        for dimension, dimension_codes in zip(self.DIMENSIONS, codes):
+            factors = self.factors[dimension]
+            labels = self.labels[dimension]
+            for i in np.nonzero(~np.isnan(factors[dimension_codes]))[0]:
+                code = dimension_codes[i]
+                details[i][dimension] = {"factor": float(factors[code]), "applied_to": labels[code]}
+        return details
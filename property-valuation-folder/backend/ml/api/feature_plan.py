@@ -0,0 +1,63 @@
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class FeaturePlan:
+    """
+    Ordered table of per-feature extractor callables, compiled once from a
+    model's feature list, that fills a NumPy row instead of building a
+    DataFrame from a dict on every request.
+    """
+
+    def __init__(self, feature_names: Sequence[str], extractors: Sequence[Callable[[Any], Any]],
+                 categorical_features: Iterable[str] = ()):
+        self.feature_names = list(feature_names)
+        self.extractors = tuple(extractors)
+        self.categorical_features = [name for name in self.feature_names if name in set(categorical_features)]
+        self.is_numeric = not self.categorical_features
+        self.dtype = np.float64 if self.is_numeric else object
+        self.columns = pd.Index(self.feature_names)
+
+    @classmethod
+    def compile(cls, feature_names: Sequence[str], extractor_table: Dict[str, Callable[[Any], Any]],
+                categorical_features: Iterable[str] = (),
+                default: Optional[Callable[[Any], Any]] = None) -> "FeaturePlan":
+        missing = [name for name in feature_names if name not in extractor_table]
+        if missing and default is None:
+            raise ValueError(f"No extractor for features: {missing}")
+        extractors = [extractor_table.get(name, default) for name in feature_names]
+        return cls(feature_names, extractors, categorical_features)
+
+    def new_row(self) -> np.ndarray:
+        return np.empty((1, len(self.feature_names)), dtype=self.dtype)
+
+    def fill(self, features: Any, out: Optional[np.ndarray] = None) -> np.ndarray:
+        row = self.new_row() if out is None else out
+        values = row[0]
+        for i, extractor in enumerate(self.extractors):
+            values[i] = extractor(features)
+        return row
+
+    def frame(self, rows: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(rows, columns=self.columns)
+
+
+def check_parity(fast_predict: Callable[[Any], float], reference_predict: Callable[[Any], float],
+                 samples: Iterable[Any]) -> List[str]:
+    """Return a description of every sample where the two paths disagree."""
+    mismatches = []
+    for sample in samples:
+        try:
+            fast = fast_predict(sample)
+            reference = reference_predict(sample)
+        except Exception as e:
+            mismatches.append(f"{sample}: {str(e)}")
+            continue
+        if not np.array_equal(np.asarray(fast), np.asarray(reference)):
+            mismatches.append(f"{sample}: fast={fast} reference={reference}")
+    return mismatches
@@ -0,0 +1,341 @@
+"""
+Aggregate-encoding feature store shared by HDB training and serving.
+
+Each aggregate (town_avg_price, flattype_avg_price, block_encoded,
+street_name_encoded, and the flat-type average area behind
+property_quality_score) is a running sum and count per category, held in
+NumPy arrays indexed by an integer code. New transactions are folded in
+with update(), a lookup is a dict get plus an array read, and the whole
+store round-trips through a pickle-free .npz snapshot:
+
+    python -m api.feature_store build --data ../../../hdb_resale_data_onemap_enriched.csv --out hdb/feature_store.npz
+    python -m api.feature_store update --snapshot hdb/feature_store.npz --data new_transactions.csv
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+STORE_FEATURES = [
+    "town_avg_price", "flattype_avg_price", "block_encoded", "street_name_encoded", "property_quality_score"
+]
+
+# table name -> (key column, value column)
+TABLES = {
+    "town_avg_price": ("town", "resale_price"),
+    "flattype_avg_price": ("flat_type", "resale_price"),
+    "flattype_avg_area": ("flat_type", "floor_area_sqm"),
+    "block_encoded": ("block_key", "resale_price"),
+    "street_name_encoded": ("street_name", "resale_price")
+}
+
+MAX_LEASE_YEARS = 99
+
+
+def normalize_key(value: Any) -> str:
+    if value is None or value != value:
+        return ""
+    return str(value).strip().upper()
+
+
+def block_key(block: Any, street_name: Any) -> str:
+    block, street_name = normalize_key(block), normalize_key(street_name)
+    return f"{block}|{street_name}" if block and street_name else ""
+
+
+def normalize_keys(values: Iterable[Any]) -> np.ndarray:
+    return np.array([normalize_key(value) for value in values], dtype=object)
+
+
+def block_keys(blocks: Iterable[Any], street_names: Iterable[Any]) -> np.ndarray:
+    return np.array([block_key(block, street) for block, street in zip(blocks, street_names)], dtype=object)
+
+
+def parse_remaining_lease(values: pd.Series) -> pd.Series:
+    """'61 years 04 months' -> 61.33; numbers pass through."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    parts = values.astype(str).str.extract(r"(\d+)\s*years?(?:\s*(\d+)\s*months?)?")
+    return parts[0].astype(float) + parts[1].astype(float).fillna(0) / 12
+
+
+class AggregateTable:
+    """Running sum and count per category, addressed by an integer code."""
+
+    def __init__(self, keys: Sequence[str] = (), sums: Optional[np.ndarray] = None,
+                 counts: Optional[np.ndarray] = None):
+        self.vocabulary: Dict[str, int] = {key: code for code, key in enumerate(keys)}
+        size = max(len(self.vocabulary), 16)
+        self.sums = np.zeros(size, dtype=np.float64)
+        self.counts = np.zeros(size, dtype=np.int64)
+        if sums is not None:
+            self.sums[:len(sums)] = sums
+            self.counts[:len(counts)] = counts
+        self._means: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.vocabulary)
+
+    def keys(self) -> np.ndarray:
+        return np.array(list(self.vocabulary), dtype=str)
+
+    def _grow(self, size: int) -> None:
+        capacity = len(self.sums)
+        while capacity < size:
+            capacity *= 2
+        if capacity != len(self.sums):
+            self.sums = np.concatenate([self.sums, np.zeros(capacity - len(self.sums))])
+            self.counts = np.concatenate([self.counts, np.zeros(capacity - len(self.counts), dtype=np.int64)])
+
+    def update(self, keys: np.ndarray, values: np.ndarray) -> None:
+        valid = ~np.isnan(values) & (keys != "")
+        keys, values = keys[valid], values[valid]
+        unique_keys, inverse = np.unique(keys.astype(str), return_inverse=True)
+        codes = np.empty(len(unique_keys), dtype=np.intp)
+        for i, key in enumerate(unique_keys):
+            code = self.vocabulary.get(key)
+            if code is None:
+                code = self.vocabulary[key] = len(self.vocabulary)
+            codes[i] = code
+        self._grow(len(self.vocabulary))
+        np.add.at(self.sums, codes[inverse], values)
+        np.add.at(self.counts, codes[inverse], 1)
+        self._means = None
+
+    @property
+    def means(self) -> np.ndarray:
+        if self._means is None:
+            size = len(self.vocabulary)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                self._means = np.append(self.sums[:size] / self.counts[:size], np.nan)
+        return self._means
+
+    def codes(self, keys: Iterable[str]) -> np.ndarray:
+        missing = len(self.vocabulary)
+        return np.fromiter((self.vocabulary.get(key, missing) for key in keys), dtype=np.intp)
+
+    def lookup(self, key: str) -> float:
+        """Mean for `key`, or NaN when the category has not been seen."""
+        return float(self.means[self.vocabulary.get(key, len(self.vocabulary))])
+
+    def lookup_many(self, keys: Iterable[str]) -> np.ndarray:
+        return self.means[self.codes(keys)]
+
+
+class FeatureStore:
+    """
+    Aggregate features for HDB transactions. An unseen block falls back to
+    its street, an unseen street to its town, and an unseen town or flat
+    type to the overall average price.
+    """
+
+    def __init__(self):
+        self.tables: Dict[str, AggregateTable] = {name: AggregateTable() for name in TABLES}
+        self.rows = 0
+        self.price_sum = 0.0
+        self.max_storey = 0.0
+        self.updated_at: Optional[float] = None
+
+    @classmethod
+    def from_transactions(cls, transactions: pd.DataFrame) -> "FeatureStore":
+        store = cls()
+        store.update(transactions)
+        return store
+
+    @classmethod
+    def from_csv(cls, path: str) -> "FeatureStore":
+        columns = ["town", "flat_type", "block", "street_name", "floor_area_sqm", "resale_price", "storey_mid"]
+        return cls.from_transactions(pd.read_csv(path, usecols=lambda column: column in columns))
+
+    @property
+    def average_price(self) -> float:
+        return self.price_sum / self.rows if self.rows else float("nan")
+
+    def update(self, transactions: pd.DataFrame) -> None:
+        """Folds new transactions into the running aggregates."""
+        keys = {
+            "town": normalize_keys(transactions["town"]),
+            "flat_type": normalize_keys(transactions["flat_type"]),
+            "street_name": normalize_keys(transactions["street_name"]),
+            "block_key": block_keys(transactions["block"], transactions["street_name"])
+        }
+        for name, (key_column, value_column) in TABLES.items():
+            values = pd.to_numeric(transactions[value_column], errors="coerce").to_numpy(dtype=np.float64)
+            self.tables[name].update(keys[key_column], values)
+
+        prices = pd.to_numeric(transactions["resale_price"], errors="coerce").dropna()
+        self.rows += len(prices)
+        self.price_sum += float(prices.sum())
+        if "storey_mid" in transactions and len(transactions):
+            self.max_storey = max(self.max_storey, float(np.nanmax(transactions["storey_mid"].to_numpy(dtype=float))))
+        self.updated_at = time.time()
+
+    def feature_columns(self, town: Iterable[Any], flat_type: Iterable[Any], block: Iterable[Any],
+                        street_name: Iterable[Any], area_sqm: np.ndarray, storey_mid: np.ndarray,
+                        remaining_lease: np.ndarray) -> Dict[str, np.ndarray]:
+        """Store features for a batch of properties, one array per feature."""
+        town, flat_type = normalize_keys(town), normalize_keys(flat_type)
+        block, street_name = list(block), normalize_keys(street_name)
+
+        town_price = self.tables["town_avg_price"].lookup_many(town)
+        town_price = np.where(np.isnan(town_price), self.average_price, town_price)
+        flattype_price = self.tables["flattype_avg_price"].lookup_many(flat_type)
+        flattype_price = np.where(np.isnan(flattype_price), self.average_price, flattype_price)
+        street_price = self.tables["street_name_encoded"].lookup_many(street_name)
+        street_price = np.where(np.isnan(street_price), town_price, street_price)
+        block_price = self.tables["block_encoded"].lookup_many(block_keys(block, street_name))
+        block_price = np.where(np.isnan(block_price), street_price, block_price)
+
+        flattype_area = self.tables["flattype_avg_area"].lookup_many(flat_type)
+        area_premium = np.where(np.isnan(flattype_area), 1.0, np.asarray(area_sqm, dtype=float) / flattype_area)
+        floor_score = np.asarray(storey_mid, dtype=float) / self.max_storey if self.max_storey else np.zeros(len(town))
+        lease_score = np.asarray(remaining_lease, dtype=float) / MAX_LEASE_YEARS
+
+        return {
+            "town_avg_price": town_price,
+            "flattype_avg_price": flattype_price,
+            "block_encoded": block_price,
+            "street_name_encoded": street_price,
+            "property_quality_score": 0.4 * lease_score + 0.3 * floor_score + 0.3 * area_premium
+        }
+
+    def features(self, town: Optional[str], flat_type: Optional[str], block: Optional[str],
+                 street_name: Optional[str], area_sqm: float, storey_mid: float,
+                 remaining_lease: float) -> Dict[str, float]:
+        """Scalar twin of feature_columns() for the single-prediction path."""
+        town, flat_type = normalize_key(town), normalize_key(flat_type)
+        block_code, street_name = block_key(block, street_name), normalize_key(street_name)
+
+        town_price = self.tables["town_avg_price"].lookup(town)
+        if town_price != town_price:
+            town_price = self.average_price
+        flattype_price = self.tables["flattype_avg_price"].lookup(flat_type)
+        if flattype_price != flattype_price:
+            flattype_price = self.average_price
+        street_price = self.tables["street_name_encoded"].lookup(street_name)
+        if street_price != street_price:
+            street_price = town_price
+        block_price = self.tables["block_encoded"].lookup(block_code)
+        if block_price != block_price:
+            block_price = street_price
+
+        flattype_area = self.tables["flattype_avg_area"].lookup(flat_type)
+        area_premium = 1.0 if flattype_area != flattype_area else float(area_sqm) / flattype_area
+        floor_score = float(storey_mid) / self.max_storey if self.max_storey else 0.0
+        lease_score = float(remaining_lease) / MAX_LEASE_YEARS
+
+        return {
+            "town_avg_price": town_price,
+            "flattype_avg_price": flattype_price,
+            "block_encoded": block_price,
+            "street_name_encoded": street_price,
+            "property_quality_score": 0.4 * lease_score + 0.3 * floor_score + 0.3 * area_premium
+        }
+
+    def transform(self, transactions: pd.DataFrame) -> pd.DataFrame:
+        """Store features for a transaction frame (the training-side view)."""
+        columns = self.feature_columns(
+            transactions["town"], transactions["flat_type"], transactions["block"], transactions["street_name"],
+            transactions["floor_area_sqm"].to_numpy(dtype=float),
+            transactions["storey_mid"].to_numpy(dtype=float),
+            parse_remaining_lease(transactions["remaining_lease"]).to_numpy(dtype=float)
+        )
+        return pd.DataFrame(columns, index=transactions.index)
+
+    def version(self) -> str:
+        digest = hashlib.sha256()
+        for name in sorted(self.tables):
+            table = self.tables[name]
+            keys = sorted(table.vocabulary)
+            codes = table.codes(keys)
+            digest.update(name.encode())
+            digest.update("\n".join(keys).encode())
+            digest.update(table.sums[codes].tobytes())
+            digest.update(table.counts[codes].tobytes())
+        digest.update(np.array([self.rows, self.price_sum, self.max_storey]).tobytes())
+        return digest.hexdigest()[:16]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version(),
+            "rows": self.rows,
+            "categories": {name: len(table) for name, table in self.tables.items()},
+            "updated_at": self.updated_at
+        }
+
+    def snapshot(self, path: str) -> None:
+        arrays = {}
+        for name, table in self.tables.items():
+            size = len(table)
+            arrays[f"{name}.keys"] = table.keys()
+            arrays[f"{name}.sums"] = table.sums[:size]
+            arrays[f"{name}.counts"] = table.counts[:size]
+        meta = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "rows": self.rows,
+            "price_sum": self.price_sum,
+            "max_storey": self.max_storey,
+            "updated_at": self.updated_at
+        }
+        arrays["meta"] = np.array(json.dumps(meta))
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def restore(cls, path: str) -> "FeatureStore":
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+                raise ValueError(f"Unsupported feature store snapshot format: {meta.get('format_version')}")
+            store = cls()
+            for name in TABLES:
+                store.tables[name] = AggregateTable(
+                    data[f"{name}.keys"].tolist(), data[f"{name}.sums"], data[f"{name}.counts"]
+                )
+        store.rows = int(meta["rows"])
+        store.price_sum = float(meta["price_sum"])
+        store.max_storey = float(meta["max_storey"])
+        store.updated_at = meta.get("updated_at")
+        return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or update the HDB aggregate feature store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Build a snapshot from a transaction CSV")
+    build.add_argument("--data", required=True)
+    build.add_argument("--out", required=True)
+
+    update = subparsers.add_parser("update", help="Fold new transactions into an existing snapshot")
+    update.add_argument("--snapshot", required=True)
+    update.add_argument("--data", required=True)
+
+    show = subparsers.add_parser("show", help="Print snapshot statistics")
+    show.add_argument("--snapshot", required=True)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        store = FeatureStore.from_csv(args.data)
+        store.snapshot(args.out)
+    elif args.command == "update":
+        store = FeatureStore.restore(args.snapshot)
+        store.update(pd.read_csv(args.data))
+        store.snapshot(args.snapshot)
+    else:
+        store = FeatureStore.restore(args.snapshot)
+    print(json.dumps(store.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
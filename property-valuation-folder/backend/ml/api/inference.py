@@ -0,0 +1,282 @@
+"""
+Inference backends for the valuation models.
+
+"sklearn" calls model.predict on the frame the service built, so every
+call goes through the whole Pipeline: column selection, input
+validation, the ColumnTransformer and its encoders. "native" compiles the
+fitted preprocessing once into lookup dicts and scaling vectors, encodes
+rows straight into a dense matrix and hands that to the booster:
+XGBoost's inplace_predict on float32 (the precision XGBoost evaluates
+splits in anyway), LightGBM's Booster.predict, or the final estimator's
+own predict for anything else. Both produce the same numbers; the
+services check that at warm-up before enabling "native".
+
+    python -m api.inference compare --model hdb/hdb_deployment_pipeline.pkl --data inputs.csv
+"""
+import argparse
+import json
+import pickle
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from api.model_artifacts import ArtifactModel, extract_preprocessing
+
+BACKENDS = ("sklearn", "native")
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and value != value)
+
+
+class PipelineBackend:
+    """The model's own predict, for comparison and for models the native backend cannot compile."""
+
+    name = "sklearn"
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict(self, X, columns: Optional[Sequence[str]] = None) -> np.ndarray:
+        if columns is not None and isinstance(X, np.ndarray) and X.dtype == object:
+            X = pd.DataFrame(X, columns=list(columns))
+        return np.asarray(self.model.predict(X), dtype=float)
+
+
+class CompiledPreprocessing:
+    """
+    An extract_preprocessing() spec compiled for direct encoding: numeric
+    chains become imputation / mean / scale vectors, encoders become
+    value -> output position dicts.
+    """
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.input_features = list(spec.get("input_features", []))
+        self.identity = spec["type"] == "identity"
+        self.zero_is_missing = bool(spec.get("sparse_output", False))
+        self.numeric: List[Dict[str, Any]] = []
+        self.categorical: List[Dict[str, Any]] = []
+
+        if spec["type"] == "identity":
+            self.numeric.append({"columns": self.input_features, "offset": 0, "steps": []})
+            self.width = len(self.input_features)
+            return
+
+        offset = 0
+        for transformer in spec["transformers"]:
+            steps = [step for step in transformer["steps"] if step["kind"] != "passthrough"]
+            if steps and steps[-1]["kind"] in ("onehot", "ordinal"):
+                offset = self._compile_encoder(transformer["columns"], steps, offset)
+            else:
+                offset = self._compile_numeric(transformer["columns"], steps, offset)
+        self.width = offset
+
+    def _compile_numeric(self, columns: List[str], steps: List[Dict[str, Any]], offset: int) -> int:
+        compiled = []
+        for step in steps:
+            if step["kind"] == "imputer":
+                if not all(isinstance(value, (int, float)) for value in step["statistics"]):
+                    raise ValueError("Non-numeric imputer in front of numeric columns")
+                compiled.append(("impute", np.asarray(step["statistics"], dtype=np.float64)))
+            elif step["kind"] == "standard_scaler":
+                compiled.append(("scale", None if step["mean"] is None else np.asarray(step["mean"]),
+                                 None if step["scale"] is None else np.asarray(step["scale"])))
+            else:
+                raise ValueError(f"Cannot compile preprocessing step {step['kind']}")
+        self.numeric.append({"columns": columns, "offset": offset, "steps": compiled})
+        return offset + len(columns)
+
+    def _compile_encoder(self, columns: List[str], steps: List[Dict[str, Any]], offset: int) -> int:
+        encoder = steps[-1]
+        statistics = [None] * len(columns)
+        for step in steps[:-1]:
+            if step["kind"] != "imputer":
+                raise ValueError(f"Cannot compile {step['kind']} in front of an encoder")
+            statistics = step["statistics"]
+
+        for j, (column, categories) in enumerate(zip(columns, encoder["categories"])):
+            if encoder["kind"] == "onehot":
+                lookup = {category: offset + i for i, category in enumerate(categories) if not _is_missing(category)}
+                missing_target = next((offset + i for i, category in enumerate(categories) if _is_missing(category)), -1)
+                entry = {"kind": "onehot", "strict": encoder["handle_unknown"] == "error"}
+                offset += len(categories)
+            else:
+                lookup = {category: float(i) for i, category in enumerate(categories) if not _is_missing(category)}
+                missing_target = next((float(i) for i, category in enumerate(categories) if _is_missing(category)),
+                                      np.nan)
+                unknown = encoder["unknown_value"]
+                entry = {"kind": "ordinal", "position": offset, "unknown": np.nan if unknown is None else unknown}
+                offset += 1
+            if statistics[j] is not None and not _is_missing(statistics[j]):
+                missing_target = lookup.get(statistics[j], missing_target)
+            entry.update(column=column, lookup=lookup, missing=missing_target)
+            self.categorical.append(entry)
+        return offset
+
+    def encode(self, column: Callable[[str], np.ndarray], rows: int) -> np.ndarray:
+        """Dense float64 matrix for `rows` rows; column(name) returns that input column."""
+        matrix = np.zeros((rows, self.width), dtype=np.float64)
+        for block in self.numeric:
+            if not block["columns"]:
+                continue
+            values = np.column_stack([column(name) for name in block["columns"]]).astype(np.float64)
+            for step in block["steps"]:
+                if step[0] == "impute":
+                    values = np.where(np.isnan(values), step[1], values)
+                else:
+                    if step[1] is not None:
+                        values = values - step[1]
+                    if step[2] is not None:
+                        values = values / step[2]
+            matrix[:, block["offset"]:block["offset"] + len(block["columns"])] = values
+
+        row_index = np.arange(rows)
+        for entry in self.categorical:
+            lookup, missing = entry["lookup"], entry["missing"]
+            values = column(entry["column"])
+            if entry["kind"] == "onehot":
+                positions = np.fromiter(
+                    (missing if _is_missing(value) else lookup.get(value, -1) for value in values),
+                    dtype=np.intp, count=rows
+                )
+                known = positions >= 0
+                if entry["strict"] and not known.all():
+                    raise ValueError(f"Found unknown categories in column {entry['column']} during transform")
+                matrix[row_index[known], positions[known]] = 1.0
+            else:
+                unknown = entry["unknown"]
+                matrix[:, entry["position"]] = [
+                    missing if _is_missing(value) else lookup.get(value, unknown) for value in values
+                ]
+        return matrix
+
+
+class NativeBackend:
+    name = "native"
+
+    def __init__(self, preprocessing: CompiledPreprocessing, estimator, library: str,
+                 best_iteration: Optional[int] = None):
+        self.preprocessing = preprocessing
+        self.library = library
+        self.estimator = estimator
+        if library == "xgboost":
+            self.booster = estimator.get_booster()
+            if self.booster.feature_types and "c" in self.booster.feature_types:
+                raise ValueError("XGBoost models with native categorical features are not supported")
+            self.iteration_range = (0, best_iteration + 1) if best_iteration is not None else (0, 0)
+            self.missing = estimator.missing
+        elif library == "lightgbm":
+            self.booster = getattr(estimator, "booster_", estimator)
+            self.best_iteration = best_iteration
+
+    @classmethod
+    def from_model(cls, model) -> "NativeBackend":
+        """Raises ValueError if the model's preprocessing or estimator cannot be compiled."""
+        if isinstance(model, ArtifactModel):
+            spec, estimator = model.preprocessor.spec, model.estimator
+            best_iteration = model.booster_info.get("best_iteration")
+        else:
+            spec = extract_preprocessing(model)
+            estimator = model.steps[-1][1] if hasattr(model, "steps") else model
+            best_iteration = None
+
+        module = type(estimator).__module__
+        library = "xgboost" if module.startswith("xgboost") else "lightgbm" if module.startswith("lightgbm") else "sklearn"
+        if library == "xgboost":
+            try:
+                best_iteration = int(estimator.best_iteration)
+            except (AttributeError, TypeError, ValueError):
+                best_iteration = None
+        elif library == "lightgbm" and best_iteration is None:
+            best_iteration = getattr(estimator, "best_iteration_", None) or None
+        return cls(CompiledPreprocessing(spec), estimator, library, best_iteration)
+
+    def matrix(self, X, columns: Optional[Sequence[str]] = None) -> np.ndarray:
+        preprocessing = self.preprocessing
+        if preprocessing.identity and isinstance(X, np.ndarray) and (
+                not preprocessing.input_features or list(columns or preprocessing.input_features) == preprocessing.input_features):
+            return np.asarray(X, dtype=np.float64)
+        if isinstance(X, pd.DataFrame):
+            rows = len(X)
+            column = lambda name: X[name].to_numpy()
+        else:
+            X = np.asarray(X)
+            names = list(columns) if columns is not None else preprocessing.input_features
+            positions = {name: i for i, name in enumerate(names)}
+            rows = X.shape[0]
+            column = lambda name: X[:, positions[name]]
+        return preprocessing.encode(column, rows)
+
+    def predict(self, X, columns: Optional[Sequence[str]] = None) -> np.ndarray:
+        matrix = self.matrix(X, columns)
+        if self.library == "xgboost":
+            matrix = matrix.astype(np.float32)
+            if self.preprocessing.zero_is_missing:
+                # The Pipeline hands XGBoost a sparse matrix, where absent zeros count as missing
+                matrix[matrix == 0] = np.nan
+            predictions = self.booster.inplace_predict(
+                matrix, iteration_range=self.iteration_range, missing=self.missing, validate_features=False
+            )
+        elif self.library == "lightgbm":
+            predictions = self.booster.predict(matrix, num_iteration=self.best_iteration)
+        else:
+            if self.preprocessing.zero_is_missing:
+                from scipy import sparse
+                matrix = sparse.csr_matrix(matrix)
+            predictions = self.estimator.predict(matrix)
+        return np.asarray(predictions, dtype=float)
+
+
+def build_backend(name: str, model):
+    """The named backend for `model`; ValueError if it is unknown or cannot serve this model."""
+    if name == "sklearn":
+        return PipelineBackend(model)
+    if name == "native":
+        return NativeBackend.from_model(model)
+    raise ValueError(f"Unknown inference backend {name!r}, expected one of {BACKENDS}")
+
+
+def compare(model, frame: pd.DataFrame, repeats: int = 20) -> Dict[str, Any]:
+    """Predictions and per-row latency of both backends on the same input rows."""
+    result = {"rows": len(frame)}
+    predictions = {}
+    for name in BACKENDS:
+        backend = build_backend(name, model)
+        predictions[name] = backend.predict(frame)
+        started = time.perf_counter()
+        for _ in range(repeats):
+            backend.predict(frame.iloc[:1])
+        single = (time.perf_counter() - started) / repeats
+        started = time.perf_counter()
+        backend.predict(frame)
+        result[name] = {
+            "single_row_us": round(single * 1e6, 1),
+            "batch_us_per_row": round((time.perf_counter() - started) / max(len(frame), 1) * 1e6, 2)
+        }
+    result["identical"] = bool(np.array_equal(predictions["sklearn"], predictions["native"]))
+    result["max_abs_diff"] = float(np.max(np.abs(predictions["sklearn"] - predictions["native"]))) if len(frame) else 0.0
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the sklearn and native inference backends")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compare_parser = subparsers.add_parser("compare", help="Check both backends agree and time them")
+    compare_parser.add_argument("--model", required=True, help="Pickled model or pipeline")
+    compare_parser.add_argument("--data", required=True, help="CSV of model input features")
+    compare_parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as f:
+        model = pickle.load(f)
+    frame = pd.read_csv(args.data)
+    result = compare(model, frame, repeats=args.repeats)
+    print(json.dumps(result, indent=2))
+    if not result["identical"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
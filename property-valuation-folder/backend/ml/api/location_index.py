@@ -0,0 +1,242 @@
+"""
+Postal-code and block/street lookup index for HDB addresses.
+
+Built once from the enriched transaction data, it maps a 6-digit postal
+code or a block + street name to the town, region, coordinates,
+nearest-MRT distance and lease commencement year of that block, so the
+HDB service can fill missing request fields without calling OneMap or
+the backend's postal services. Postal codes it has never seen still get
+the most common town and region of their 3-digit postal prefix.
+
+The index is a directory of .npy arrays plus a small meta.json, loaded
+with mmap_mode="r" so every worker process shares the same pages:
+
+    python -m api.location_index build --data ../../../hdb_resale_data_onemap_enriched.csv --out hdb/location_index
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+INDEX_FORMAT_VERSION = 1
+
+META_FILE = "meta.json"
+
+ARRAYS = [
+    "postal_codes", "postal_rows", "block_hashes", "block_rows", "prefixes", "prefix_town", "prefix_region",
+    "town", "region", "latitude", "longitude", "mrt_distance", "lease_commence"
+]
+
+POSTAL_CODE_PATTERN = re.compile(r"(\d{6})\s*$")
+
+
+def parse_postal_code(value: Any) -> Optional[int]:
+    """The 6-digit postal code in a code or address string ("...SINGAPORE 462808"), as an int."""
+    if value is None:
+        return None
+    match = POSTAL_CODE_PATTERN.search(str(value).strip())
+    return int(match.group(1)) if match else None
+
+
+def block_hash(block: Any, street_name: Any) -> Optional[int]:
+    if not block or not street_name:
+        return None
+    key = f"{str(block).strip().upper()}|{str(street_name).strip().upper()}"
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+
+
+def _sorted_keys(keys: np.ndarray, rows: np.ndarray):
+    keys, first = np.unique(keys, return_index=True)
+    return keys, rows[first]
+
+
+class LocationIndex:
+    def __init__(self, arrays: Dict[str, np.ndarray], towns, regions, built_at: float):
+        self.arrays = arrays
+        self.towns = list(towns)
+        self.regions = list(regions)
+        self.built_at = built_at
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def from_transactions(cls, transactions: pd.DataFrame) -> "LocationIndex":
+        """One row per block, taken from its most recent transaction."""
+        frame = transactions.dropna(subset=["block", "street_name", "town"])
+        if "month" in frame:
+            frame = frame.sort_values("month", kind="stable")
+        frame = frame.assign(
+            _block_hash=[block_hash(b, s) for b, s in zip(frame["block"], frame["street_name"])]
+        ).drop_duplicates("_block_hash", keep="last").reset_index(drop=True)
+
+        towns, town_codes = np.unique(frame["town"].astype(str).str.upper().to_numpy(), return_inverse=True)
+        regions, region_codes = np.unique(frame["region"].fillna("").astype(str).to_numpy(), return_inverse=True)
+        rows = np.arange(len(frame), dtype=np.int32)
+
+        postal = np.array([parse_postal_code(address) or -1 for address in frame["geocoded_address"]], dtype=np.int64) \
+            if "geocoded_address" in frame else np.full(len(frame), -1, dtype=np.int64)
+        has_postal = postal >= 0
+        postal_codes, postal_rows = _sorted_keys(postal[has_postal].astype(np.int32), rows[has_postal])
+        block_hashes, block_rows = _sorted_keys(frame["_block_hash"].to_numpy(dtype=np.uint64), rows)
+
+        prefix_frame = pd.DataFrame({
+            "prefix": postal[has_postal] // 1000, "town": town_codes[has_postal], "region": region_codes[has_postal]
+        })
+        prefix_mode = prefix_frame.groupby("prefix")[["town", "region"]].agg(lambda codes: codes.value_counts().index[0])
+
+        lease = pd.to_numeric(frame.get("lease_commence_date"), errors="coerce")
+        arrays = {
+            "postal_codes": postal_codes,
+            "postal_rows": postal_rows,
+            "block_hashes": block_hashes,
+            "block_rows": block_rows,
+            "prefixes": prefix_mode.index.to_numpy(dtype=np.int32),
+            "prefix_town": prefix_mode["town"].to_numpy(dtype=np.int16),
+            "prefix_region": prefix_mode["region"].to_numpy(dtype=np.int16),
+            "town": town_codes.astype(np.int16),
+            "region": region_codes.astype(np.int16),
+            "latitude": pd.to_numeric(frame["latitude"], errors="coerce").to_numpy(dtype=np.float64),
+            "longitude": pd.to_numeric(frame["longitude"], errors="coerce").to_numpy(dtype=np.float64),
+            "mrt_distance": pd.to_numeric(frame["nearest_mrt_distance_km"], errors="coerce").to_numpy(dtype=np.float32),
+            "lease_commence": np.nan_to_num(lease.to_numpy(dtype=float), nan=-1).astype(np.int16)
+        }
+        return cls(arrays, towns, regions, time.time())
+
+    @classmethod
+    def from_csv(cls, path: str) -> "LocationIndex":
+        columns = [
+            "month", "town", "block", "street_name", "lease_commence_date", "latitude", "longitude",
+            "geocoded_address", "nearest_mrt_distance_km", "region"
+        ]
+        return cls.from_transactions(pd.read_csv(path, usecols=lambda column: column in columns))
+
+    def __len__(self) -> int:
+        return len(self.town)
+
+    def save(self, path: str) -> None:
+        """Write to a sibling temp directory and swap it in, so readers never see a partial index."""
+        tmp_path = f"{path.rstrip(os.sep)}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name in ARRAYS:
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(self.arrays[name]))
+        with open(os.path.join(tmp_path, META_FILE), "w") as f:
+            json.dump({
+                "format_version": INDEX_FORMAT_VERSION,
+                "towns": self.towns,
+                "regions": self.regions,
+                "built_at": self.built_at
+            }, f, indent=2)
+        if os.path.isdir(path):
+            old_path = f"{path.rstrip(os.sep)}.old"
+            shutil.rmtree(old_path, ignore_errors=True)
+            os.replace(path, old_path)
+            os.replace(tmp_path, path)
+            shutil.rmtree(old_path, ignore_errors=True)
+        else:
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LocationIndex":
+        with open(os.path.join(path, META_FILE), "r") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported location index format {meta.get('format_version')} at {path}")
+        # Plain ndarray views of the maps: same shared pages, without np.memmap's per-call overhead.
+        arrays = {
+            name: np.asarray(np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r", allow_pickle=False))
+            for name in ARRAYS
+        }
+        return cls(arrays, meta["towns"], meta["regions"], meta["built_at"])
+
+    @staticmethod
+    def _find(keys: np.ndarray, key: int) -> int:
+        position = int(np.searchsorted(keys, key))
+        if position < len(keys) and keys[position] == key:
+            return position
+        return -1
+
+    def _record(self, row: int) -> Dict[str, Any]:
+        latitude, longitude = float(self.latitude[row]), float(self.longitude[row])
+        mrt_distance = float(self.mrt_distance[row])
+        lease_commence = int(self.lease_commence[row])
+        return {
+            "town": self.towns[self.town[row]],
+            "region": self.regions[self.region[row]] or None,
+            "latitude": None if latitude != latitude else latitude,
+            "longitude": None if longitude != longitude else longitude,
+            "distance_to_mrt": None if mrt_distance != mrt_distance else mrt_distance,
+            "lease_commence_date": lease_commence if lease_commence > 0 else None,
+            "match": "block"
+        }
+
+    def lookup(self, postal_code: Any = None, block: Optional[str] = None,
+               street_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Location of an address: exact block/street or postal code first, then the postal prefix (town and region only)."""
+        key = block_hash(block, street_name)
+        if key is not None:
+            position = self._find(self.block_hashes, np.uint64(key))
+            if position >= 0:
+                return self._record(int(self.block_rows[position]))
+
+        code = parse_postal_code(postal_code)
+        if code is None:
+            return None
+        position = self._find(self.postal_codes, code)
+        if position >= 0:
+            record = self._record(int(self.postal_rows[position]))
+            record["match"] = "postal_code"
+            return record
+
+        position = self._find(self.prefixes, code // 1000)
+        if position < 0:
+            return None
+        return {
+            "town": self.towns[self.prefix_town[position]],
+            "region": self.regions[self.prefix_region[position]] or None,
+            "match": "postal_prefix"
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "blocks": len(self),
+            "postal_codes": len(self.postal_codes),
+            "postal_prefixes": len(self.prefixes),
+            "towns": len(self.towns),
+            "built_at": self.built_at
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the HDB postal-code and block lookup index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Build an index from an enriched transaction CSV")
+    build.add_argument("--data", required=True)
+    build.add_argument("--out", required=True)
+
+    lookup = subparsers.add_parser("lookup", help="Look up one address")
+    lookup.add_argument("--index", required=True)
+    lookup.add_argument("--postal-code")
+    lookup.add_argument("--block")
+    lookup.add_argument("--street-name")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        index = LocationIndex.from_csv(args.data)
+        index.save(args.out)
+        print(json.dumps(index.stats(), indent=2))
+    else:
+        index = LocationIndex.load(args.index)
+        print(json.dumps(index.lookup(args.postal_code, args.block, args.street_name), indent=2))
+
+
+if __name__ == "__main__":
+    main()
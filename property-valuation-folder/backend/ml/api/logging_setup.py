@@ -0,0 +1,126 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, Dict, Optional
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", "0.01"))
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`.
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+_request_sampled: contextvars.ContextVar[Optional[bool]] = contextvars.ContextVar("log_request_sampled", default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    def __init__(self, service: str):
+        super().__init__()
+        self.service = service
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "service": self.service,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Puts records on a bounded queue without formatting them; the listener
+    thread does all formatting and I/O. When the queue is full the record
+    is dropped and counted rather than blocking the event loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(service: str) -> None:
+    """Route the root logger through a background listener thread. Safe to call from several modules."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter(service))
+    else:
+        stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    root = logging.getLogger()
+    root.handlers = [NonBlockingQueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def dropped_records() -> int:
+    return sum(getattr(handler, "dropped", 0) for handler in logging.getLogger().handlers)
+
+
+def request_sampled() -> bool:
+    """Whether debug payloads are logged for the current request (or, outside a request, this context)."""
+    sampled = _request_sampled.get()
+    if sampled is None:
+        sampled = random.random() < LOG_DEBUG_SAMPLE_RATE
+        _request_sampled.set(sampled)
+    return sampled
+
+
+class RequestSamplingMiddleware:
+    """Makes one sampling decision per HTTP request so a sampled request logs all of its payloads."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _request_sampled.set(random.random() < LOG_DEBUG_SAMPLE_RATE)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_sampled.reset(token)
+
+
+def log_payload(logger: logging.Logger, message: str, build: Callable[[], Dict[str, Any]]) -> None:
+    """
+    Log a per-request debug payload. `build` only runs when DEBUG is
+    enabled and the request is sampled, so the hot path pays for one
+    level check otherwise.
+    """
+    if not logger.isEnabledFor(logging.DEBUG) or not request_sampled():
+        return
+    logger.debug(message, extra={"payload": build()})
@@ -0,0 +1,303 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in values:
+            yield f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def set(self, *label_values: str, value: float) -> None:
+        with self._lock:
+            self._values[label_values] = value
+
+    def dec(self, *label_values: str, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram:
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        # Per-series layout: one non-cumulative count per bucket plus +Inf, then sum.
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *label_values: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            series = [(label_values, list(values)) for label_values, values in self._series.items()]
+        for label_values, values in series:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                cumulative += count
+                labels = _format_labels(self.label_names, label_values, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {_format_value(cumulative)}"
+            labels = _format_labels(self.label_names, label_values)
+            yield f"{self.name}_sum{labels} {_format_value(values[-1])}"
+            yield f"{self.name}_count{labels} {_format_value(cumulative)}"
+
+
+class _Callback:
+    def __init__(self, name: str, type_name: str, documentation: str, label_names: Sequence[str]):
+        self.name = name
+        self.type_name = type_name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.collectors: List[Callable[[], Iterable[Tuple[LabelValues, float]]]] = []
+
+    def samples(self) -> Iterable[str]:
+        for collect in self.collectors:
+            for label_values, value in collect():
+                yield f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    """
+    Minimal Prometheus text-format registry. Metrics are get-or-create by
+    name so several services mounted in one process share a family and
+    tell themselves apart by their "service" label.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, name: str, factory: Callable[[], Any]):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(name, lambda: Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(name, lambda: Gauge(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(name, lambda: Histogram(name, documentation, label_names, buckets))
+
+    def register_callback(self, name: str, type_name: str, documentation: str, label_names: Sequence[str],
+                          collect: Callable[[], Iterable[Tuple[LabelValues, float]]]) -> None:
+        """Register a family whose samples are read at scrape time, e.g. model-loaded flags."""
+        callback = self._get_or_create(name, lambda: _Callback(name, type_name, documentation, label_names))
+        callback.collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "valuation_stage_duration_seconds",
+    "Time spent in each stage of a valuation request",
+    ["service", "stage"]
+)
+REQUEST_SECONDS = REGISTRY.histogram(
+    "valuation_http_request_duration_seconds",
+    "End-to-end HTTP request latency",
+    ["service", "method", "route", "status"]
+)
+IN_FLIGHT = REGISTRY.gauge(
+    "valuation_http_requests_in_flight",
+    "HTTP requests currently being handled",
+    ["service"]
+)
+PREDICTIONS = REGISTRY.counter(
+    "valuation_predictions_total",
+    "Valuations served, by calculation method",
+    ["service", "calculation_method"]
+)
+
+
+class RequestTiming:
+    __slots__ = ("started", "handler_started", "handler_finished")
+
+    def __init__(self, started: float):
+        self.started = started
+        self.handler_started: Optional[float] = None
+        self.handler_finished: Optional[float] = None
+
+
+_request_timing: contextvars.ContextVar[Optional[RequestTiming]] = contextvars.ContextVar(
+    "valuation_request_timing", default=None
+)
+
+
+class ServiceMetrics:
+    """Stage timers and request accounting for one service ("hdb" or "private")."""
+
+    def __init__(self, service: str, registry: MetricsRegistry = REGISTRY):
+        self.service = service
+        self.registry = registry
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - started, self.service, name)
+
+    def observe_stage(self, name: str, seconds: float) -> None:
+        STAGE_SECONDS.observe(seconds, self.service, name)
+
+    def count_prediction(self, calculation_method: str, amount: int = 1) -> None:
+        PREDICTIONS.inc(self.service, calculation_method, amount=amount)
+
+    @contextmanager
+    def handler(self):
+        """
+        Wraps an endpoint body. The gap between the middleware seeing the
+        request and the handler starting is body parsing plus pydantic
+        validation; the gap after the handler returns is response
+        serialization.
+        """
+        timing = _request_timing.get()
+        if timing is not None:
+            timing.handler_started = time.perf_counter()
+            self.observe_stage("validation", timing.handler_started - timing.started)
+        try:
+            with self.stage("handler"):
+                yield
+        finally:
+            if timing is not None:
+                timing.handler_finished = time.perf_counter()
+
+    def register_model_flags(self, collect: Callable[[], Dict[str, bool]]) -> None:
+        self.registry.register_callback(
+            "valuation_model_loaded",
+            "gauge",
+            "Whether each model component is loaded (1) or missing (0)",
+            ["service", "component"],
+            lambda: [((self.service, component), float(bool(loaded))) for component, loaded in collect().items()]
+        )
+
+    def register_stats(self, name: str, documentation: str, collect: Callable[[], Dict[str, float]],
+                       type_name: str = "gauge") -> None:
+        self.registry.register_callback(
+            name, type_name, documentation, ["service", "kind"],
+            lambda: [((self.service, kind), float(value)) for kind, value in collect().items()]
+        )
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: in-flight gauge, request latency and the serialization stage."""
+
+    def __init__(self, app, service: str):
+        self.app = app
+        self.service = service
+        self._routes: Optional[set] = None
+
+    def _route(self, scope) -> str:
+        if self._routes is None:
+            app = scope.get("app")
+            self._routes = {getattr(route, "path", None) for route in getattr(app, "routes", [])}
+        path = scope.get("path", "")
+        return path if path in self._routes else "other"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming(time.perf_counter())
+        token = _request_timing.set(timing)
+        status = [500]
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if timing.handler_finished is not None:
+                    STAGE_SECONDS.observe(time.perf_counter() - timing.handler_finished,
+                                          self.service, "serialization")
+            await send(message)
+
+        IN_FLIGHT.inc(self.service)
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            IN_FLIGHT.dec(self.service)
+            _request_timing.reset(token)
+            REQUEST_SECONDS.observe(time.perf_counter() - timing.started, self.service, scope["method"],
+                                    self._route(scope), str(status[0]))
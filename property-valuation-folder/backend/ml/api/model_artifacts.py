@@ -0,0 +1,353 @@
+"""
+Versioned, pickle-free model artifacts for the valuation services.
+
+An artifact directory holds the booster in its native format plus a
+manifest.json with the fitted preprocessing, feature lists and side
+tables (correction factors, confidence intervals, town-to-region map):
+
+    artifact/
+        manifest.json
+        booster.ubj      (XGBoost)  or  booster.txt  (LightGBM)
+
+Export from the pickles the services load today:
+
+    python -m api.model_artifacts export-hdb --model-dir hdb --out hdb/artifact
+    python -m api.model_artifacts export-private --model-dir private --out private/artifact
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+
+def is_artifact_dir(path: Optional[str]) -> bool:
+    return bool(path) and os.path.exists(os.path.join(path, MANIFEST_NAME))
+
+
+def _content_hash(artifact_dir: str, files: List[str], metadata: Dict[str, Any]) -> str:
+    digest = hashlib.sha256()
+    for name in sorted(files):
+        digest.update(name.encode())
+        with open(os.path.join(artifact_dir, name), "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    digest.update(json.dumps(metadata, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+def _to_list(values) -> List[Any]:
+    return [value.item() if isinstance(value, np.generic) else value for value in values]
+
+
+def _resolve_columns(column_transformer, columns) -> List[str]:
+    if isinstance(columns, str):
+        return [columns]
+    columns = list(columns)
+    if all(isinstance(column, str) for column in columns):
+        return columns
+    names = list(column_transformer.feature_names_in_)
+    if all(isinstance(column, (int, np.integer)) and not isinstance(column, bool) for column in columns):
+        return [names[column] for column in columns]
+    if all(isinstance(column, (bool, np.bool_)) for column in columns):
+        return [name for name, keep in zip(names, columns) if keep]
+    raise ValueError(f"Unsupported column specification: {columns!r}")
+
+
+def _extract_step(transformer) -> List[Dict[str, Any]]:
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler
+    from sklearn.impute import SimpleImputer
+
+    if transformer == "passthrough" or transformer is None:
+        return [{"kind": "passthrough"}]
+    if isinstance(transformer, Pipeline):
+        steps = []
+        for _, step in transformer.steps:
+            steps.extend(_extract_step(step))
+        return steps
+    if isinstance(transformer, OneHotEncoder):
+        if transformer.drop is not None or transformer.handle_unknown not in ("ignore", "error"):
+            raise ValueError("Only OneHotEncoder(drop=None, handle_unknown='ignore'|'error') can be exported")
+        if getattr(transformer, "infrequent_categories_", None) and any(
+                c is not None for c in transformer.infrequent_categories_):
+            raise ValueError("OneHotEncoder with infrequent categories cannot be exported")
+        return [{
+            "kind": "onehot",
+            "categories": [_to_list(categories) for categories in transformer.categories_],
+            "handle_unknown": transformer.handle_unknown
+        }]
+    if isinstance(transformer, OrdinalEncoder):
+        return [{
+            "kind": "ordinal",
+            "categories": [_to_list(categories) for categories in transformer.categories_],
+            "unknown_value": None if transformer.unknown_value is None or np.isnan(transformer.unknown_value)
+            else float(transformer.unknown_value)
+        }]
+    if isinstance(transformer, StandardScaler):
+        return [{
+            "kind": "standard_scaler",
+            "mean": None if transformer.mean_ is None else transformer.mean_.tolist(),
+            "scale": None if transformer.scale_ is None else transformer.scale_.tolist()
+        }]
+    if isinstance(transformer, SimpleImputer):
+        return [{"kind": "imputer", "statistics": _to_list(transformer.statistics_)}]
+    raise ValueError(f"Unsupported preprocessing step: {type(transformer).__name__}")
+
+
+def extract_preprocessing(model) -> Dict[str, Any]:
+    """Describe the fitted preprocessing in front of the booster as plain JSON data."""
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+
+    if not isinstance(model, Pipeline):
+        return {"type": "identity", "input_features": _to_list(getattr(model, "feature_names_in_", []))}
+
+    if len(model.steps) != 2 or not isinstance(model.steps[0][1], ColumnTransformer):
+        raise ValueError("Only Pipeline([ColumnTransformer, estimator]) pipelines can be exported")
+
+    column_transformer = model.steps[0][1]
+    transformers = []
+    for name, transformer, columns in column_transformer.transformers_:
+        if transformer == "drop":
+            continue
+        resolved = _resolve_columns(column_transformer, columns)
+        if not resolved:
+            continue
+        transformers.append({"name": name, "columns": resolved, "steps": _extract_step(transformer)})
+
+    return {
+        "type": "column_transformer",
+        "input_features": _to_list(column_transformer.feature_names_in_),
+        "sparse_output": bool(getattr(column_transformer, "sparse_output_", False)),
+        "transformers": transformers
+    }
+
+
+def _final_estimator(model):
+    from sklearn.pipeline import Pipeline
+    return model.steps[-1][1] if isinstance(model, Pipeline) else model
+
+
+def _save_booster(estimator, artifact_dir: str) -> Dict[str, Any]:
+    module = type(estimator).__module__
+    if module.startswith("xgboost"):
+        filename = "booster.ubj"
+        estimator.save_model(os.path.join(artifact_dir, filename))
+        return {"library": "xgboost", "file": filename, "estimator": type(estimator).__name__}
+    if module.startswith("lightgbm"):
+        filename = "booster.txt"
+        estimator.booster_.save_model(os.path.join(artifact_dir, filename))
+        best_iteration = getattr(estimator, "best_iteration_", None)
+        return {
+            "library": "lightgbm",
+            "file": filename,
+            "estimator": type(estimator).__name__,
+            "best_iteration": int(best_iteration) if best_iteration else None
+        }
+    raise ValueError(f"Unsupported estimator for artifact export: {type(estimator).__name__}")
+
+
+def export_artifact(model, artifact_dir: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    os.makedirs(artifact_dir, exist_ok=True)
+    preprocessing = extract_preprocessing(model)
+    booster = _save_booster(_final_estimator(model), artifact_dir)
+
+    body = {"preprocessing": preprocessing, "booster": booster, "metadata": metadata}
+    manifest = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "content_hash": _content_hash(artifact_dir, [booster["file"]], body),
+        **body
+    }
+    with open(os.path.join(artifact_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class Preprocessor:
+    """Applies an exported preprocessing spec to a DataFrame, mirroring the fitted ColumnTransformer."""
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.spec = spec
+        self.input_features = list(spec.get("input_features", []))
+        self.sparse_output = spec.get("sparse_output", False)
+        self.transformers = spec.get("transformers", [])
+
+    def _apply_steps(self, values: np.ndarray, steps: List[Dict[str, Any]]) -> np.ndarray:
+        for step in steps:
+            kind = step["kind"]
+            if kind == "passthrough":
+                continue
+            if kind == "imputer":
+                values = values.copy()
+                for j, statistic in enumerate(step["statistics"]):
+                    column = pd.isna(values[:, j])
+                    values[column, j] = statistic
+            elif kind == "standard_scaler":
+                values = values.astype(np.float64)
+                if step["mean"] is not None:
+                    values = values - np.asarray(step["mean"])
+                if step["scale"] is not None:
+                    values = values / np.asarray(step["scale"])
+            elif kind == "onehot":
+                blocks = []
+                for j, categories in enumerate(step["categories"]):
+                    lookup = {category: i for i, category in enumerate(categories)}
+                    codes = np.array([lookup.get(value, -1) for value in values[:, j]])
+                    if step["handle_unknown"] == "error" and (codes < 0).any():
+                        raise ValueError(f"Found unknown categories in column {j} during transform")
+                    block = np.zeros((len(values), len(categories)), dtype=np.float64)
+                    known = codes >= 0
+                    block[np.nonzero(known)[0], codes[known]] = 1.0
+                    blocks.append(block)
+                values = np.hstack(blocks) if blocks else np.empty((len(values), 0))
+            elif kind == "ordinal":
+                columns = []
+                for j, categories in enumerate(step["categories"]):
+                    lookup = {category: float(i) for i, category in enumerate(categories)}
+                    unknown = np.nan if step["unknown_value"] is None else step["unknown_value"]
+                    columns.append([lookup.get(value, unknown) for value in values[:, j]])
+                values = np.array(columns, dtype=np.float64).T
+            else:
+                raise ValueError(f"Unknown preprocessing step: {kind}")
+        return values
+
+    def transform(self, df: pd.DataFrame):
+        if self.spec["type"] == "identity":
+            columns = self.input_features or list(df.columns)
+            return df[columns].to_numpy(dtype=np.float64)
+
+        blocks = [
+            np.asarray(self._apply_steps(df[transformer["columns"]].to_numpy(), transformer["steps"]), dtype=np.float64)
+            for transformer in self.transformers
+        ]
+        matrix = np.hstack(blocks)
+        if self.sparse_output:
+            from scipy import sparse
+            return sparse.csr_matrix(matrix)
+        return matrix
+
+
+class ArtifactModel:
+    """Predictor rebuilt from an artifact; exposes the same predict(DataFrame) call as the pickled model."""
+
+    def __init__(self, preprocessor: Preprocessor, booster_info: Dict[str, Any], estimator):
+        self.preprocessor = preprocessor
+        self.booster_info = booster_info
+        self.estimator = estimator
+        if preprocessor.input_features:
+            self.feature_names_in_ = np.array(preprocessor.input_features, dtype=object)
+
+    def predict(self, X) -> np.ndarray:
+        if isinstance(X, pd.DataFrame):
+            matrix = self.preprocessor.transform(X)
+        elif self.preprocessor.spec["type"] == "identity":
+            matrix = np.asarray(X, dtype=np.float64)
+        else:
+            matrix = self.preprocessor.transform(pd.DataFrame(np.asarray(X), columns=self.preprocessor.input_features))
+        if self.booster_info["library"] == "lightgbm":
+            return self.estimator.predict(matrix, num_iteration=self.booster_info.get("best_iteration"))
+        return self.estimator.predict(matrix)
+
+
+class ModelArtifact:
+    def __init__(self, artifact_dir: str, manifest: Dict[str, Any], model: ArtifactModel):
+        self.artifact_dir = artifact_dir
+        self.manifest = manifest
+        self.model = model
+        self.metadata = manifest.get("metadata", {})
+        self.content_hash = manifest["content_hash"]
+
+
+def _load_booster(artifact_dir: str, booster_info: Dict[str, Any]):
+    path = os.path.join(artifact_dir, booster_info["file"])
+    if booster_info["library"] == "xgboost":
+        import xgboost
+        estimator = getattr(xgboost, booster_info.get("estimator", "XGBRegressor"))()
+        estimator.load_model(path)
+        return estimator
+    if booster_info["library"] == "lightgbm":
+        import lightgbm
+        return lightgbm.Booster(model_file=path)
+    raise ValueError(f"Unsupported booster library: {booster_info['library']}")
+
+
+def load_artifact(artifact_dir: str, verify: bool = True) -> ModelArtifact:
+    with open(os.path.join(artifact_dir, MANIFEST_NAME), "r") as f:
+        manifest = json.load(f)
+
+    if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version: {manifest.get('format_version')}")
+
+    booster_info = manifest["booster"]
+    if verify:
+        body = {key: manifest[key] for key in ("preprocessing", "booster", "metadata")}
+        content_hash = _content_hash(artifact_dir, [booster_info["file"]], body)
+        if content_hash != manifest["content_hash"]:
+            raise ValueError(f"Artifact content hash mismatch in {artifact_dir}: "
+                             f"{content_hash} != {manifest['content_hash']}")
+
+    model = ArtifactModel(Preprocessor(manifest["preprocessing"]), booster_info, _load_booster(artifact_dir, booster_info))
+    return ModelArtifact(artifact_dir, manifest, model)
+
+
+def _load_optional_json(path: str) -> Optional[Any]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def export_hdb_artifact(model_dir: str, artifact_dir: str) -> Dict[str, Any]:
+    with open(os.path.join(model_dir, "hdb_deployment_pipeline.pkl"), "rb") as f:
+        model = pickle.load(f)
+    with open(os.path.join(model_dir, "hdb_feature_lists.pkl"), "rb") as f:
+        feature_lists = pickle.load(f)
+
+    metadata = {
+        "service": "hdb",
+        "feature_lists": {key: list(value) for key, value in feature_lists.items()},
+        "correction_factors": _load_optional_json(os.path.join(model_dir, "correction_factors.json")),
+        "confidence_intervals": _load_optional_json(os.path.join(model_dir, "confidence_intervals.json")),
+        "town_to_region": _load_optional_json(os.path.join(model_dir, "town_to_region.json")),
+        "conformal_intervals": _load_optional_json(os.path.join(model_dir, "conformal_intervals.json"))
+    }
+    return export_artifact(model, artifact_dir, metadata)
+
+
+def export_private_artifact(model_dir: str, artifact_dir: str) -> Dict[str, Any]:
+    with open(os.path.join(model_dir, "property_valuation_xgboost.pkl"), "rb") as f:
+        model = pickle.load(f)
+
+    feature_names = getattr(model, "feature_names_in_", None)
+    metadata = {
+        "service": "private",
+        "feature_names": None if feature_names is None else [str(name) for name in feature_names],
+        "conformal_intervals": _load_optional_json(os.path.join(model_dir, "conformal_intervals.json"))
+    }
+    return export_artifact(model, artifact_dir, metadata)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export valuation models to the native artifact format")
+    parser.add_argument("command", choices=["export-hdb", "export-private"])
+    parser.add_argument("--model-dir", required=True, help="Directory containing the pickled model files")
+    parser.add_argument("--out", required=True, help="Artifact directory to write")
+    args = parser.parse_args()
+
+    if args.command == "export-hdb":
+        manifest = export_hdb_artifact(args.model_dir, args.out)
+    else:
+        manifest = export_private_artifact(args.model_dir, args.out)
+    print(f"Wrote {args.out} (content hash {manifest['content_hash']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Versioned model registry and zero-downtime hot swap.
+
+A registry is a directory with one subdirectory per model version, each
+holding either a model artifact (see api.model_artifacts) or the legacy
+pickle/JSON files, plus an active.json that records the active version
+and the activation history used for rollback:
+
+    registry/
+        2026-10-01/        hdb_deployment_pipeline.pkl, hdb_feature_lists.pkl, ...
+        2026-10-18/        manifest.json, booster.ubj
+        active.json        {"active": "2026-10-18", "history": ["2026-10-01"]}
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_FILE = "active.json"
+MAX_HISTORY = 20
+
+
+class ModelRegistry:
+    def __init__(self, root: str):
+        self.root = root
+
+    def versions(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.isdir(os.path.join(self.root, name)) and not name.startswith(".")
+        )
+
+    def path(self, version: str) -> str:
+        path = os.path.join(self.root, version)
+        if os.path.dirname(os.path.abspath(path)) != os.path.abspath(self.root) or not os.path.isdir(path):
+            raise KeyError(f"Unknown model version: {version}")
+        return path
+
+    def _read_state(self) -> Dict[str, Any]:
+        path = os.path.join(self.root, ACTIVE_FILE)
+        if not os.path.exists(path):
+            return {"active": None, "history": []}
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def active(self) -> Optional[str]:
+        return self._read_state().get("active")
+
+    def history(self) -> List[str]:
+        return list(self._read_state().get("history", []))
+
+    def previous(self) -> Optional[str]:
+        history = self.history()
+        return history[-1] if history else None
+
+    def activate(self, version: str, rollback: bool = False) -> None:
+        """Record `version` as active. A rollback pops the history instead of pushing onto it."""
+        state = self._read_state()
+        history = state.get("history", [])
+        if rollback:
+            if history and history[-1] == version:
+                history.pop()
+        elif state.get("active") and state["active"] != version:
+            history = (history + [state["active"]])[-MAX_HISTORY:]
+        state = {"active": version, "history": history, "activated_at": time.time()}
+
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = os.path.join(self.root, f".{ACTIVE_FILE}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.root, ACTIVE_FILE))
+
+
+def _wake(waiter) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class SwapGate:
+    """
+    Counts requests that use the model. A swap closes the gate to new
+    requests, waits for in-flight ones to finish on the old model, applies
+    the change and reopens the gate, so no request sees a mix of versions.
+    """
+
+    def __init__(self, drain_timeout: float = 10.0):
+        self.drain_timeout = drain_timeout
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._swapping = False
+        # Futures of async requests waiting for the gate to reopen, with the loop each belongs to
+        self._waiters: List[Any] = []
+
+    @asynccontextmanager
+    async def request(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if not self._swapping:
+                    self._in_flight += 1
+                    break
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            await waiter
+        try:
+            yield
+        finally:
+            self._release()
+
+    @contextmanager
+    def request_sync(self):
+        with self._cond:
+            self._cond.wait_for(lambda: not self._swapping)
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def swap(self, apply: Callable[[], Any]) -> Any:
+        with self._cond:
+            self._cond.wait_for(lambda: not self._swapping)
+            self._swapping = True
+            drained = self._cond.wait_for(lambda: self._in_flight == 0, timeout=self.drain_timeout)
+        try:
+            if not drained:
+                raise TimeoutError(f"{self._in_flight} requests still in flight after {self.drain_timeout}s")
+            return apply()
+        finally:
+            with self._cond:
+                self._swapping = False
+                self._cond.notify_all()
+                waiters, self._waiters = self._waiters, []
+            for loop, waiter in waiters:
+                try:
+                    loop.call_soon_threadsafe(_wake, waiter)
+                except RuntimeError:
+                    pass  # the loop is closed, nobody is waiting on it any more
+
+
+
+class ModelHotSwapper:
+    """
+    Loads a registry version in the background and swaps it in through the
+    gate. `read(version, path)` does the expensive loading without touching
+    the live model and returns its components; `warm_up(components)`
+    builds the derived components (fast path, backend) on that staged copy
+    and must succeed before anything goes live; `install(components)` then
+    only swaps references while the gate is closed.
+    """
+
+    def __init__(self, name: str, registry: ModelRegistry, gate: SwapGate,
+                 read: Callable[[str, str], Dict[str, Any]],
+                 install: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 warm_up: Callable[[Dict[str, Any]], bool]):
+        self.name = name
+        self.registry = registry
+        self.gate = gate
+        self.read = read
+        self.install = install
+        self.warm_up = warm_up
+        self.loading_version: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.last_swap: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def _swap(self, version: str, rollback: bool) -> None:
+        started = time.perf_counter()
+        try:
+            components = self.read(version, self.registry.path(version))
+            loaded = time.perf_counter()
+            if not self.warm_up(components):
+                raise RuntimeError(f"warm-up of version {version} failed, kept the previous model")
+            warmed = time.perf_counter()
+
+            self.gate.swap(lambda: self.install(components))
+            self.registry.activate(version, rollback=rollback)
+            self.last_error = None
+            self.last_swap = {
+                "version": version,
+                "rollback": rollback,
+                "load_seconds": round(loaded - started, 4),
+                "warm_up_seconds": round(warmed - loaded, 4),
+                "swap_seconds": round(time.perf_counter() - warmed, 4),
+                "at": time.time()
+            }
+            logger.info(f"{self.name} model swapped to version {version}: {self.last_swap}")
+        except Exception as e:
+            logger.exception(f"{self.name} model swap to version {version} failed: {str(e)}")
+            self.last_error = str(e)
+        finally:
+            self.loading_version = None
+
+    def _run_locked(self, version: str, rollback: bool) -> None:
+        try:
+            self._swap(version, rollback)
+        finally:
+            self._lock.release()
+
+    def swap(self, version: str, rollback: bool = False) -> bool:
+        """Swap synchronously; True if the version is live afterwards."""
+        with self._lock:
+            self.loading_version = version
+            self._swap(version, rollback)
+        return self.last_error is None
+
+    def start(self, version: str, rollback: bool = False) -> bool:
+        """Begin a background swap; False if one is already running."""
+        if not self._lock.acquire(blocking=False):
+            return False
+        self.loading_version = version
+        threading.Thread(
+            target=self._run_locked, args=(version, rollback), name=f"{self.name}-model-swap", daemon=True
+        ).start()
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "registry": self.registry.root,
+            "versions": self.registry.versions(),
+            "active": self.registry.active(),
+            "history": self.registry.history(),
+            "loading_version": self.loading_version,
+            "last_swap": self.last_swap,
+            "last_error": self.last_error
+        }
+
+
+def build_admin_router(swapper: ModelHotSwapper, current_version: Callable[[], Optional[str]]):
+    """/admin/models endpoints (status, reload, rollback) for one service's hot swapper."""
+    from fastapi import APIRouter, Header, HTTPException
+    from pydantic import BaseModel
+
+    from api.common import check_admin_token
+
+    class ModelReloadRequest(BaseModel):
+        version: Optional[str] = None
+
+    router = APIRouter()
+
+    @router.get("")
+    async def model_status(x_admin_token: Optional[str] = Header(None)):
+        check_admin_token(x_admin_token)
+        return {"model_version": current_version(), **swapper.status()}
+
+    @router.post("/reload", status_code=202)
+    async def reload_model(request: ModelReloadRequest, x_admin_token: Optional[str] = Header(None)):
+        check_admin_token(x_admin_token)
+        versions = swapper.registry.versions()
+        version = request.version or (versions[-1] if versions else None)
+        if version is None or version not in versions:
+            raise HTTPException(status_code=404, detail=f"Unknown model version: {version}")
+        if not swapper.start(version):
+            raise HTTPException(status_code=409, detail=f"A model swap to {swapper.loading_version} is already running")
+        return {"status": "loading", "version": version}
+
+    @router.post("/rollback", status_code=202)
+    async def rollback_model(x_admin_token: Optional[str] = Header(None)):
+        check_admin_token(x_admin_token)
+        version = swapper.registry.previous()
+        if version is None:
+            raise HTTPException(status_code=409, detail="No previous model version to roll back to")
+        if not swapper.start(version, rollback=True):
+            raise HTTPException(status_code=409, detail=f"A model swap to {swapper.loading_version} is already running")
+        return {"status": "loading", "version": version, "rollback": True}
+
+    return router
@@ -0,0 +1,131 @@
+import asyncio
+import hashlib
+import inspect
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+
+def artifact_hash(paths: Iterable[str]) -> str:
+    """Content hash over the model artifact files that exist, used as the model version."""
+    digest = hashlib.sha256()
+    for path in paths:
+        if not path or not os.path.exists(path):
+            continue
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+class PredictionCache:
+    """
+    In-process LRU cache with a TTL for valuation responses. Concurrent
+    misses on the same key share one computation instead of each calling
+    the model.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 600.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.collapsed = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Any],
+                             cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Cached value for `key`, or the result of `compute()`. Results for
+        which `cacheable(result)` is false are returned but not stored.
+        """
+        if not self.enabled:
+            result = compute()
+            return await result if inspect.isawaitable(result) else result
+
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.collapsed += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        # The computation runs as its own task, so cancelling the request
+        # that started it does not cancel it for the collapsed waiters
+        task = asyncio.ensure_future(self._compute(key, compute, cacheable))
+        self._pending[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: Hashable, compute: Callable[[], Any],
+                       cacheable: Optional[Callable[[Any], bool]]) -> Any:
+        result = compute()
+        if inspect.isawaitable(result):
+            result = await result
+        if cacheable is None or cacheable(result):
+            self.put(key, result)
+        return result
+
+    def _finish(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._pending.get(key) is task:
+            del self._pending[key]
+        if not task.cancelled():
+            # Retrieve the exception so a failure nobody awaited is not logged as unhandled
+            task.exception()
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def discard(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches, e.g. all keys of a model version that was swapped out."""
+        stale = [key for key in list(self._entries) if predicate(key)]
+        for key in stale:
+            self._entries.pop(key, None)
+        return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "collapsed": self.collapsed,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
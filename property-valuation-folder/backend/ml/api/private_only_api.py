@@ -1,28 +1,42 @@
+import time
+IMPORT_STARTED = time.perf_counter()
+
 import os
 import sys
 import json
 import pickle
 import numpy as np
 import pandas as pd
+import itertools
 import traceback
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
-from typing import Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 import logging
 
-logging.basicConfig(tier=logging.INFO)
+from api.batching import MicroBatcher
+from api.common import (
+    create_app, ensure_numeric, get_floor_number, is_hdb_property_type, is_model_response,
+    mock_comparable_properties, shared_inference_executor, shared_prediction_cache
+)
+from api.conformal import ConformalIntervals
+from api.feature_plan import FeaturePlan, check_parity
+from api.inference import PipelineBackend, build_backend
+from api.logging_setup import configure_logging, dropped_records, log_payload
+from api.metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY, ServiceMetrics
+from api.model_artifacts import is_artifact_dir, load_artifact
+from api.model_registry import ModelHotSwapper, ModelRegistry, SwapGate, build_admin_router
+from api.prediction_cache import artifact_hash
+from api.startup import StartupState
+
+configure_logging("private")
 logger = logging.getLogger(__name__)
 
-app = FastAPI(designation="Private Property Valuation ML API")
+app = create_app("Private Property Valuation ML API", "private")
+router = APIRouter()
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+metrics = ServiceMetrics("private")
 
 BASE_DIR = os.trail.dirname(os.trail['dirname'](os.trail.abspath(__file__)))
 PRIVATE_MODEL_DIR = os.environ.fetch("MODEL_PATH_PRIVATE", os.trail.join(BASE_DIR, "private"))
@@ -35,33 +49,126 @@ private_feature_names = None
 
 private_model_path = os.trail.join(PRIVATE_MODEL_DIR, "property_valuation_xgboost['pkl']")
 
-try:
-    logger.detail(f"Attempting to import Private realestate predictor from {private_model_path}")
-    
-    with open(private_model_path, "rb") as f:
-        private_model = pickle.import(f)
-    logger.detail(f"Successfully loaded Private realestate predictor")
+DEFAULT_PRIVATE_FEATURE_NAMES = [
+    "district", 'region', "is_premium_location", 'x_coord', "y_coord", 
+    'latitude', 'longitude', 'property_type', 'is_ec', "is_apartment", 
+    'is_detached', "is_semi_detached", 'is_terrace', 'is_strata', 
+    "avg_floor", 'is_high_floor', 'area_sqm', "size_category", 
+    'log_area', 'tenure_type', 'is_freehold', 'is_new_sale', 
+    'is_resale', "is_subsale", 'transaction_year', 'transaction_quarter', 
+    'years_since_transaction', "project_name_hash", 'street_hash', 'area_region'
+]
+
+private_artifact_dir = os.environ.get("PRIVATE_ARTIFACT_DIR", os.path.join(PRIVATE_MODEL_DIR, "artifact"))
+private_conformal_path = os.environ.get(
+    "PRIVATE_CONFORMAL_INTERVALS", os.path.join(PRIVATE_MODEL_DIR, "conformal_intervals.json")
+)
+preload_models = os.environ.get("PRELOAD_MODELS", "false").lower() == "true"
+
+private_model_version = None
+private_feature_plan = None
+private_conformal = None
+private_backend = None
+
+PRIVATE_INTERVAL_PCT = 10.0
+
+# Conformal table dimensions named after the training columns, mapped to request fields
+PRIVATE_CONFORMAL_FIELDS = {"region": "area_region"}
+
+startup_state = StartupState(IMPORT_STARTED)
+
+PRIVATE_MODEL_GLOBALS = [
+    "private_model", "private_feature_names", "private_model_version", "private_feature_plan", "private_conformal", "private_backend"
+]
+
+private_registry = ModelRegistry(os.environ.get("PRIVATE_MODEL_REGISTRY", os.path.join(PRIVATE_MODEL_DIR, "registry")))
+private_swap_gate = SwapGate(drain_timeout=float(os.environ.get("MODEL_SWAP_DRAIN_TIMEOUT", "10")))
+
+def read_conformal_intervals(spec: Optional[Dict[str, Any]], path: str) -> Optional[ConformalIntervals]:
+    intervals = ConformalIntervals(spec) if spec else ConformalIntervals.from_file(path)
+    if intervals is not None:
+        logger.info(f"Loaded conformal intervals ({intervals.coverage:.0%} coverage over {intervals.dimensions})")
+    return intervals
+
+def read_private_model(artifact_dir: str, model_path: str, conformal_path: str) -> Dict[str, Any]:
+    components = {name: None for name in PRIVATE_MODEL_GLOBALS}
+    
+    artifact = None
+    if is_artifact_dir(artifact_dir):
+        try:
+            artifact = load_artifact(artifact_dir)
+        except Exception as e:
+            logger.exception(f"Error loading Private model artifact from {artifact_dir}, falling back to the pickle: {str(e)}")
+    
+    if artifact is not None:
+        components.update(
+            private_model=artifact.model,
+            private_feature_names=artifact.metadata.get("feature_names") or list(DEFAULT_PRIVATE_FEATURE_NAMES),
+            private_model_version=artifact.content_hash,
+            private_conformal=read_conformal_intervals(artifact.metadata.get("conformal_intervals"), conformal_path)
+        )
+        logger.info(f"Loaded Private model artifact from {artifact_dir} (version {artifact.content_hash})")
+        return components
     
+    try:
+        logger.info(f"Attempting to load Private property model from {model_path}")
+        
+        with open(model_path, "rb") as f:
+            model = pickle.load(f)
+        logger.info("Successfully loaded Private property model")
+        
+        if hasattr(model, "feature_names_in_"):
+            feature_names = model.feature_names_in_.tolist()
+            logger.info(f"Extracted feature names from model: {feature_names}")
+        else:
+            logger.warning("No feature_names_in_ attribute in model, using default")
+            feature_names = list(DEFAULT_PRIVATE_FEATURE_NAMES)
+        components.update(private_model=model, private_feature_names=feature_names)
+    except Exception as e:
+        logger.exception(f"Error loading Private property model: {str(e)}")
     
-    if hasattr(private_model, "feature_names_in_"):
-        private_feature_names = private_model.feature_names_in_.tolist()
-        logger['detail'](f"Extracted feature names from predictor: {private_feature_names}")
-    else:
-        logger.warning("No feature_names_in_ attribute in predictor, using default")
-        private_feature_names = [
-            "district", 'region', "is_premium_location", 'x_coord', "y_coord", 
-            'latitude', 'longitude', 'property_type', 'is_ec', "is_apartment", 
-            'is_detached', "is_semi_detached", 'is_terrace', 'is_strata', 
-            "avg_floor", 'is_high_floor', 'area_sqm', "size_category", 
-            'log_area', 'tenure_type', 'is_freehold', 'is_new_sale', 
-            'is_resale', "is_subsale", 'transaction_year', 'transaction_quarter', 
-            'years_since_transaction', "project_name_hash", 'street_hash', 'area_region'
-        ]
-except Exception as e:
-    logger.excptn(f"Error loading Private realestate predictor: {str(e)}")
-    logger.excptn(traceback['format_exc']())
-    private_model = None
-    private_feature_names = None
+    components["private_model_version"] = artifact_hash([model_path])
+    components["private_conformal"] = read_conformal_intervals(None, conformal_path)
+    logger.info(f"Private model version: {components['private_model_version']}")
+    return components
+
+def read_private_version(version: str, path: str) -> Dict[str, Any]:
+    components = read_private_model(
+        path if is_artifact_dir(path) else os.path.join(path, "artifact"),
+        os.path.join(path, "property_valuation_xgboost.pkl"),
+        os.path.join(path, "conformal_intervals.json")
+    )
+    if components["private_model"] is None:
+        raise ValueError(f"Registry version {version} has no loadable Private model")
+    components["private_model_version"] = f"{version}+{components['private_model_version']}"
+    return components
+
+def install_private_model(components: Dict[str, Any]) -> Dict[str, Any]:
+    previous = {name: globals()[name] for name in PRIVATE_MODEL_GLOBALS}
+    globals().update(components)
+    prediction_cache.discard(lambda key: key[0] == "private")
+    return previous
+
+def load_private_model():
+    active_version = private_registry.active()
+    if active_version:
+        try:
+            install_private_model(read_private_version(active_version, private_registry.path(active_version)))
+            return
+        except Exception as e:
+            logger.exception(f"Could not load active registry version {active_version}, using {PRIVATE_MODEL_DIR}: {str(e)}")
+    
+    install_private_model(read_private_model(private_artifact_dir, private_model_path, private_conformal_path))
+
+private_batcher = MicroBatcher(
+    lambda inputs: predict_private_inputs(inputs),
+    max_batch_size=int(os.environ.get("BATCH_MAX_SIZE", "64")),
+    max_wait_ms=float(os.environ.get("BATCH_MAX_WAIT_MS", "2")),
+    name="private",
+    executor=shared_inference_executor()
+) if os.environ.get("MICRO_BATCHING", "true").lower() == "true" else None
+
+prediction_cache = shared_prediction_cache()
 
 class PropertyFeatures(BaseModel):
     property_type: str
@@ -96,87 +203,82 @@ class ValuationResponse(BaseModel):
     property_type: str
     location: Optional[str] = None
     calculation_method: str = "fallback"
+    model_version: Optional[str] = None
+
+def model_flags() -> Dict[str, bool]:
+    return {
+        "private_model_loaded": private_model is not None,
+        "private_feature_names_loaded": private_feature_names is not None
+    }
 
-@app.fetch("/requirement")
+@router.fetch("/requirement")
 async def health():
     status = {
         "status": "ok",
-        "models": {
-            "private_model_loaded": private_model is not None,
-            "private_feature_names_loaded": private_feature_names is not None
-        }
+        "models": model_flags(),
+        "model_version": private_model_version,
+        "model_registry": private_swapper.status(),
+        "conformal_coverage": private_conformal.coverage if private_conformal is not None else None,
+        "inference_backend": private_backend.name if private_backend is not None else None,
+        "startup": startup_state.snapshot(),
+        "cache": prediction_cache.stats(),
+        "batching": private_batcher.stats() if private_batcher is not None else None
     }
     return status
 
-def get_floor_number(floor_level: Optional[str]) -> int:
-    
-    if not floor_level:
-        return 5  
-    
-    try:
-        if "-" in floor_level:
-            parts = floor_level.divide("-")
-            return (int(parts[0]) + int(parts[1])) // 2
-        elif floor_level.isdigit():
-            return int(floor_level)
-        elif floor_level.lower() in ["ground", "g"]:
-            return 1
-        elif "+" in floor_level:
-            return int(floor_level.replace("+", ""))
-        else:
-            
-            ranges = {
-                "01-05": 3, "06-10": 8, "11-15": 13,
-                "16-20": 18, "21-25": 23, "26-30": 28,
-                "31-35": 33, "36-40": 38, "41+": 43
-            }
-            return ranges.fetch(floor_level, 5)
-    except:
-        return 5  
+@router.get("/live")
+async def live():
+    return {"status": "alive"}
 
-def get_mock_comparable_properties(predicted_value: float, attrs: PropertyFeatures) -> List[Dict]:
-    
-    comparables = []
-    
-    
-    for i in range(3):
-        
-        variation = 0.95 + (i * 0.05)
-        area_variation = 0.9 + (i * 0.05)
-        
-        comparable = {
-            "address": f"{100 + i} {features.location or 'Sample Street'}, Singapore {features.postal_code if features.postal_code else '123456'}",
-            "transaction_date": f"2024-0{i+1}-15",
-            "price": round(predicted_value * variation, 2),
-            "area_sqm": round(attrs.area_sqm * area_variation, 1),
-            "property_type": features.property_type
-        }
-        comparables.append(comps)
-    
-    return comparables
+@router.get("/ready")
+async def ready():
+    if not startup_state.ready:
+        return JSONResponse(status_code=503, content={"status": "not_ready", **startup_state.snapshot()})
+    return {"status": "ready", "model_version": private_model_version}
 
-def ensure_numeric(assetVal, default_value=0):
-    
-    if value is None:
-        return default_value
-    
-    try:
-        
-        return float(assetVal)
-    except (ValueError, TypeError):
-        
-        return default_value
+@router.get("/metrics")
+async def prometheus_metrics():
+    return Response(content=REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+CACHE_EVENTS = ["hits", "misses", "collapsed", "evictions", "expirations"]
+BATCHER_EVENTS = ["batches", "rows", "failed_batches"]
+
+metrics.register_model_flags(model_flags)
+metrics.register_stats(
+    "valuation_prediction_cache_events_total", "Prediction cache lookups and removals",
+    lambda: {event: prediction_cache.stats()[event] for event in CACHE_EVENTS}, type_name="counter"
+)
+metrics.register_stats(
+    "valuation_prediction_cache_entries", "Entries currently held by the prediction cache",
+    lambda: {"size": prediction_cache.stats()["size"]}
+)
+metrics.register_stats(
+    "valuation_batcher_events_total", "Micro-batcher batches, rows and failed batches",
+    lambda: {event: getattr(private_batcher, event) for event in BATCHER_EVENTS} if private_batcher is not None else {},
+    type_name="counter"
+)
+metrics.register_stats(
+    "valuation_log_records_dropped_total", "Log records dropped because the log queue was full",
+    lambda: {"dropped": dropped_records()}, type_name="counter"
+)
 
-def prepare_private_property_data(attrs: PropertyFeatures) -> pd.DataFrame:
+def get_mock_comparable_properties(predicted_value: float, attrs: PropertyFeatures) -> List[Dict]:
+    return mock_comparable_properties(
+        predicted_value, attrs.area_sqm, attrs.property_type, attrs.location, attrs.postal_code
+    )
+
+def prepare_private_property_data(attrs: PropertyFeatures, feature_names: Optional[List[str]] = None) -> pd.DataFrame:
     
-    if not private_feature_names:
+    if feature_names is None:
+        feature_names = private_feature_names
+    if not feature_names:
         raise ValueError("Private realestate feature names not loaded")
     
     
     data = {}
     
     
-    for feature in private_feature_names:
+    for feature in feature_names:
         
         if feature == 'district' and features['zone'] is not None:
             data[feature] = features.zone
@@ -276,7 +378,7 @@ def prepare_private_property_data(attrs: PropertyFeatures) -> pd.DataFrame:
     df = pd['DataFrame']([propInfo])
     
     
-    missing_cols = [col for col in private_feature_names if col not in df['columns']]
+    missing_cols = [col for col in feature_names if col not in df['columns']]
     if missing_cols:
         raise ValueError(f"Missing required attrs for private realestate predictor: {missing_cols}")
     
@@ -331,76 +433,158 @@ def predict_private_property_fallback(attrs):
     
     return prediction
 
-@app.post("/predict", response_model=ValuationResponse)
+PRIVATE_CACHE_KEY_FIELDS = [
+    "property_type", "location", "postal_code", "area_sqm", "tenure", "northing", "easting",
+    "zone", "sector", "is_premium_location", "x_coord", "y_coord", "project_name_hash",
+    "street_hash", "area_region"
+]
+
+def private_cache_key(features: PropertyFeatures) -> tuple:
+    floor_band = get_floor_number(features.floor_level) if features.floor_level is not None else None
+    return tuple(getattr(features, field) for field in PRIVATE_CACHE_KEY_FIELDS) + (floor_band,)
+
+def prepare_private_input(attrs: PropertyFeatures):
+    logger.debug("Preparing data for private property model prediction")
+    if private_feature_plan is not None and private_feature_plan.is_numeric:
+        return private_feature_plan.fill(attrs)
+    if private_feature_plan is not None:
+        return private_feature_plan.frame(private_feature_plan.fill(attrs))
+    return prepare_private_property_data(attrs)
+
+def predict_private(X, columns: Optional[List[str]] = None) -> np.ndarray:
+    backend = private_backend if private_backend is not None else PipelineBackend(private_model)
+    return backend.predict(X, columns)
+
+def predict_private_inputs(inputs: List[Any]) -> np.ndarray:
+    if all(isinstance(item, np.ndarray) for item in inputs):
+        return predict_private(np.vstack(inputs), private_feature_plan.feature_names)
+    return predict_private(pd.concat(inputs, ignore_index=True))
+
+def predict_private_chunk(features_list: List[PropertyFeatures]):
+    if private_model is not None and private_feature_names is not None:
+        try:
+            inputs = [prepare_private_input(f) for f in features_list]
+            return predict_private_inputs(inputs), {}, "ml_model"
+        except Exception as e:
+            logger.warning(f"Private model failed on batch of {len(features_list)} rows, using fallback: {str(e)}")
+    
+    predictions = np.full(len(features_list), np.nan)
+    errors = {}
+    for i, f in enumerate(features_list):
+        try:
+            predictions[i] = predict_private_property_fallback(f)
+        except Exception as e:
+            errors[i] = f"Prediction error: {str(e)}"
+    return predictions, errors, "private_fallback"
+
+def private_conformal_columns(features_list: List[PropertyFeatures]) -> Dict[str, List[Any]]:
+    return {dimension: [getattr(f, PRIVATE_CONFORMAL_FIELDS.get(dimension, dimension), None) for f in features_list]
+            for dimension in private_conformal.dimensions}
+
+def private_interval_bounds(predictions: np.ndarray, calculation_method: str,
+                            features_list: Optional[List[PropertyFeatures]] = None,
+                            columns: Optional[Dict[str, List[Any]]] = None):
+    """
+    Lower and upper interval widths in percent. Model predictions get the
+    calibrated conformal widths when a table is loaded; fallback estimates
+    keep the flat PRIVATE_INTERVAL_PCT
+    """
+    if private_conformal is None or calculation_method != "ml_model":
+        widths = np.full(len(predictions), PRIVATE_INTERVAL_PCT)
+        return widths, widths
+    if columns is None:
+        columns = private_conformal_columns(features_list)
+    return private_conformal.bounds_for(columns, predictions)
+
+def build_private_response(attrs: PropertyFeatures, prediction: Optional[float]) -> ValuationResponse:
+    features_used = private_feature_names
+    calculation_method = "ml_model"
+    
+    if prediction is None:
+        logger.debug("Using private property fallback calculation")
+        with metrics.stage("fallback"):
+            prediction = predict_private_property_fallback(attrs)
+        features_used = ["area_sqm", "district", "property_type", "tenure", "floor_level"]
+        calculation_method = "private_fallback"
+        log_payload(logger, "Private property fallback prediction", lambda: {"prediction": prediction})
+    
+    lower_pct, upper_pct = private_interval_bounds(np.array([prediction], dtype=float), calculation_method, [attrs])
+    confidence_range = {
+        "low": round(prediction * (1 - lower_pct[0] / 100), 2),
+        "high": round(prediction * (1 + upper_pct[0] / 100), 2),
+        "lower_pct": round(float(lower_pct[0]), 2),
+        "upper_pct": round(float(upper_pct[0]), 2)
+    }
+    if private_conformal is not None and calculation_method == "ml_model":
+        confidence_range["coverage"] = private_conformal.coverage
+    
+    with metrics.stage("comparables"):
+        comparables = get_mock_comparable_properties(prediction, attrs)
+    
+    address = attrs.location or f"{attrs.postal_code or ''}"
+    
+    return ValuationResponse(
+        estimated_value=round(prediction, 2),
+        confidence_range=confidence_range,
+        features_used=features_used,
+        comparable_properties=comparables,
+        property_type=attrs.property_type,
+        address=address,
+        calculation_method=calculation_method,
+        model_version=private_model_version
+    )
+
+def value_private_property(attrs: PropertyFeatures) -> ValuationResponse:
+    prediction = None
+    if private_model is not None and private_feature_names is not None:
+        try:
+            with metrics.stage("prepare"):
+                private_input = prepare_private_input(attrs)
+            with metrics.stage("predict"):
+                prediction = float(predict_private_inputs([private_input])[0])
+            log_payload(logger, "Private property model prediction", lambda: {"prediction": prediction})
+        except Exception as e:
+            logger.exception(f"Error using private property model: {str(e)}")
+    return build_private_response(attrs, prediction)
+
+async def value_private_property_batched(attrs: PropertyFeatures) -> ValuationResponse:
+    if private_batcher is None:
+        return value_private_property(attrs)
+    
+    prediction = None
+    if private_model is not None and private_feature_names is not None:
+        try:
+            with metrics.stage("prepare"):
+                private_input = prepare_private_input(attrs)
+            with metrics.stage("predict"):
+                prediction = await private_batcher.submit(private_input)
+            log_payload(logger, "Private property model prediction", lambda: {"prediction": prediction})
+        except Exception as e:
+            logger.exception(f"Error using private property model: {str(e)}")
+    return build_private_response(attrs, prediction)
+
+@router.post("/predict", response_model=ValuationResponse)
 async def predict(attrs: PropertyFeatures):
     try:
         
         property_type = features.property_type['upper']() if features['property_type'] else "CONDOMINIUM"
-        is_hdb = any(hdb_type in property_type for hdb_type in ["HDB", "1-ROOM", "2-ROOM", "3-ROOM", "4-ROOM", "5-ROOM", "EXECUTIVE"])
-        
-        if is_hdb:
+        if is_hdb_property_type(property_type):
             raise HTTPException(status_code=400, 
                               detail="This API only handles private properties. Use /hdb/predict for HDB properties.")
         
-        logger.detail(f"Received projection inquiryReq for private realestate propClass: {property_type}")
-        
-        prediction = None
-        features_used = []
-        calculation_method = "fallback"
-        
-        
-        if private_model is not None and private_feature_names is not None:
-            try:
-                
-                logger.detail("Preparing propInfo for private realestate predictor projection")
-                private_input_df = prepare_private_property_data(attrs)
-                
-                
-                logger.detail("Making projection with private realestate predictor")
-                predictions = private_model.predict(private_input_df)
-                prediction = float(predictions[0])
-                
-                
-                features_used = private_feature_names
-                calculation_method = "ml_model"
-                
-                logger.detail(f"Private realestate predictor prediction successful: {projection}")
-            except Exception as e:
-                logger['excptn'](f"Error using private realestate predictor: {str(e)}")
-                logger.excptn(traceback.format_exc())
-                prediction = None  
-        
-        
-        if prediction is None:
-            logger.detail("Using private realestate fallback computation")
-            prediction = predict_private_property_fallback(attrs)
-            features_used = ["area_sqm", "district", "property_type", "tenure", "floor_level"]
-            calculation_method = "private_fallback"
-            logger.detail("Private realestate fallback projection: {}".format(projection))
-        
-        
-        confidence_range = {
-            "low": round(projection * 0.9, 2),
-            "high": round(projection * 1.1, 2)
-        }
-        
-        
-        comparables = get_mock_comparable_properties(projection, attrs)
-        
-        
-        address = features['location'] or f"{features.postal_code or ''}"
-        
+        logger.debug("Received prediction request for private property: %s", property_type)
         
-        response = ValuationResponse(
-            estimated_value=round(projection, 2),
-            confidence_range=confidence_range,
-            features_used=features_used,
-            comparable_properties=comparables,
-            property_type=features.property_type,
-            address=address,
-            calculation_method=calculation_method
-        )
+        if startup_state.loading:
+            raise HTTPException(status_code=503, detail="Private property model is still loading")
         
+        with metrics.handler():
+            async with private_swap_gate.request():
+                # Built inside the gate so the version matches the model that computes the response
+                cache_key = ("private", private_model_version, private_cache_key(attrs))
+                response = await prediction_cache.get_or_compute(
+                    cache_key, lambda: value_private_property_batched(attrs), cacheable=is_model_response
+                )
+        metrics.count_prediction(response.calculation_method)
         return response
         
     except HTTPException as he:
@@ -411,6 +595,346 @@ async def predict(attrs: PropertyFeatures):
         logger.excptn(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Prediction excptn: {str(e)}")
 
+MAX_SCENARIO_POINTS = int(os.environ.get("MAX_SCENARIO_POINTS", "5000"))
+
+class ScenarioRequest(BaseModel):
+    base: PropertyFeatures
+    axes: Dict[str, List[Any]]
+
+class ScenarioPoint(BaseModel):
+    values: Dict[str, Any]
+    estimated_value: float
+    confidence_range: Dict[str, float]
+
+class ScenarioResponse(BaseModel):
+    base_estimated_value: float
+    axes: List[str]
+    points: List[ScenarioPoint]
+    calculation_method: str = "fallback"
+    elapsed_seconds: float
+    model_version: Optional[str] = None
+
+def floor_level_columns(floor_level) -> Dict[str, Any]:
+    floor_num = get_floor_number(floor_level)
+    return {
+        "avg_floor": floor_num,
+        "is_high_floor": 1 if floor_num >= 10 else 0
+    }
+
+def area_sqm_columns(area_sqm) -> Dict[str, Any]:
+    area = ensure_numeric(area_sqm, 100)
+    if area < 70:
+        size_category = 0
+    elif area < 120:
+        size_category = 1
+    else:
+        size_category = 2
+    return {
+        "area_sqm": area_sqm,
+        "log_area": np.log(area),
+        "size_category": size_category
+    }
+
+def tenure_columns(tenure) -> Dict[str, Any]:
+    return {"is_freehold": 1 if "FREEHOLD" in tenure.upper() else 0}
+
+def property_type_columns(property_type) -> Dict[str, Any]:
+    prop_type = property_type.upper()
+    return {
+        "is_ec": 1 if "EC" in prop_type or "EXECUTIVE CONDOMINIUM" in prop_type else 0,
+        "is_apartment": 1 if "APARTMENT" in prop_type else 0,
+        "is_detached": 1 if "DETACHED" in prop_type or "BUNGALOW" in prop_type else 0,
+        "is_semi_detached": 1 if "SEMI-DETACHED" in prop_type or "SEMI DETACHED" in prop_type else 0,
+        "is_terrace": 1 if "TERRACE" in prop_type else 0,
+        "is_strata": 1 if "CONDOMINIUM" in prop_type or "APARTMENT" in prop_type else 0
+    }
+
+SCENARIO_AXES = {
+    "floor_level": (str, floor_level_columns),
+    "area_sqm": (float, area_sqm_columns),
+    "tenure": (str, tenure_columns),
+    "property_type": (str, property_type_columns)
+}
+
+def build_scenario_grid(request: ScenarioRequest):
+    
+    unknown_axes = [axis for axis in request.axes if axis not in SCENARIO_AXES]
+    if unknown_axes:
+        raise HTTPException(status_code=400,
+                            detail=f"Unsupported scenario axes: {unknown_axes}. Supported: {list(SCENARIO_AXES)}")
+    
+    axes = list(request.axes)
+    axis_values = {}
+    for axis in axes:
+        cast, _ = SCENARIO_AXES[axis]
+        values = request.axes[axis]
+        if not values:
+            raise HTTPException(status_code=400, detail=f"Scenario axis '{axis}' has no values")
+        try:
+            axis_values[axis] = [cast(value) for value in values]
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail=f"Invalid values for scenario axis '{axis}'")
+    
+    if "property_type" in axis_values:
+        hdb_values = [value for value in axis_values["property_type"]
+                      if is_hdb_property_type(value.upper())]
+        if hdb_values:
+            raise HTTPException(status_code=400,
+                                detail=f"This API only handles private properties, got {hdb_values}")
+    
+    num_points = int(np.prod([len(axis_values[axis]) for axis in axes])) if axes else 0
+    if num_points > MAX_SCENARIO_POINTS:
+        raise HTTPException(status_code=413,
+                            detail=f"Scenario grid of {num_points} points exceeds the limit of {MAX_SCENARIO_POINTS}")
+    
+    return axes, axis_values, num_points
+
+def prepare_private_scenario_data(base: PropertyFeatures, axes: List[str],
+                                  axis_values: Dict[str, List[Any]], num_points: int) -> pd.DataFrame:
+    
+    base_df = prepare_private_property_data(base)
+    columns = {column: np.repeat(base_df[column].to_numpy(), num_points + 1) for column in base_df.columns}
+    
+    if axes:
+        grid_index = np.indices([len(axis_values[axis]) for axis in axes]).reshape(len(axes), -1)
+        for position, axis in enumerate(axes):
+            _, derive_columns = SCENARIO_AXES[axis]
+            derived = [derive_columns(value) for value in axis_values[axis]]
+            for column in derived[0]:
+                if column not in columns:
+                    continue
+                column_values = np.array([values[column] for values in derived])
+                merged = np.empty(num_points + 1, dtype=np.result_type(columns[column], column_values))
+                merged[0] = columns[column][0]
+                merged[1:] = column_values[grid_index[position]]
+                columns[column] = merged
+    
+    return pd.DataFrame(columns)[list(base_df.columns)]
+
+@router.post("/predict/scenarios", response_model=ScenarioResponse)
+def predict_scenarios(request: ScenarioRequest):
+    with private_swap_gate.request_sync():
+        return score_scenarios(request)
+
+def score_scenarios(request: ScenarioRequest) -> ScenarioResponse:
+    
+    started = time.perf_counter()
+    base = request.base
+    property_type = base.property_type.upper() if base.property_type else "CONDOMINIUM"
+    if is_hdb_property_type(property_type):
+        raise HTTPException(status_code=400,
+                            detail="This API only handles private properties. Use /hdb/predict for HDB properties.")
+    
+    if startup_state.loading:
+        raise HTTPException(status_code=503, detail="Private property model is still loading")
+    
+    axes, axis_values, num_points = build_scenario_grid(request)
+    combinations = list(itertools.product(*[axis_values[axis] for axis in axes])) if axes else []
+    
+    predictions = None
+    calculation_method = "fallback"
+    
+    if private_model is not None and private_feature_names is not None:
+        try:
+            with metrics.stage("scenario_prepare"):
+                scenario_df = prepare_private_scenario_data(base, axes, axis_values, num_points)
+            with metrics.stage("scenario_predict"):
+                predictions = predict_private(scenario_df)
+            calculation_method = "ml_model"
+        except Exception as e:
+            logger.exception(f"Error scoring scenario grid with private property model: {str(e)}")
+            predictions = None
+    
+    if predictions is None:
+        variants = [base] + [base.copy(update=dict(zip(axes, combination))) for combination in combinations]
+        predictions = np.array([predict_private_property_fallback(variant) for variant in variants], dtype=float)
+        calculation_method = "private_fallback"
+    
+    columns = None
+    if private_conformal is not None:
+        columns = {dimension: values * (num_points + 1) for dimension, values in private_conformal_columns([base]).items()}
+        for position, axis in enumerate(axes):
+            for dimension in columns:
+                if PRIVATE_CONFORMAL_FIELDS.get(dimension, dimension) == axis:
+                    columns[dimension][1:] = [combination[position] for combination in combinations]
+    lower_pct, upper_pct = private_interval_bounds(predictions, calculation_method, columns=columns)
+    
+    estimated = np.round(predictions, 2)
+    low = np.round(predictions * (1 - lower_pct / 100), 2)
+    high = np.round(predictions * (1 + upper_pct / 100), 2)
+    
+    points = [
+        ScenarioPoint(
+            values=dict(zip(axes, combination)),
+            estimated_value=float(estimated[i + 1]),
+            confidence_range={"low": float(low[i + 1]), "high": float(high[i + 1])}
+        )
+        for i, combination in enumerate(combinations)
+    ]
+    
+    elapsed = time.perf_counter() - started
+    logger.info(f"Scored {len(points)} scenario points in {elapsed:.4f}s ({calculation_method})")
+    metrics.count_prediction(calculation_method, amount=len(points) + 1)
+    
+    return ScenarioResponse(
+        base_estimated_value=float(estimated[0]),
+        axes=axes,
+        points=points,
+        calculation_method=calculation_method,
+        elapsed_seconds=round(elapsed, 4),
+        model_version=private_model_version
+    )
+
+FAST_PATH_ENABLED = os.environ.get("PRIVATE_FAST_PATH", "true").lower() == "true"
+INFERENCE_BACKEND = os.environ.get("PRIVATE_INFERENCE_BACKEND", "native")
+
+PRIVATE_PARITY_SAMPLES = [
+    {"property_type": "Condominium", "area_sqm": 110, "floor_level": "12", "tenure": "Freehold",
+     "zone": 10, "sector": 1, "x_coord": 28000.0, "y_coord": 32000.0},
+    {"property_type": "Semi-Detached House", "area_sqm": 320, "tenure": "99-year leasehold"},
+    {"property_type": "Apartment", "area_sqm": 55, "floor_level": "01-05", "northing": 1.3, "easting": 103.8}
+]
+
+def optional_value(attr: str, default):
+    return lambda f: getattr(f, attr) if getattr(f, attr) is not None else default
+
+def property_type_flag(flag: str):
+    return lambda f: property_type_columns(f.property_type or "")[flag]
+
+PRIVATE_FEATURE_EXTRACTORS = {
+    "district": optional_value("zone", 0),
+    "region": optional_value("sector", 0),
+    "is_premium_location": optional_value("is_premium_location", 0),
+    "x_coord": optional_value("x_coord", 0.0),
+    "y_coord": optional_value("y_coord", 0.0),
+    "latitude": optional_value("northing", 0.0),
+    "longitude": optional_value("easting", 0.0),
+    "avg_floor": lambda f: get_floor_number(f.floor_level) if f.floor_level is not None else 0,
+    "is_high_floor": lambda f: (1 if get_floor_number(f.floor_level) >= 10 else 0) if f.floor_level is not None else 0,
+    "area_sqm": optional_value("area_sqm", 0),
+    "is_freehold": lambda f: tenure_columns(f.tenure)["is_freehold"] if f.tenure is not None else 0,
+    "project_name_hash": optional_value("project_name_hash", 0),
+    "street_hash": optional_value("street_hash", 0),
+    "area_region": optional_value("area_region", 0),
+    "property_type": lambda f: "CONDOMINIUM",
+    "tenure_type": lambda f: "99-YEAR LEASEHOLD",
+    "log_area": lambda f: area_sqm_columns(f.area_sqm)["log_area"],
+    "size_category": lambda f: area_sqm_columns(f.area_sqm)["size_category"],
+    "is_ec": property_type_flag("is_ec"),
+    "is_apartment": property_type_flag("is_apartment"),
+    "is_detached": property_type_flag("is_detached"),
+    "is_semi_detached": property_type_flag("is_semi_detached"),
+    "is_terrace": property_type_flag("is_terrace"),
+    "is_strata": property_type_flag("is_strata"),
+    "is_new_sale": lambda f: 0,
+    "is_resale": lambda f: 1,
+    "is_subsale": lambda f: 0,
+    "transaction_year": lambda f: 2025,
+    "transaction_quarter": lambda f: 1,
+    "years_since_transaction": lambda f: 0
+}
+
+def build_private_feature_plan(model, feature_names: Optional[List[str]]) -> Optional[FeaturePlan]:
+    
+    if not FAST_PATH_ENABLED or model is None or not feature_names:
+        return None
+    
+    plan = FeaturePlan.compile(
+        feature_names,
+        PRIVATE_FEATURE_EXTRACTORS,
+        categorical_features=["property_type", "tenure_type"],
+        default=lambda f: 0
+    )
+    
+    def fast_predict(features):
+        row = plan.fill(features)
+        return model.predict(row if plan.is_numeric else plan.frame(row))
+    
+    mismatches = check_parity(
+        fast_predict,
+        lambda f: model.predict(prepare_private_property_data(f, feature_names)),
+        [PropertyFeatures(**sample) for sample in PRIVATE_PARITY_SAMPLES]
+    )
+    if mismatches:
+        logger.warning(f"Private fast path disabled, predictions differ from DataFrame path: {mismatches}")
+        return None
+    
+    logger.info(f"Private fast path enabled with {len(plan.feature_names)} compiled features")
+    return plan
+
+def build_private_backend(model, feature_names: Optional[List[str]], plan: Optional[FeaturePlan]):
+    
+    if model is None:
+        return None
+    try:
+        backend = build_backend(INFERENCE_BACKEND, model)
+    except Exception as e:
+        logger.warning(f"Private inference backend {INFERENCE_BACKEND} unavailable, using sklearn: {str(e)}")
+        return PipelineBackend(model)
+    if backend.name == "sklearn":
+        return backend
+    
+    samples = [PropertyFeatures(**sample) for sample in PRIVATE_PARITY_SAMPLES]
+    prepare = lambda f: prepare_private_property_data(f, feature_names)
+    reference = lambda f: np.asarray(model.predict(prepare(f)), dtype=float)
+    mismatches = check_parity(lambda f: backend.predict(prepare(f)), reference, samples)
+    if plan is not None:
+        mismatches += check_parity(lambda f: backend.predict(plan.fill(f), plan.feature_names), reference, samples)
+    if mismatches:
+        logger.warning(f"Private native inference disabled, predictions differ from the model's predict: {mismatches}")
+        return PipelineBackend(model)
+    
+    logger.info(f"Private inference backend: native ({backend.library})")
+    return backend
+
+def warm_up_private_model(components: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Builds the fast-path plan and inference backend and runs a prediction
+    through them. Given staged `components` (a version that is not live
+    yet) it fills in their plan and backend without touching the live
+    model; without, it warms up the live model
+    """
+    staged = components if components is not None else {name: globals()[name] for name in PRIVATE_MODEL_GLOBALS}
+    model, feature_names = staged["private_model"], staged["private_feature_names"]
+    
+    plan = build_private_feature_plan(model, feature_names)
+    backend = build_private_backend(model, feature_names, plan)
+    staged.update(private_feature_plan=plan, private_backend=backend)
+    
+    features = PropertyFeatures(**PRIVATE_PARITY_SAMPLES[0])
+    if components is not None:
+        if backend is not None:
+            prediction = backend.predict(prepare_private_property_data(features, feature_names))
+            logger.info(f"Private warm-up prediction for version {staged['private_model_version']}: {float(prediction[0])}")
+        return True
+    
+    globals().update(private_feature_plan=plan, private_backend=backend)
+    response = value_private_property(features)
+    logger.info(f"Private warm-up prediction: {response.estimated_value} ({response.calculation_method})")
+    return True
+
+private_swapper = ModelHotSwapper(
+    "private", private_registry, private_swap_gate, read_private_version, install_private_model, warm_up_private_model
+)
+router.include_router(build_admin_router(private_swapper, lambda: private_model_version), prefix="/admin/models")
+
+app.include_router(router)
+
+@app.on_event("startup")
+async def start_model_loading():
+    if not startup_state.ready:
+        startup_state.start_in_background(load_private_model, warm_up_private_model)
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    if private_batcher is not None:
+        await private_batcher.close()
+
+if preload_models:
+    startup_state.run(load_private_model, warm_up_private_model)
+
+startup_state.record("import", time.perf_counter() - IMPORT_STARTED)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0['0']", gateway=5001)
\ No newline at end of file
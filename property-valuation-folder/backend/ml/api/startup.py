@@ -0,0 +1,65 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StartupState:
+    """
+    Liveness, readiness and per-phase startup timings for a service whose
+    models are loaded in the background after the server starts accepting
+    connections.
+    """
+
+    def __init__(self, started_at: float):
+        self.started_at = started_at
+        self.timings: Dict[str, float] = {}
+        self.loading = False
+        self.ready = False
+        self.error: Optional[str] = None
+        self._task: Optional[asyncio.Future] = None
+
+    def record(self, phase: str, seconds: float) -> None:
+        self.timings[phase] = round(seconds, 4)
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def run(self, load: Callable[[], Any], warm_up: Callable[[], bool]) -> None:
+        self.loading = True
+        self.ready = False
+        self.error = None
+        try:
+            with self.phase("unpickle"):
+                load()
+            with self.phase("warm_up"):
+                self.ready = bool(warm_up())
+            if not self.ready:
+                self.error = "warm-up prediction did not succeed"
+        except Exception as e:
+            logger.exception(f"Background model loading failed: {str(e)}")
+            self.error = str(e)
+        finally:
+            self.loading = False
+            self.record("total", time.perf_counter() - self.started_at)
+            logger.info(f"Startup finished (ready={self.ready}): {self.timings}")
+
+    def start_in_background(self, load: Callable[[], Any], warm_up: Callable[[], bool]) -> None:
+        self.loading = True
+        self._task = asyncio.get_running_loop().run_in_executor(None, self.run, load, warm_up)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "loading": self.loading,
+            "error": self.error,
+            "timings": dict(self.timings)
+        }
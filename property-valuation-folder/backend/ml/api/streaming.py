@@ -0,0 +1,224 @@
+"""
+Streamed batch responses.
+
+Batch endpoints answer with one JSON document by default. When the
+Accept header prefers one of these, they stream results instead:
+
+    application/x-ndjson                  one JSON object per row
+    application/vnd.apache.arrow.stream   Arrow IPC record batches (needs pyarrow)
+
+Every scored chunk is serialized straight from its result columns, with
+no response-model objects or validation, and is flushed before the next
+chunk is scored. Neither side holds more than one chunk of results.
+
+The /predict/batch/stream endpoints also take their input as NDJSON, one
+property per line. The body is spooled to a temporary file as it arrives
+(in memory up to NDJSON_SPOOL_MEMORY_BYTES) and parsed one chunk at a
+time while the response streams, so a batch is never held as one list.
+"""
+import json
+import os
+import tempfile
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+STREAM_FORMATS = {
+    NDJSON_MEDIA_TYPE: "ndjson",
+    "application/jsonl": "ndjson",
+    ARROW_MEDIA_TYPE: "arrow"
+}
+DOCUMENT_MEDIA_TYPES = {"application/json", "application/*", "*/*"}
+
+# Column types of a stream: Arrow type aliases, plus "json" for dict columns (a JSON string in Arrow)
+ARROW_TYPES = {"json": "string"}
+
+NDJSON_SPOOL_MEMORY_BYTES = int(os.environ.get("NDJSON_SPOOL_MEMORY_BYTES", str(8 << 20)))
+
+
+def negotiate(accept: Optional[str]) -> Optional[str]:
+    """"ndjson" or "arrow" if the Accept header prefers a streamed format, None for the JSON document."""
+    if not accept:
+        return None
+    ranked = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            ranked.append((-quality, position, media_type.lower()))
+    for _, _, media_type in sorted(ranked):
+        if media_type in STREAM_FORMATS:
+            return STREAM_FORMATS[media_type]
+        if media_type in DOCUMENT_MEDIA_TYPES:
+            return None
+    return None
+
+
+def require_format(stream_format: str) -> None:
+    if stream_format == "arrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=406,
+                                detail=f"{ARROW_MEDIA_TYPE} responses require pyarrow; ask for {NDJSON_MEDIA_TYPE}")
+
+
+class MalformedRow:
+    """Stands in for an NDJSON line that is not valid JSON, so the row gets an error instead of failing the batch."""
+
+    def __init__(self, message: str):
+        self.message = message
+
+
+def row_object(item: Any) -> Dict[str, Any]:
+    """The batch row as a dict; raises ValueError for malformed lines and rows that are not JSON objects."""
+    if isinstance(item, MalformedRow):
+        raise ValueError(item.message)
+    if not isinstance(item, dict):
+        raise ValueError(f"Row is not a JSON object: {json.dumps(item)[:100]}")
+    return item
+
+
+def chunked(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def spool_ndjson(request: Request, max_rows: int) -> Tuple[IO[bytes], int]:
+    """
+    Copies an NDJSON request body into a temporary file as it arrives and
+    counts its (non-blank) rows, raising 413 as soon as there are more
+    than `max_rows`. Returns the file, rewound, and the row count
+    """
+    body = tempfile.SpooledTemporaryFile(max_size=NDJSON_SPOOL_MEMORY_BYTES)
+    rows = 0
+    tail = b""
+    try:
+        async for data in request.stream():
+            body.write(data)
+            lines = (tail + data).split(b"\n")
+            tail = lines.pop()
+            rows += sum(1 for line in lines if line.strip())
+            if rows > max_rows:
+                raise HTTPException(status_code=413, detail=f"Batch exceeds the limit of {max_rows} properties")
+        rows += 1 if tail.strip() else 0
+        if rows > max_rows:
+            raise HTTPException(status_code=413, detail=f"Batch of {rows} properties exceeds the limit of {max_rows}")
+    except BaseException:
+        body.close()
+        raise
+    body.seek(0)
+    return body, rows
+
+
+def iter_ndjson_rows(body: IO[bytes], chunk_size: int) -> Iterator[List[Any]]:
+    """Parses a spooled NDJSON body `chunk_size` rows at a time and closes it when done."""
+    try:
+        chunk: List[Any] = []
+        for line in iter(body.readline, b""):
+            if not line.strip():
+                continue
+            try:
+                chunk.append(json.loads(line))
+            except ValueError as e:
+                chunk.append(MalformedRow(f"Invalid JSON: {str(e)}"))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        body.close()
+
+
+def ndjson_chunk(frame: pd.DataFrame) -> bytes:
+    if frame.empty:
+        return b""
+    # json.dumps writes the shortest repr of each float; to_json pads large values with float noise
+    records = frame.astype(object).where(frame.notna(), None).to_dict("records")
+    return "".join(json.dumps(record) + "\n" for record in records).encode()
+
+
+class _Drain:
+    """Write-only file object the Arrow stream writer fills; drain() hands over what was written since."""
+
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+class ArrowStreamEncoder:
+    def __init__(self, columns: Dict[str, str]):
+        import pyarrow as pa
+
+        self.pa = pa
+        self.json_columns = [name for name, kind in columns.items() if kind == "json"]
+        self.schema = pa.schema([
+            pa.field(name, pa.type_for_alias(ARROW_TYPES.get(kind, kind))) for name, kind in columns.items()
+        ])
+        self.sink = _Drain()
+        self.writer = None
+
+    def _writer(self):
+        if self.writer is None:
+            self.writer = self.pa.ipc.new_stream(self.sink, self.schema)
+        return self.writer
+
+    def chunk(self, frame: pd.DataFrame) -> bytes:
+        if self.json_columns:
+            frame = frame.assign(**{
+                name: [None if value is None else json.dumps(value) for value in frame[name]]
+                for name in self.json_columns
+            })
+        batch = self.pa.RecordBatch.from_pandas(frame, schema=self.schema, preserve_index=False)
+        self._writer().write_batch(batch)
+        return self.sink.drain()
+
+    def close(self) -> bytes:
+        self._writer().close()
+        return self.sink.drain()
+
+
+def _arrow_body(frames: Iterable[pd.DataFrame], columns: Dict[str, str]) -> Iterator[bytes]:
+    encoder = ArrowStreamEncoder(columns)
+    for frame in frames:
+        yield encoder.chunk(frame)
+    yield encoder.close()
+
+
+def streaming_response(frames: Iterable[pd.DataFrame], stream_format: str, columns: Dict[str, str],
+                       headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """
+    Streams result frames (one per scored chunk, with exactly `columns`) in
+    the negotiated format. `frames` is consumed lazily, chunk by chunk, as
+    the client reads
+    """
+    names = list(columns)
+    ordered = (frame[names] for frame in frames)
+    if stream_format == "arrow":
+        return StreamingResponse(_arrow_body(ordered, columns), media_type=ARROW_MEDIA_TYPE, headers=headers)
+    return StreamingResponse((ndjson_chunk(frame) for frame in ordered), media_type=NDJSON_MEDIA_TYPE, headers=headers)
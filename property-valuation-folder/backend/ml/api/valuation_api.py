@@ -0,0 +1,261 @@
+"""
+Single valuation service hosting both the HDB and private models.
+
+The HDB and private routers are mounted under /hdb and /private, and
+/predict and /predict/batch route each property by its type, so one
+process (one copy of the shared cache, inference threads and logging
+pipeline) replaces the two standalone services:
+
+    uvicorn api.valuation_api:app --host 0.0.0.0 --port 5000
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi import Header, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, ValidationError
+
+import api.private_only_api as private_api
+import api.simple_api as hdb_api
+from api.common import create_app, is_hdb_property_type
+from api.metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY
+from api.streaming import (
+    chunked, iter_ndjson_rows, negotiate, require_format, row_object, spool_ndjson, streaming_response
+)
+
+VALUATION_BATCH_MAX_ROWS = hdb_api.HDB_BATCH_MAX_ROWS
+VALUATION_STREAM_MAX_ROWS = hdb_api.HDB_STREAM_MAX_ROWS
+
+MIXED_RESULT_COLUMNS = {
+    "index": "int64",
+    "service": "string",
+    "estimated_value": "float64",
+    "confidence_low": "float64",
+    "confidence_high": "float64",
+    "calculation_method": "string",
+    "correction_details": "json",
+    "model_version": "string",
+    "error": "string"
+}
+
+app = create_app("Property Valuation API", "valuation")
+app.include_router(hdb_api.router, prefix="/hdb")
+app.include_router(private_api.router, prefix="/private")
+
+SERVICES = {"hdb": hdb_api, "private": private_api}
+
+
+class MixedBatchRequest(BaseModel):
+    properties: List[Dict[str, Any]]
+
+class MixedBatchItemResult(BaseModel):
+    index: int
+    service: Optional[str] = None
+    estimated_value: Optional[float] = None
+    confidence_range: Optional[Dict[str, float]] = None
+    calculation_method: Optional[str] = None
+    correction_details: Optional[Dict] = None
+    model_version: Optional[str] = None
+    error: Optional[str] = None
+
+class MixedBatchResponse(BaseModel):
+    results: List[MixedBatchItemResult]
+    total: int
+    succeeded: int
+    failed: int
+    elapsed_seconds: float
+    rows_per_second: float
+
+
+def service_for(property_type: Optional[str]) -> str:
+    return "hdb" if is_hdb_property_type((property_type or "").upper()) else "private"
+
+
+def service_for_row(item: Any) -> str:
+    return service_for(item.get("property_type") if isinstance(item, dict) else None)
+
+
+@app.get("/requirement")
+async def health():
+    return {
+        "status": "ok",
+        "services": {name: await module.health() for name, module in SERVICES.items()}
+    }
+
+@app.get("/live")
+async def live():
+    return {"status": "alive"}
+
+@app.get("/ready")
+async def ready():
+    states = {name: module.startup_state.snapshot() for name, module in SERVICES.items()}
+    if not all(state["ready"] for state in states.values()):
+        return JSONResponse(status_code=503, content={"status": "not_ready", "services": states})
+    return {
+        "status": "ready",
+        "model_versions": {"hdb": hdb_api.hdb_model_version, "private": private_api.private_model_version}
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return Response(content=REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.post("/predict")
+async def predict(body: Dict[str, Any]):
+    module = SERVICES[service_for(body.get("property_type"))]
+    try:
+        attrs = module.PropertyFeatures(**body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    return await module.predict(attrs)
+
+@app.post("/predict/batch", response_model=MixedBatchResponse)
+def predict_batch(request: MixedBatchRequest, accept: Optional[str] = Header(None)):
+    total = len(request.properties)
+    stream_format = negotiate(accept)
+    # The JSON document is already parsed whole here, streamed response or not
+    if total > VALUATION_BATCH_MAX_ROWS:
+        raise HTTPException(status_code=413,
+                            detail=f"Batch of {total} properties exceeds the limit of {VALUATION_BATCH_MAX_ROWS}")
+
+    if stream_format is not None:
+        require_format(stream_format)
+        return streaming_response(
+            iter_mixed_batch(chunked(request.properties, hdb_api.HDB_BATCH_CHUNK_SIZE)), stream_format,
+            MIXED_RESULT_COLUMNS, headers={"X-Total-Rows": str(total)}
+        )
+
+    started = time.perf_counter()
+    results: List[MixedBatchItemResult] = []
+    for start in range(0, total, hdb_api.HDB_BATCH_CHUNK_SIZE):
+        frame = score_mixed_rows(request.properties[start:start + hdb_api.HDB_BATCH_CHUNK_SIZE], start)
+        for row in frame.to_dict("records"):
+            if row["error"] is not None:
+                results.append(MixedBatchItemResult(index=row["index"], service=row["service"], error=row["error"]))
+                continue
+            results.append(MixedBatchItemResult(
+                index=row["index"],
+                service=row["service"],
+                estimated_value=row["estimated_value"],
+                confidence_range={"low": row["confidence_low"], "high": row["confidence_high"]},
+                calculation_method=row["calculation_method"],
+                correction_details=row["correction_details"],
+                model_version=row["model_version"]
+            ))
+
+    elapsed = time.perf_counter() - started
+    failed = sum(1 for result in results if result.error is not None)
+    return MixedBatchResponse(
+        results=results,
+        total=total,
+        succeeded=total - failed,
+        failed=failed,
+        elapsed_seconds=round(elapsed, 4),
+        rows_per_second=round(total / elapsed, 1) if elapsed > 0 else 0.0
+    )
+
+def score_hdb_part(items: List[Dict[str, Any]]) -> pd.DataFrame:
+    try:
+        hdb_api.check_hdb_batch(len(items), hdb_api.HDB_STREAM_MAX_ROWS)
+    except HTTPException as he:
+        return pd.DataFrame({"error": pd.Series([str(he.detail)] * len(items), dtype=object)})
+    with hdb_api.hdb_swap_gate.request_sync():
+        frame = hdb_api.score_hdb_rows(items)
+    succeeded = frame["error"].isna().to_numpy()
+    hdb_api.metrics.count_prediction("ml_model", amount=int(succeeded.sum()))
+    return frame.assign(calculation_method=pd.Series(np.where(succeeded, "ml_model", None), dtype=object),
+                        model_version=pd.Series(np.where(succeeded, frame["model_version"], None), dtype=object))
+
+def score_private_part(items: List[Dict[str, Any]]) -> pd.DataFrame:
+    errors: Dict[int, str] = {}
+    positions, features = [], []
+    for position, item in enumerate(items):
+        try:
+            features.append(private_api.PropertyFeatures(**row_object(item)))
+            positions.append(position)
+        except Exception as e:
+            errors[position] = str(e)
+
+    estimated = np.full(len(items), np.nan)
+    low = np.full(len(items), np.nan)
+    high = np.full(len(items), np.nan)
+    calculation_method = model_version = None
+    if features and private_api.startup_state.loading:
+        errors.update({position: "Private property model is still loading" for position in positions})
+    elif features:
+        with private_api.private_swap_gate.request_sync():
+            predictions, chunk_errors, calculation_method = private_api.predict_private_chunk(features)
+            model_version = private_api.private_model_version
+            lower_pct, upper_pct = private_api.private_interval_bounds(predictions, calculation_method, features)
+        private_api.metrics.count_prediction(calculation_method, amount=len(features) - len(chunk_errors))
+        estimated[positions] = np.round(predictions, 2)
+        low[positions] = np.round(predictions * (1 - lower_pct / 100), 2)
+        high[positions] = np.round(predictions * (1 + upper_pct / 100), 2)
+        errors.update({positions[i]: error for i, error in chunk_errors.items()})
+
+    error_column = [errors.get(position) for position in range(len(items))]
+    succeeded = np.array([error is None for error in error_column])
+    return pd.DataFrame({
+        "estimated_value": estimated,
+        "confidence_low": low,
+        "confidence_high": high,
+        "calculation_method": pd.Series(np.where(succeeded, calculation_method, None), dtype=object),
+        "correction_details": None,
+        "model_version": pd.Series(np.where(succeeded, model_version, None), dtype=object),
+        "error": pd.Series(error_column, dtype=object)
+    })
+
+def score_mixed_rows(items: List[Dict[str, Any]], offset: int = 0) -> pd.DataFrame:
+    """Scores one chunk of a mixed batch into MIXED_RESULT_COLUMNS, routing each row to its service."""
+    services = np.array([service_for_row(item) for item in items], dtype=object)
+    frame = pd.DataFrame({"index": np.arange(offset, offset + len(items)), "service": services})
+    parts = []
+    for service, score in (("hdb", score_hdb_part), ("private", score_private_part)):
+        positions = np.flatnonzero(services == service)
+        if len(positions):
+            part = score([items[position] for position in positions])
+            parts.append(part.drop(columns=["index"], errors="ignore").set_axis(positions))
+    if not parts:
+        return frame.reindex(columns=list(MIXED_RESULT_COLUMNS))
+    scored = pd.concat(parts).sort_index()
+    scored = scored.astype(object).where(scored.notna(), None)
+    for column in ("estimated_value", "confidence_low", "confidence_high"):
+        scored[column] = scored[column].astype(float)
+    return pd.concat([frame, scored.reset_index(drop=True)], axis=1)[list(MIXED_RESULT_COLUMNS)]
+
+def iter_mixed_batch(chunks):
+    rows = 0
+    for items in chunks:
+        yield score_mixed_rows(items, rows)
+        rows += len(items)
+
+@app.post("/predict/batch/stream")
+async def predict_batch_stream(request: Request, accept: Optional[str] = Header(None)):
+    """
+    Mixed counterpart of the HDB /predict/batch/stream: an NDJSON body,
+    spooled and scored chunk by chunk, streamed back as NDJSON or Arrow IPC
+    """
+    stream_format = negotiate(accept) or "ndjson"
+    require_format(stream_format)
+    body, total = await spool_ndjson(request, VALUATION_STREAM_MAX_ROWS)
+    return streaming_response(
+        iter_mixed_batch(iter_ndjson_rows(body, hdb_api.HDB_BATCH_CHUNK_SIZE)), stream_format, MIXED_RESULT_COLUMNS,
+        headers={"X-Total-Rows": str(total)}
+    )
+
+@app.on_event("startup")
+async def start_model_loading():
+    await hdb_api.start_model_loading()
+    await private_api.start_model_loading()
+
+@app.on_event("shutdown")
+async def stop_batchers():
+    await hdb_api.stop_batcher()
+    await private_api.stop_batcher()
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=5000)
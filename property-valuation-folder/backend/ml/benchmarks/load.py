@@ -0,0 +1,56 @@
+import asyncio
+import itertools
+import time
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+
+async def _drive(client, path: str, bodies: Sequence[Dict[str, Any]], concurrency: int,
+                 total_requests: int) -> Dict[str, Any]:
+    counter = itertools.count()
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+
+    async def worker():
+        while True:
+            i = next(counter)
+            if i >= total_requests:
+                return
+            started = time.perf_counter()
+            response = await client.post(path, json=bodies[i % len(bodies)])
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "elapsed_seconds": round(elapsed, 4),
+        "throughput_rps": round(total_requests / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+        "max_ms": round(float(latencies_ms.max()), 3),
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())}
+    }
+
+
+async def run_load(app, bodies: Sequence[Dict[str, Any]], concurrency_levels: Sequence[int],
+                   requests_per_level: int, path: str = "/predict", warm_up_requests: int = 50) -> List[Dict[str, Any]]:
+    """Drive a FastAPI app in-process through httpx's ASGI transport, one run per concurrency level."""
+    try:
+        import httpx
+    except ImportError:
+        raise SystemExit("The load generator requires httpx (pip install httpx)")
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+        await _drive(client, path, bodies, 4, warm_up_requests)
+        return [
+            await _drive(client, path, bodies, concurrency, requests_per_level)
+            for concurrency in concurrency_levels
+        ]
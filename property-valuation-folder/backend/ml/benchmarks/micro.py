@@ -0,0 +1,68 @@
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+
+def bench(fn: Callable[[], Any], min_time: float = 0.2, repeats: int = 5) -> Dict[str, float]:
+    """Time fn like timeit: calibrate a loop count to ~min_time/repeats, then report per-call microseconds."""
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / repeats or number >= 1 << 20:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / repeats / elapsed))
+
+    per_call = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        per_call.append((time.perf_counter() - started) / number * 1e6)
+    per_call = np.array(per_call)
+    return {
+        "loops": number,
+        "min_us": round(float(per_call.min()), 3),
+        "median_us": round(float(np.median(per_call)), 3),
+        "mean_us": round(float(per_call.mean()), 3)
+    }
+
+
+def run_microbenchmarks(hdb, private, hdb_samples: List[Dict[str, Any]],
+                        private_samples: List[Dict[str, Any]], min_time: float = 0.2) -> Dict[str, Dict[str, float]]:
+    hdb_features = []
+    for sample in hdb_samples:
+        features = hdb.PropertyFeatures(**sample)
+        hdb.normalize_hdb_features(features, features.property_type.upper())
+        hdb_features.append(features)
+    private_features = [private.PropertyFeatures(**sample) for sample in private_samples]
+    floor_levels = [sample.get("floor_level") for sample in hdb_samples]
+
+    def cycle(items):
+        state = {"i": 0}
+
+        def next_item():
+            state["i"] = (state["i"] + 1) % len(items)
+            return items[state["i"]]
+        return next_item
+
+    next_floor, next_hdb, next_private = cycle(floor_levels), cycle(hdb_features), cycle(private_features)
+    raw = np.full(1, 500000.0)
+
+    cases = {
+        "get_floor_number": lambda: hdb.get_floor_number(next_floor()),
+        "prepare_hdb_prediction_data": lambda: hdb.prepare_hdb_prediction_data(next_hdb()),
+        "prepare_hdb_input": lambda: hdb.prepare_hdb_input(next_hdb()),
+        "apply_correction_factors": lambda: hdb.apply_correction_factors(500000.0, next_hdb()),
+        "apply_correction_factors_batch": lambda: hdb.apply_correction_factors_batch(
+            np.repeat(raw, len(hdb_features)), hdb_features
+        ),
+        "prepare_private_property_data": lambda: private.prepare_private_property_data(next_private()),
+        "prepare_private_input": lambda: private.prepare_private_input(next_private()),
+        "value_hdb_property": lambda: hdb.value_hdb_property(next_hdb()),
+        "value_private_property": lambda: private.value_private_property(next_private())
+    }
+    return {name: bench(fn, min_time=min_time) for name, fn in cases.items()}
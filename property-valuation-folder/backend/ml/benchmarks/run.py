@@ -0,0 +1,202 @@
+"""
+Benchmark and load-test suite for the HDB and private valuation APIs.
+
+Trains small stand-in models from hdb_resale_data_onemap_enriched.csv,
+imports both FastAPI apps against them, runs microbenchmarks of the hot
+feature/correction functions and an in-process load test at several
+concurrency levels, and writes the results as JSON:
+
+    cd backend/ml
+    python -m benchmarks.run --out benchmark_results.json
+    python -m benchmarks.run --baseline main_results.json --fail-on-regression
+
+The service configuration (MICRO_BATCHING, HDB_FAST_PATH, ...) is read
+from the environment as usual, so the same suite compares settings.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.stand_in_models import DEFAULT_DATA_PATH, build_stand_in_models, load_transactions
+
+PRIVATE_PROPERTY_TYPES = ["Condominium", "Apartment", "Executive Condominium", "Terrace House", "Semi-Detached House"]
+PRIVATE_TENURES = ["Freehold", "99-year leasehold", "999-year leasehold"]
+
+# metric suffix -> True when higher is better
+METRIC_DIRECTIONS = {"median_us": False, "p50_ms": False, "p99_ms": False, "throughput_rps": True}
+
+
+def hdb_request_bodies(df, limit: int) -> List[Dict[str, Any]]:
+    bodies = []
+    for row in df.head(limit).itertuples(index=False):
+        bodies.append({
+            "property_type": f"HDB {row.flat_type}",
+            "area_sqm": float(row.floor_area_sqm),
+            "floor_level": str(row.storey_range).replace(" TO ", "-"),
+            "precinct": row.town,
+            "flat_type": row.flat_type,
+            "flat_model": row.flat_model,
+            "remaining_lease": None if np.isnan(row.remaining_lease_years) else int(row.remaining_lease_years),
+            "sector": row.region,
+            "distance_to_mrt": None if np.isnan(row.nearest_mrt_distance_km) else float(row.nearest_mrt_distance_km),
+            "latitude": None if np.isnan(row.latitude) else float(row.latitude),
+            "longitude": None if np.isnan(row.longitude) else float(row.longitude)
+        })
+    return bodies
+
+
+def private_request_bodies(df, limit: int) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(0)
+    bodies = []
+    for i, row in enumerate(df.head(limit).itertuples(index=False)):
+        bodies.append({
+            "property_type": PRIVATE_PROPERTY_TYPES[i % len(PRIVATE_PROPERTY_TYPES)],
+            "area_sqm": round(float(row.floor_area_sqm) * 1.4, 1),
+            "floor_level": str(row.storey_range).replace(" TO ", "-"),
+            "tenure": PRIVATE_TENURES[i % len(PRIVATE_TENURES)],
+            "zone": int(rng.integers(1, 29)),
+            "x_coord": None if np.isnan(row.longitude) else float(row.longitude) * 1000,
+            "y_coord": None if np.isnan(row.latitude) else float(row.latitude) * 1000
+        })
+    return bodies
+
+
+def environment_info() -> Dict[str, Any]:
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    }
+    for module in ("pandas", "xgboost", "sklearn", "fastapi"):
+        try:
+            info[module] = __import__(module).__version__
+        except ImportError:
+            info[module] = None
+    try:
+        info["git_commit"] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        info["git_commit"] = None
+    for name in ("MICRO_BATCHING", "HDB_FAST_PATH", "PRIVATE_FAST_PATH", "PREDICTION_CACHE_SIZE"):
+        info[name] = os.environ.get(name)
+    return info
+
+
+def flatten_metrics(results: Dict[str, Any]) -> Dict[str, float]:
+    metrics = {}
+    for name, stats in results.get("micro", {}).items():
+        metrics[f"micro.{name}.median_us"] = stats["median_us"]
+    for service, levels in results.get("load", {}).items():
+        for level in levels:
+            for key in ("p50_ms", "p99_ms", "throughput_rps"):
+                metrics[f"load.{service}.c{level['concurrency']}.{key}"] = level[key]
+    return metrics
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """Metrics that got worse than the baseline by more than `tolerance` (a fraction)."""
+    current, previous = flatten_metrics(results), flatten_metrics(baseline)
+    regressions = []
+    for name, value in current.items():
+        before = previous.get(name)
+        if not before:
+            continue
+        higher_is_better = METRIC_DIRECTIONS[name.rsplit(".", 1)[1]]
+        change = (value - before) / before
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append({"metric": name, "baseline": before, "current": value, "change": round(change, 4)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HDB and private valuation APIs")
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH, help="hdb_resale_data_onemap_enriched.csv")
+    parser.add_argument("--models-dir", default=None, help="Reuse or keep stand-in models here (default: temp dir)")
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--concurrency", default="1,8,32,128")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per concurrency level")
+    parser.add_argument("--samples", type=int, default=500, help="Distinct request bodies per service")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds per microbenchmark")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--baseline", default=None, help="Earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown before flagging")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    models_dir = args.models_dir or tempfile.mkdtemp(prefix="valuation-benchmark-")
+    os.environ.setdefault("MODEL_PATH_HDB", os.path.join(models_dir, "hdb"))
+    os.environ.setdefault("MODEL_PATH_PRIVATE", os.path.join(models_dir, "private"))
+    os.environ.setdefault("COMPARABLES_DATA_PATH", os.path.abspath(args.data))
+    os.environ.setdefault("PREDICTION_CACHE_SIZE", "0")
+    os.environ.setdefault("PRELOAD_MODELS", "false")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    if not os.path.exists(os.path.join(models_dir, "hdb", "hdb_deployment_pipeline.pkl")):
+        started = time.perf_counter()
+        build_stand_in_models(models_dir, args.data)
+        print(f"Trained stand-in models in {models_dir} ({time.perf_counter() - started:.1f}s)", file=sys.stderr)
+
+    import api.private_only_api as private
+    import api.simple_api as hdb
+
+    hdb.startup_state.run(hdb.load_hdb_service, hdb.warm_up_hdb_model)
+    private.startup_state.run(private.load_private_model, private.warm_up_private_model)
+    if not (hdb.startup_state.ready and private.startup_state.ready):
+        raise SystemExit(f"Services failed to start: hdb={hdb.startup_state.error} private={private.startup_state.error}")
+
+    transactions = load_transactions(args.data)
+    hdb_bodies = hdb_request_bodies(transactions, args.samples)
+    private_bodies = private_request_bodies(transactions, args.samples)
+
+    from benchmarks.micro import run_microbenchmarks
+    results: Dict[str, Any] = {
+        "environment": environment_info(),
+        "startup": {"hdb": hdb.startup_state.snapshot()["timings"], "private": private.startup_state.snapshot()["timings"]},
+        "micro": run_microbenchmarks(hdb, private, hdb_bodies, private_bodies, min_time=args.min_time),
+        "load": {}
+    }
+
+    if not args.skip_load:
+        from benchmarks.load import run_load
+        levels = [int(level) for level in args.concurrency.split(",") if level]
+        results["load"]["hdb"] = asyncio.run(run_load(hdb.app, hdb_bodies, levels, args.requests))
+        results["load"]["private"] = asyncio.run(run_load(private.app, private_bodies, levels, args.requests))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        results["regressions"] = regressions
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+
+    for name, stats in results["micro"].items():
+        print(f"{name:40s} {stats['median_us']:>12.1f} us")
+    for service, levels in results["load"].items():
+        for level in levels:
+            print(f"{service:8s} c={level['concurrency']:<4d} {level['throughput_rps']:>9.1f} req/s  "
+                  f"p50 {level['p50_ms']:.2f}  p95 {level['p95_ms']:.2f}  p99 {level['p99_ms']:.2f} ms")
+    for regression in regressions:
+        print(f"REGRESSION {regression['metric']}: {regression['baseline']} -> {regression['current']} "
+              f"({regression['change']:+.1%})")
+    print(f"Results written to {args.out}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
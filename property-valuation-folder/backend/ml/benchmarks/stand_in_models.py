@@ -0,0 +1,122 @@
+"""
+Small stand-in models trained on hdb_resale_data_onemap_enriched.csv so the
+benchmarks run offline with the same model types and feature layouts as the
+production artifacts.
+"""
+import os
+import pickle
+import shutil
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA_PATH = os.path.join(ML_DIR, "..", "..", "..", "hdb_resale_data_onemap_enriched.csv")
+
+HDB_CATEGORICAL_FEATURES = ["town", "flat_type", "flat_model"]
+HDB_NUMERIC_FEATURES = [
+    "area_cbd_interaction_scaled", "remaining_lease_at_transaction", "location_score",
+    "area_premium_for_flattype", "floor_mrt_premium_scaled"
+]
+HDB_JSON_FILES = ["correction_factors.json", "confidence_intervals.json", "town_to_region.json"]
+
+REGION_SCORES = {"Central": 9, "East": 7, "Northeast": 6, "North": 5, "West": 5}
+TYPICAL_AREAS = {"1 ROOM": 35, "2 ROOM": 45, "3 ROOM": 65, "4 ROOM": 90, "5 ROOM": 110, "EXECUTIVE": 130}
+
+
+def load_transactions(data_path: str = DEFAULT_DATA_PATH) -> pd.DataFrame:
+    df = pd.read_csv(data_path, low_memory=False)
+    df["remaining_lease_years"] = df["remaining_lease"].astype(str).str.extract(r"(\d+)")[0].astype(float)
+    return df.dropna(subset=["resale_price", "floor_area_sqm"]).reset_index(drop=True)
+
+
+def hdb_training_frame(df: pd.DataFrame) -> pd.DataFrame:
+    distance = df["nearest_mrt_distance_km"].fillna(5.0)
+    mrt_score = np.select([distance < 0.3, distance < 0.6, distance < 1.0], [9, 7, 5], 3)
+    mrt_factor = np.select([distance < 0.3, distance < 0.6, distance < 1.0], [1.3, 1.2, 1.1], 1.0)
+    region_score = df["region"].map(REGION_SCORES).fillna(5)
+    typical_area = df["flat_type"].map(TYPICAL_AREAS).fillna(90)
+    return pd.DataFrame({
+        "town": df["town"],
+        "flat_type": df["flat_type"],
+        "flat_model": df["flat_model"],
+        "area_cbd_interaction_scaled": df["floor_area_sqm"] / (1 + distance) / 100,
+        "remaining_lease_at_transaction": df["remaining_lease_years"].fillna(70),
+        "location_score": (region_score + mrt_score) / 2,
+        "area_premium_for_flattype": df["floor_area_sqm"] / typical_area,
+        "floor_mrt_premium_scaled": (np.minimum(df["storey_mid"].fillna(5) / 40, 1) * 0.7 + 0.3) * mrt_factor
+    })
+
+
+def private_training_frame(df: pd.DataFrame, feature_names) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    area = df["floor_area_sqm"].to_numpy(dtype=float) * 1.4
+    floor = df["storey_mid"].fillna(5).to_numpy(dtype=float)
+    columns = {name: np.zeros(len(df)) for name in feature_names}
+    columns.update({
+        "district": rng.integers(1, 29, len(df)),
+        "region": df["region"].astype("category").cat.codes.to_numpy(),
+        "latitude": df["latitude"].fillna(1.35).to_numpy(),
+        "longitude": df["longitude"].fillna(103.8).to_numpy(),
+        "x_coord": df["longitude"].fillna(103.8).to_numpy() * 1000,
+        "y_coord": df["latitude"].fillna(1.35).to_numpy() * 1000,
+        "avg_floor": floor,
+        "is_high_floor": (floor > 10).astype(int),
+        "area_sqm": area,
+        "log_area": np.log(area),
+        "size_category": np.digitize(area, [50, 100, 150, 200]),
+        "is_freehold": rng.integers(0, 2, len(df)),
+        "is_apartment": rng.integers(0, 2, len(df)),
+        "transaction_year": df["data_year"].fillna(2023).to_numpy(),
+        "transaction_quarter": df["data_quarter"].fillna(1).to_numpy()
+    })
+    return pd.DataFrame(columns)[list(feature_names)].astype(float)
+
+
+def build_stand_in_models(out_dir: str, data_path: str = DEFAULT_DATA_PATH,
+                          private_feature_names=None, n_estimators: int = 100) -> Dict[str, str]:
+    """Train both stand-in models into out_dir/hdb and out_dir/private and return those directories."""
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+    from xgboost import XGBRegressor
+
+    df = load_transactions(data_path)
+    hdb_dir = os.path.join(out_dir, "hdb")
+    private_dir = os.path.join(out_dir, "private")
+    os.makedirs(hdb_dir, exist_ok=True)
+    os.makedirs(private_dir, exist_ok=True)
+
+    pipeline = Pipeline([
+        ("preprocessor", ColumnTransformer([
+            ("cat", OneHotEncoder(handle_unknown="ignore"), HDB_CATEGORICAL_FEATURES),
+            ("num", StandardScaler(), HDB_NUMERIC_FEATURES)
+        ])),
+        ("model", XGBRegressor(n_estimators=n_estimators, max_depth=6, random_state=0, n_jobs=1))
+    ])
+    pipeline.fit(hdb_training_frame(df), df["resale_price"])
+    with open(os.path.join(hdb_dir, "hdb_deployment_pipeline.pkl"), "wb") as f:
+        pickle.dump(pipeline, f)
+    with open(os.path.join(hdb_dir, "hdb_feature_lists.pkl"), "wb") as f:
+        pickle.dump({
+            "all_features": HDB_CATEGORICAL_FEATURES + HDB_NUMERIC_FEATURES,
+            "categorical_features": HDB_CATEGORICAL_FEATURES,
+            "numeric_features": HDB_NUMERIC_FEATURES
+        }, f)
+    for name in HDB_JSON_FILES:
+        shipped = os.path.join(ML_DIR, "hdb", name)
+        if os.path.exists(shipped):
+            shutil.copy(shipped, os.path.join(hdb_dir, name))
+
+    if private_feature_names is None:
+        from api.private_only_api import DEFAULT_PRIVATE_FEATURE_NAMES
+        private_feature_names = DEFAULT_PRIVATE_FEATURE_NAMES
+    numeric_private_features = [name for name in private_feature_names if name not in ("property_type", "tenure_type")]
+    private_frame = private_training_frame(df, numeric_private_features)
+    private_model = XGBRegressor(n_estimators=n_estimators, max_depth=6, random_state=0, n_jobs=1)
+    private_model.fit(private_frame, df["resale_price"] * 2.2 * (1 + 0.1 * private_frame["is_freehold"]))
+    with open(os.path.join(private_dir, "property_valuation_xgboost.pkl"), "wb") as f:
+        pickle.dump(private_model, f)
+
+    return {"hdb": hdb_dir, "private": private_dir}
@@ -0,0 +1,153 @@
+"""
+The DataFrame path, the compiled FeaturePlan path and the native backend
+must give exactly the same predictions for the same requests.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from api.feature_plan import FeaturePlan
+from api.inference import NativeBackend, PipelineBackend
+
+CATEGORICAL = ["town", "flat_type"]
+NUMERIC = ["area_sqm", "distance_to_mrt", "remaining_lease"]
+FEATURES = CATEGORICAL + NUMERIC
+
+TOWNS = ["BEDOK", "TAMPINES", "WOODLANDS", "QUEENSTOWN", "YISHUN"]
+FLAT_TYPES = ["3 ROOM", "4 ROOM", "5 ROOM"]
+
+
+def training_frame(rows: int = 400, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "town": rng.choice(TOWNS, rows),
+        "flat_type": rng.choice(FLAT_TYPES, rows),
+        "area_sqm": rng.uniform(60, 140, rows).round(1),
+        "distance_to_mrt": rng.uniform(0.1, 2.5, rows).round(2),
+        "remaining_lease": rng.uniform(40, 95, rows).round(0)
+    })
+    frame.loc[rng.random(rows) < 0.1, "distance_to_mrt"] = np.nan
+    price = (frame["area_sqm"] * 5000 + frame["remaining_lease"] * 2000
+             - frame["distance_to_mrt"].fillna(1.5) * 40000
+             + frame["town"].map({town: i * 25000 for i, town in enumerate(TOWNS)}))
+    return frame, price.to_numpy()
+
+
+def request_rows(rows: int = 200, seed: int = 1):
+    """Requests as the services see them: dicts with unknown towns and missing MRT distances."""
+    rng = np.random.default_rng(seed)
+    requests = []
+    for i in range(rows):
+        requests.append({
+            "town": rng.choice(TOWNS + ["PUNGGOL", "SENGKANG"]) if i % 7 else "NOT A TOWN",
+            "flat_type": rng.choice(FLAT_TYPES + ["EXECUTIVE"]),
+            "area_sqm": float(rng.uniform(40, 160)),
+            "distance_to_mrt": None if i % 5 == 0 else float(rng.uniform(0.05, 3.0)),
+            "remaining_lease": float(rng.integers(30, 99))
+        })
+    return requests
+
+
+def build_pipeline(estimator: str, sparse: bool, encoder: str = "onehot"):
+    from sklearn.compose import ColumnTransformer
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler
+
+    if encoder == "onehot":
+        categorical = OneHotEncoder(handle_unknown="ignore", sparse_output=sparse)
+    else:
+        categorical = OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1)
+    preprocessor = ColumnTransformer([
+        ("num", Pipeline([("imputer", SimpleImputer(strategy="median")), ("scaler", StandardScaler())]), NUMERIC),
+        ("cat", Pipeline([("imputer", SimpleImputer(strategy="most_frequent")), ("encoder", categorical)]), CATEGORICAL)
+    ], sparse_threshold=1.0 if sparse else 0.0)
+
+    if estimator == "xgboost":
+        import xgboost
+        model = xgboost.XGBRegressor(n_estimators=40, max_depth=4, random_state=0)
+    elif estimator == "lightgbm":
+        import lightgbm
+        model = lightgbm.LGBMRegressor(n_estimators=40, num_leaves=15, random_state=0, verbose=-1)
+    else:
+        from sklearn.ensemble import GradientBoostingRegressor
+        model = GradientBoostingRegressor(n_estimators=40, random_state=0)
+
+    pipeline = Pipeline([("preprocessor", preprocessor), ("model", model)])
+    frame, price = training_frame()
+    pipeline.fit(frame[FEATURES], price)
+    return pipeline
+
+
+def compile_plan() -> FeaturePlan:
+    def numeric(name):
+        return lambda request: np.nan if request[name] is None else float(request[name])
+
+    table = {name: numeric(name) for name in NUMERIC}
+    table.update({name: (lambda request, name=name: request[name]) for name in CATEGORICAL})
+    return FeaturePlan.compile(FEATURES, table, categorical_features=CATEGORICAL)
+
+
+MODELS = [
+    ("xgboost", True, "onehot"),
+    ("xgboost", False, "onehot"),
+    ("xgboost", False, "ordinal"),
+    ("lightgbm", False, "onehot"),
+    ("sklearn", True, "onehot")
+]
+
+
+@pytest.mark.parametrize("estimator,sparse,encoder", MODELS)
+def test_all_paths_match_the_pipeline(estimator, sparse, encoder):
+    pytest.importorskip(estimator if estimator != "sklearn" else "sklearn")
+    pipeline = build_pipeline(estimator, sparse, encoder)
+    requests = request_rows()
+    frame = pd.DataFrame(requests)[FEATURES]
+    reference = np.asarray(pipeline.predict(frame), dtype=float)
+
+    plan = compile_plan()
+    plan_rows = np.vstack([plan.fill(request) for request in requests])
+    native = NativeBackend.from_model(pipeline)
+    assert native.preprocessing.zero_is_missing == sparse
+
+    # Single-row paths, as /predict runs them
+    for i, request in enumerate(requests):
+        row = plan.fill(request)
+        assert pipeline.predict(plan.frame(row))[0] == reference[i]
+        assert native.predict(row, plan.feature_names)[0] == reference[i]
+
+    # Batch paths, as /predict/batch runs them
+    np.testing.assert_array_equal(np.asarray(pipeline.predict(plan.frame(plan_rows)), dtype=float), reference)
+    np.testing.assert_array_equal(native.predict(frame), reference)
+    np.testing.assert_array_equal(native.predict(plan_rows, plan.feature_names), reference)
+    np.testing.assert_array_equal(PipelineBackend(pipeline).predict(plan_rows, plan.feature_names), reference)
+
+
+def test_requests_cover_unknown_categories_and_missing_distance():
+    requests = request_rows()
+    assert any(request["town"] not in TOWNS for request in requests)
+    assert any(request["flat_type"] not in FLAT_TYPES for request in requests)
+    assert any(request["distance_to_mrt"] is None for request in requests)
+
+
+ARTIFACT_MODELS = [model for model in MODELS if model[0] != "sklearn"]
+
+
+@pytest.mark.parametrize("estimator,sparse,encoder", ARTIFACT_MODELS)
+def test_exported_artifact_matches_the_pickle(estimator, sparse, encoder, tmp_path):
+    pytest.importorskip(estimator)
+    from api.model_artifacts import ArtifactModel, export_artifact, load_artifact
+
+    pipeline = build_pipeline(estimator, sparse, encoder)
+    frame = pd.DataFrame(request_rows())[FEATURES]
+    reference = np.asarray(pipeline.predict(frame), dtype=float)
+
+    export_artifact(pipeline, str(tmp_path), {"service": "test"})
+    model = load_artifact(str(tmp_path)).model
+    assert isinstance(model, ArtifactModel)
+    # With sparse one-hot output the booster sees implicit zeros as missing values, the artifact has to as well
+    assert model.preprocessor.sparse_output == sparse
+
+    np.testing.assert_array_equal(np.asarray(model.predict(frame), dtype=float), reference)
+    for i in range(0, len(frame), 25):
+        assert model.predict(frame.iloc[[i]])[0] == reference[i]
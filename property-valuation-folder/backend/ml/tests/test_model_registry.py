@@ -0,0 +1,102 @@
+"""
+A swap closes the gate to new requests, drains the in-flight ones and
+wakes the waiting requests as soon as it reopens.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from api.model_registry import SwapGate
+
+
+def swap_in_thread(gate, apply):
+    thread = threading.Thread(target=gate.swap, args=(apply,))
+    thread.start()
+    return thread
+
+
+def test_requests_wait_for_the_swap_without_polling():
+    gate = SwapGate(drain_timeout=1.0)
+    log = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        started = threading.Event()
+        release = threading.Event()
+
+        def apply():
+            started.set()
+            release.wait()
+            log.append("installed")
+
+        thread = swap_in_thread(gate, apply)
+        await loop.run_in_executor(None, started.wait)
+
+        async def request(i):
+            async with gate.request():
+                log.append(i)
+
+        waiting = [asyncio.ensure_future(request(i)) for i in range(3)]
+        await asyncio.sleep(0.05)
+        assert log == []
+        # Waiters park on a future; nothing runs on the loop until the swap finishes
+        assert all(not task.done() for task in waiting)
+        assert len(gate._waiters) == 3
+
+        release.set()
+        woken = time.perf_counter()
+        await asyncio.gather(*waiting)
+        thread.join()
+        return time.perf_counter() - woken
+
+    latency = asyncio.run(main())
+    assert log[0] == "installed" and sorted(log[1:]) == [0, 1, 2]
+    assert latency < 0.5
+    assert gate._waiters == []
+
+
+def test_cancelled_waiter_does_not_hold_the_gate():
+    gate = SwapGate(drain_timeout=1.0)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        started = threading.Event()
+        release = threading.Event()
+        thread = swap_in_thread(gate, lambda: (started.set(), release.wait()))
+        await loop.run_in_executor(None, started.wait)
+
+        async def request():
+            async with gate.request():
+                pass
+
+        cancelled = asyncio.ensure_future(request())
+        waiting = asyncio.ensure_future(request())
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        release.set()
+        await waiting
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        thread.join()
+
+    asyncio.run(main())
+    assert gate._in_flight == 0
+    # The next swap drains immediately
+    assert gate.swap(lambda: "swapped") == "swapped"
+
+
+def test_swap_waits_for_in_flight_requests():
+    gate = SwapGate(drain_timeout=1.0)
+    order = []
+
+    async def main():
+        async with gate.request():
+            thread = swap_in_thread(gate, lambda: order.append("installed"))
+            await asyncio.sleep(0.05)
+            order.append("request done")
+        await asyncio.get_running_loop().run_in_executor(None, thread.join)
+
+    asyncio.run(main())
+    assert order == ["request done", "installed"]
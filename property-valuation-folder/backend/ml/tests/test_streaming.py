@@ -0,0 +1,61 @@
+"""
+NDJSON request bodies are spooled as they arrive and parsed chunk by
+chunk, whatever the network splits them into.
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException, Request
+
+from api.streaming import MalformedRow, iter_ndjson_rows, row_object, spool_ndjson
+
+
+def request_with_body(body: bytes, part_size: int) -> Request:
+    parts = [body[i:i + part_size] for i in range(0, len(body), part_size)] or [b""]
+    messages = [{"type": "http.request", "body": part, "more_body": i < len(parts) - 1} for i, part in enumerate(parts)]
+
+    async def receive():
+        return messages.pop(0)
+
+    return Request({"type": "http", "method": "POST", "headers": []}, receive)
+
+
+def spool(body: bytes, part_size: int, max_rows: int = 1000):
+    return asyncio.run(spool_ndjson(request_with_body(body, part_size), max_rows))
+
+
+ROWS = [{"property_type": "HDB 4-ROOM", "area_sqm": 90 + i} for i in range(23)]
+BODY = ("\n".join(json.dumps(row) for row in ROWS[:10]) + "\n\n"
+        + "\n".join(json.dumps(row) for row in ROWS[10:])).encode()
+
+
+@pytest.mark.parametrize("part_size", [1, 7, 64, len(BODY)])
+def test_rows_survive_any_split_of_the_body(part_size):
+    body, total = spool(BODY, part_size)
+
+    chunks = list(iter_ndjson_rows(body, 5))
+
+    assert total == len(ROWS)
+    assert [len(chunk) for chunk in chunks] == [5, 5, 5, 5, 3]
+    assert [row for chunk in chunks for row in chunk] == ROWS
+    assert body.closed
+
+
+def test_rows_past_the_limit_are_rejected_while_reading():
+    with pytest.raises(HTTPException) as raised:
+        spool(BODY, 16, max_rows=len(ROWS) - 1)
+    assert raised.value.status_code == 413
+
+
+def test_bad_lines_become_row_errors():
+    body, total = spool(b'{"area_sqm": 90}\n{not json\n[1, 2]\n', 5)
+
+    rows = next(iter_ndjson_rows(body, 10))
+
+    assert total == 3
+    assert row_object(rows[0]) == {"area_sqm": 90}
+    assert isinstance(rows[1], MalformedRow)
+    for row in rows[1:]:
+        with pytest.raises(ValueError):
+            row_object(row)
@@ -1,21 +1,363 @@
+"""
+Incremental HDB resale data ingestion from the data.gov.sg datastore API.
 
-import pandas as pd
-import requests
+Each year/quarter is a partition. Partitions are fetched concurrently over
+one bounded connection pool and written as columnar part files:
+
+    data/hdb_resale/
+        year=2024/quarter=3/part-00000.parquet
+        year=2024/quarter=3/part-00001.parquet   (rows added by a later run)
+        ingestion_state.json
+
+The state file records, per month, how many records have been fetched, so
+a re-run asks the API only for records past that offset and skips closed
+partitions altogether. Rows whose `_id` is already in the partition are
+dropped before writing.
+
+    python src/data_collection.py --start-year 2017 --out data/hdb_resale
+"""
+import argparse
 import json
-from datetime import datetime
+import logging
+import os
+import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
 
-def download_hdb_data(year, quarter):
+BASE_URL = os.environ.get("DATA_GOV_BASE_URL", "https://data.gov.sg")
+DATASTORE_PATH = "/api/action/datastore_search"
+RESOURCE_ID = os.environ.get("HDB_RESALE_RESOURCE_ID", "d_8b84c4ee58e3cfc0ece0d773c8ca6abc")
+
+PAGE_SIZE = int(os.environ.get("INGEST_PAGE_SIZE", "1000"))
+MAX_RETRIES = int(os.environ.get("INGEST_MAX_RETRIES", "5"))
+BACKOFF_SECONDS = float(os.environ.get("INGEST_BACKOFF_SECONDS", "0.5"))
+REQUEST_TIMEOUT = float(os.environ.get("INGEST_TIMEOUT", "30"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+STATE_FILE = "ingestion_state.json"
+NUMERIC_COLUMNS = ["_id", "floor_area_sqm", "lease_commence_date", "resale_price"]
+
+QUARTER_MONTHS = {
+    1: ["01", "02", "03"],
+    2: ["04", "05", "06"],
+    3: ["07", "08", "09"],
+    4: ["10", "11", "12"]
+}
+
+
+class IngestionError(Exception):
+    pass
+
+
+def create_session(workers):
+    """
+    One session for all fetch threads; the adapter's pool holds at most
+    `workers` connections and blocks instead of opening more
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_page(session, base_url, resource_id, month, offset, limit=PAGE_SIZE):
+    """
+    Fetches one page of a month's records, retrying connection errors and
+    429/5xx responses with exponential backoff (honouring Retry-After)
+    """
+    params = {
+        "resource_id": resource_id,
+        "filters": json.dumps({"month": month}),
+        "sort": "_id asc",
+        "offset": offset,
+        "limit": limit
+    }
+
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            response = session.get(base_url.rstrip("/") + DATASTORE_PATH, params=params, timeout=REQUEST_TIMEOUT)
+            if response.status_code == 200:
+                data = response.json()
+                if not data.get("success", True) or "result" not in data:
+                    raise IngestionError(f"Unexpected response for {month} offset {offset}: {str(data)[:200]}")
+                return data["result"]
+            if response.status_code not in RETRY_STATUSES:
+                raise IngestionError(f"HTTP {response.status_code} for {month} offset {offset}")
+            retry_after = response.headers.get("Retry-After")
+            reason = f"HTTP {response.status_code}"
+        except (requests.ConnectionError, requests.Timeout) as e:
+            retry_after = None
+            reason = type(e).__name__
+
+        if attempt == MAX_RETRIES:
+            raise IngestionError(f"{reason} for {month} offset {offset} after {MAX_RETRIES} retries")
+        delay = BACKOFF_SECONDS * (2 ** attempt) * (0.5 + random.random())
+        if retry_after is not None:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        logger.debug(f"{reason} for {month} offset {offset}, retrying in {delay:.2f}s")
+        time.sleep(delay)
+
+
+def fetch_month(session, base_url, resource_id, month, start_offset=0):
+    """
+    Fetches a month's records from `start_offset` onwards. Returns the
+    records and the total the API reported for the month
+    """
+    records = []
+    offset = start_offset
+    total = None
+
+    while True:
+        result = fetch_page(session, base_url, resource_id, month, offset)
+        page = result.get("records", [])
+        total = result.get("total", total)
+        records.extend(page)
+        offset += len(page)
+        if len(page) < PAGE_SIZE or (total is not None and offset >= total):
+            break
+
+    return records, total if total is not None else offset
+
+
+def download_hdb_data(year, quarter, session=None, base_url=BASE_URL, resource_id=RESOURCE_ID, offsets=None):
     """
     Downloads HDB resale data for a specific year and quarter
     from data.gov.sg
+
+    `offsets` maps month ("2024-07") to the number of records already
+    fetched, so only newer records are requested. Returns a DataFrame of
+    the fetched records and the per-month totals
     """
-    # Implementation here
-    pass
+    session = session or create_session(1)
+    offsets = offsets or {}
+    records = []
+    totals = {}
+
+    for month in [f"{year}-{m}" for m in QUARTER_MONTHS[quarter]]:
+        month_records, totals[month] = fetch_month(session, base_url, resource_id, month, offsets.get(month, 0))
+        records.extend(month_records)
+
+    df = pd.DataFrame(records)
+    if len(df):
+        for column in NUMERIC_COLUMNS:
+            if column in df.columns:
+                df[column] = pd.to_numeric(df[column], errors="coerce")
+        df["data_year"] = year
+        df["data_quarter"] = quarter
+    return df, totals
+
+
+def partition_key(year, quarter):
+    return f"{year}-Q{quarter}"
+
+
+def partition_dir(out_dir, year, quarter):
+    return os.path.join(out_dir, f"year={year}", f"quarter={quarter}")
+
+
+def partition_files(path):
+    if not os.path.isdir(path):
+        return []
+    return sorted(os.path.join(path, name) for name in os.listdir(path) if name.startswith("part-"))
+
+
+def read_part(path, columns=None):
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, usecols=columns)
+
+
+def write_part(df, path, file_format):
+    tmp_path = path + ".tmp"
+    if file_format == "parquet":
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def load_state(out_dir, resource_id):
+    path = os.path.join(out_dir, STATE_FILE)
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            state = json.load(f)
+        if state.get("resource_id") == resource_id:
+            return state
+        logger.warning(f"State in {path} is for resource {state.get('resource_id')}, starting afresh")
+    return {"resource_id": resource_id, "partitions": {}}
+
+
+def save_state(out_dir, state):
+    path = os.path.join(out_dir, STATE_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def partitions_between(start_year, end_year=None, today=None):
+    today = today or datetime.now()
+    end_year = end_year or today.year
+    current_quarter = (today.month - 1) // 3 + 1
+    return [
+        (year, quarter)
+        for year in range(start_year, end_year + 1)
+        for quarter in range(1, 5)
+        if (year, quarter) <= (today.year, current_quarter)
+    ]
+
+
+def is_closed(year, quarter, refresh_quarters, today=None):
+    """
+    A partition is closed once it is more than `refresh_quarters` quarters
+    old; late registrations still land in recent quarters
+    """
+    today = today or datetime.now()
+    current = today.year * 4 + (today.month - 1) // 3
+    return current - (year * 4 + quarter - 1) > refresh_quarters
+
+
+def ingest_partition(session, out_dir, year, quarter, partition_state, base_url, resource_id, file_format):
+    offsets = {month: info["fetched"] for month, info in partition_state.get("months", {}).items()}
+    df, totals = download_hdb_data(year, quarter, session, base_url, resource_id, offsets)
+
+    path = partition_dir(out_dir, year, quarter)
+    existing = partition_files(path)
+    if len(df) and existing and "_id" in df.columns:
+        seen = set()
+        for part in existing:
+            seen.update(read_part(part, columns=["_id"])["_id"].tolist())
+        df = df[~df["_id"].isin(seen)]
+
+    if len(df):
+        os.makedirs(path, exist_ok=True)
+        write_part(df, os.path.join(path, f"part-{len(existing):05d}.{file_format}"), file_format)
+
+    months = dict(partition_state.get("months", {}))
+    for month, total in totals.items():
+        months[month] = {"fetched": max(total, offsets.get(month, 0))}
+
+    return {
+        "months": months,
+        "rows": partition_state.get("rows", 0) + len(df),
+        "files": len(existing) + (1 if len(df) else 0),
+        "updated_at": time.time()
+    }, len(df)
+
+
+def ingest(out_dir, start_year, end_year=None, workers=8, base_url=BASE_URL, resource_id=RESOURCE_ID,
+           file_format="parquet", refresh_quarters=1, full_refresh=False):
+    """
+    Fetches every partition between `start_year` and `end_year` that is not
+    closed and already complete. Returns a summary of the run
+    """
+    if file_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise SystemExit("Parquet output requires pyarrow (pip install pyarrow) or use --format csv")
+
+    os.makedirs(out_dir, exist_ok=True)
+    state = load_state(out_dir, resource_id)
+    if full_refresh:
+        for year, quarter in partitions_between(start_year, end_year):
+            state["partitions"].pop(partition_key(year, quarter), None)
+            for part in partition_files(partition_dir(out_dir, year, quarter)):
+                os.remove(part)
+
+    pending = [
+        (year, quarter) for year, quarter in partitions_between(start_year, end_year)
+        if not (partition_key(year, quarter) in state["partitions"] and is_closed(year, quarter, refresh_quarters))
+    ]
+    logger.info(f"{len(pending)} partitions to fetch with {workers} workers from {base_url}")
+
+    started = time.perf_counter()
+    new_rows = 0
+    failed = {}
+    state_lock = threading.Lock()
+    session = create_session(workers)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest") as executor:
+        futures = {
+            executor.submit(
+                ingest_partition, session, out_dir, year, quarter,
+                state["partitions"].get(partition_key(year, quarter), {}), base_url, resource_id, file_format
+            ): partition_key(year, quarter)
+            for year, quarter in pending
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                partition_state, rows = future.result()
+            except Exception as e:
+                logger.error(f"Partition {key} failed: {str(e)}")
+                failed[key] = str(e)
+                continue
+            new_rows += rows
+            with state_lock:
+                state["partitions"][key] = partition_state
+                save_state(out_dir, state)
+            logger.info(f"Partition {key}: {rows} new rows ({partition_state['rows']} total)")
+
+    session.close()
+    elapsed = time.perf_counter() - started
+    return {
+        "partitions_fetched": len(pending) - len(failed),
+        "partitions_skipped": len(partitions_between(start_year, end_year)) - len(pending),
+        "failed": failed,
+        "new_rows": new_rows,
+        "elapsed_seconds": round(elapsed, 2)
+    }
+
+
+def load_partitions(out_dir):
+    """
+    Reads every part file under `out_dir` into one DataFrame
+    """
+    parts = []
+    for root, _, files in os.walk(out_dir):
+        parts.extend(os.path.join(root, name) for name in files if name.startswith("part-") and not name.endswith(".tmp"))
+    if not parts:
+        return pd.DataFrame()
+    return pd.concat([read_part(part) for part in sorted(parts)], ignore_index=True)
+
 
 def main():
-    print("Running data collection...")
-    # Main execution code here
+    parser = argparse.ArgumentParser(description="Fetch HDB resale transactions from data.gov.sg")
+    parser.add_argument("--start-year", type=int, default=2017)
+    parser.add_argument("--end-year", type=int, default=None)
+    parser.add_argument("--out", default="data/hdb_resale")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent partitions and pooled connections")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--resource-id", default=RESOURCE_ID)
+    parser.add_argument("--refresh-quarters", type=int, default=1,
+                        help="Recent quarters re-checked for late records on every run")
+    parser.add_argument("--full-refresh", action="store_true", help="Ignore the state file and fetch everything")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(message)s")
+
+    summary = ingest(
+        args.out, args.start_year, args.end_year, workers=args.workers, base_url=args.base_url,
+        resource_id=args.resource_id, file_format=args.format, refresh_quarters=args.refresh_quarters,
+        full_refresh=args.full_refresh
+    )
+    print(json.dumps(summary, indent=2))
+    if summary["failed"]:
+        raise SystemExit(1)
 
 if __name__ == "__main__":
     main()
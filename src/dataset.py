@@ -0,0 +1,225 @@
+"""
+Columnar cache of the enriched HDB resale dataset.
+
+The wide CSV is parsed once into a directory with one .npy file per
+column plus a schema.json. String columns are dictionary-encoded (small
+integer codes + a category list), numerics are downcast and the date
+columns are stored as datetime64. Consumers memory-map only the columns
+they ask for and get pandas categoricals back:
+
+    from dataset import load_dataset
+    df = load_dataset("hdb_resale_data_onemap_enriched.csv", columns=["town", "flat_type", "resale_price"])
+
+    python src/dataset.py convert hdb_resale_data_onemap_enriched.csv data/hdb_resale.columnar
+    python src/dataset.py report hdb_resale_data_onemap_enriched.csv --columns town flat_type resale_price
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+SCHEMA_FILE = "schema.json"
+
+DATE_COLUMNS = {"month": "%Y-%m", "transaction_date": "%Y-%m-%d"}
+
+# Coordinates need float64; float32 would cost about a metre of precision
+FLOAT64_COLUMNS = {"latitude", "longitude"}
+
+
+def default_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".columnar"
+
+
+def _code_dtype(size):
+    for dtype in (np.int8, np.int16, np.int32):
+        if size < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def encode_column(name, values):
+    """
+    Returns (array, schema entry) for one CSV column
+    """
+    if name in DATE_COLUMNS:
+        dates = pd.to_datetime(values, format=DATE_COLUMNS[name], errors="coerce")
+        return dates.to_numpy(dtype="datetime64[D]"), {"kind": "date"}
+
+    if values.dtype == object or isinstance(values.dtype, pd.StringDtype):
+        codes, categories = pd.factorize(values, sort=True)
+        return codes.astype(_code_dtype(len(categories))), {"kind": "category", "categories": categories.tolist()}
+
+    if pd.api.types.is_bool_dtype(values):
+        return values.to_numpy(dtype=np.bool_), {"kind": "numeric"}
+
+    if pd.api.types.is_integer_dtype(values):
+        return pd.to_numeric(values, downcast="integer").to_numpy(), {"kind": "numeric"}
+
+    if name in FLOAT64_COLUMNS:
+        return values.to_numpy(dtype=np.float64), {"kind": "numeric"}
+
+    return values.to_numpy(dtype=np.float32), {"kind": "numeric"}
+
+
+def _source_info(csv_path):
+    stat = os.stat(csv_path)
+    return {"path": os.path.abspath(csv_path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def convert(csv_path, out_path=None):
+    """
+    Parses the CSV once and writes the columnar copy. The copy is written
+    next to the destination and swapped in, so readers never see half of it
+    """
+    out_path = (out_path or default_path(csv_path)).rstrip(os.sep)
+    started = time.perf_counter()
+    df = pd.read_csv(csv_path, low_memory=False)
+
+    tmp_path = f"{out_path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    columns = {}
+    for name in df.columns:
+        array, entry = encode_column(name, df[name])
+        np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(array))
+        columns[name] = {**entry, "dtype": str(array.dtype)}
+
+    with open(os.path.join(tmp_path, SCHEMA_FILE), "w") as f:
+        json.dump({
+            "format_version": FORMAT_VERSION,
+            "rows": len(df),
+            "columns": columns,
+            "source": _source_info(csv_path),
+            "converted_at": time.time()
+        }, f, indent=2)
+
+    if os.path.isdir(out_path):
+        old_path = f"{out_path}.old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        os.replace(out_path, old_path)
+        os.replace(tmp_path, out_path)
+        shutil.rmtree(old_path, ignore_errors=True)
+    else:
+        os.replace(tmp_path, out_path)
+    logger.info(f"Converted {len(df)} rows x {len(columns)} columns to {out_path} in {time.perf_counter() - started:.2f}s")
+    return out_path
+
+
+def read_schema(path):
+    with open(os.path.join(path, SCHEMA_FILE), "r") as f:
+        schema = json.load(f)
+    if schema.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported columnar format {schema.get('format_version')} at {path}")
+    return schema
+
+
+def is_stale(path, csv_path):
+    """
+    True if there is no columnar copy or the CSV changed since it was made
+    """
+    if not os.path.exists(os.path.join(path, SCHEMA_FILE)):
+        return True
+    try:
+        source = read_schema(path)["source"]
+    except ValueError:
+        return True
+    current = _source_info(csv_path)
+    return source["size"] != current["size"] or source["mtime"] != current["mtime"]
+
+
+def load(path, columns=None, mmap=True):
+    """
+    Reads a columnar copy. With mmap the numeric and code arrays stay
+    backed by the files, so only the pages actually touched are read
+    """
+    schema = read_schema(path)
+    names = list(columns) if columns is not None else list(schema["columns"])
+    unknown = [name for name in names if name not in schema["columns"]]
+    if unknown:
+        raise KeyError(f"Columns not in {path}: {unknown}")
+
+    data = {}
+    for name in names:
+        entry = schema["columns"][name]
+        array = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None, allow_pickle=False)
+        if entry["kind"] == "category":
+            dtype = pd.CategoricalDtype(entry["categories"])
+            data[name] = pd.Categorical.from_codes(np.asarray(array), dtype=dtype)
+        else:
+            data[name] = np.asarray(array)
+    return pd.DataFrame(data, copy=False)
+
+
+def load_dataset(csv_path, columns=None, cache_path=None, mmap=True):
+    """
+    Loads `columns` from the columnar copy of `csv_path`, converting first
+    if the copy is missing or older than the CSV
+    """
+    cache_path = cache_path or default_path(csv_path)
+    if is_stale(cache_path, csv_path):
+        convert(csv_path, cache_path)
+    return load(cache_path, columns=columns, mmap=mmap)
+
+
+def _measure(read):
+    started = time.perf_counter()
+    df = read()
+    seconds = time.perf_counter() - started
+    return df, {"seconds": round(seconds, 4), "memory_mb": round(df.memory_usage(deep=True).sum() / 1e6, 2)}
+
+
+def report(csv_path, columns=None, cache_path=None):
+    """
+    Load time and in-memory size of the CSV path against the columnar copy
+    """
+    cache_path = cache_path or default_path(csv_path)
+    if is_stale(cache_path, csv_path):
+        convert(csv_path, cache_path)
+
+    usecols = list(columns) if columns is not None else None
+    _, csv_stats = _measure(lambda: pd.read_csv(csv_path, usecols=usecols, low_memory=False))
+    _, columnar_stats = _measure(lambda: load(cache_path, columns=columns))
+    return {
+        "rows": read_schema(cache_path)["rows"],
+        "columns": usecols or "all",
+        "csv": csv_stats,
+        "columnar": columnar_stats,
+        "speedup": round(csv_stats["seconds"] / max(columnar_stats["seconds"], 1e-9), 1),
+        "memory_ratio": round(csv_stats["memory_mb"] / max(columnar_stats["memory_mb"], 1e-9), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar cache of the enriched HDB resale dataset")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = subparsers.add_parser("convert", help="Convert a CSV to the columnar format")
+    convert_parser.add_argument("csv")
+    convert_parser.add_argument("out", nargs="?", default=None)
+
+    report_parser = subparsers.add_parser("report", help="Compare load time and memory against the CSV")
+    report_parser.add_argument("csv")
+    report_parser.add_argument("--cache", default=None)
+    report_parser.add_argument("--columns", nargs="+", default=None)
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.command == "convert":
+        convert(args.csv, args.out)
+    else:
+        print(json.dumps(report(args.csv, columns=args.columns, cache_path=args.cache), indent=2))
+
+
+if __name__ == "__main__":
+    main()
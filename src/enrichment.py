@@ -0,0 +1,441 @@
+"""
+Geocoding and amenity-distance enrichment for HDB resale transactions.
+
+Addresses are geocoded through OneMap once per block + street and kept in
+a persistent SQLite cache, so re-runs and new transactions at known
+blocks never hit the API. Distances to the nearest MRT station come from
+a haversine BallTree over the stations, landmark distances from a
+vectorized haversine, and only transactions whose `_id` is not already in
+the output are processed. Transactions at addresses whose lookup failed
+are left out of the output, so the next run retries them:
+
+    python src/enrichment.py data/hdb_resale hdb_resale_data_onemap_enriched.csv \
+        --cache data/geocode_cache.sqlite --seed hdb_geocoded.csv
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import requests
+from sklearn.neighbors import BallTree
+
+from data_collection import create_session, load_partitions
+
+logger = logging.getLogger(__name__)
+
+ONEMAP_URL = os.environ.get("ONEMAP_BASE_URL", "https://www.onemap.gov.sg") + "/api/common/elastic/search"
+GEOCODE_WORKERS = int(os.environ.get("GEOCODE_WORKERS", "4"))
+GEOCODE_MAX_RETRIES = int(os.environ.get("GEOCODE_MAX_RETRIES", "3"))
+GEOCODE_BACKOFF_SECONDS = float(os.environ.get("GEOCODE_BACKOFF_SECONDS", "1"))
+
+EARTH_RADIUS_KM = 6371
+
+MRT_STATIONS = [
+    {"name": "Jurong East", "lat": 1.3329, "lon": 103.7423, "line": "NS/EW"},
+    {"name": "Woodlands", "lat": 1.4369, "lon": 103.7865, "line": "NS/TE"},
+    {"name": "Ang Mo Kio", "lat": 1.3700, "lon": 103.8496, "line": "NS"},
+    {"name": "Bishan", "lat": 1.3513, "lon": 103.8487, "line": "NS/CC"},
+    {"name": "Orchard", "lat": 1.3043, "lon": 103.8325, "line": "NS"},
+    {"name": "City Hall", "lat": 1.2931, "lon": 103.8529, "line": "NS/EW"},
+    {"name": "Raffles Place", "lat": 1.2842, "lon": 103.8522, "line": "NS/EW"},
+    {"name": "Marina Bay", "lat": 1.2765, "lon": 103.8542, "line": "NS/CC/CE"},
+    {"name": "Tampines", "lat": 1.3546, "lon": 103.9461, "line": "EW/DT"},
+    {"name": "Paya Lebar", "lat": 1.3181, "lon": 103.8923, "line": "EW/CC"},
+    {"name": "Bugis", "lat": 1.3009, "lon": 103.8559, "line": "EW/DT"},
+    {"name": "Outram Park", "lat": 1.2813, "lon": 103.8404, "line": "EW/NE"},
+    {"name": "Dhoby Ghaut", "lat": 1.2988, "lon": 103.8461, "line": "NS/NE/CC"},
+    {"name": "Serangoon", "lat": 1.3505, "lon": 103.8726, "line": "NE/CC"},
+    {"name": "HarbourFront", "lat": 1.2657, "lon": 103.8218, "line": "NE/CC"},
+    {"name": "Punggol", "lat": 1.4047, "lon": 103.9020, "line": "NE"},
+    {"name": "Sengkang", "lat": 1.3917, "lon": 103.8959, "line": "NE"},
+    {"name": "Botanic Gardens", "lat": 1.3222, "lon": 103.8150, "line": "DT/CC"},
+    {"name": "Buona Vista", "lat": 1.3070, "lon": 103.7904, "line": "EW/CC"},
+    {"name": "Bedok", "lat": 1.3240, "lon": 103.9305, "line": "EW"}
+]
+
+LANDMARKS = {
+    "CBD": {"lat": 1.2830, "lon": 103.8510},
+    "Orchard": {"lat": 1.3043, "lon": 103.8325},
+    "Changi Airport": {"lat": 1.3644, "lon": 103.9915},
+    "NUS": {"lat": 1.2966, "lon": 103.7764},
+    "Jurong East": {"lat": 1.3329, "lon": 103.7436}
+}
+
+REGION_TOWNS = {
+    "Central": ["CENTRAL AREA", "BUKIT MERAH", "QUEENSTOWN", "KALLANG/WHAMPOA", "TOA PAYOH"],
+    "East": ["BEDOK", "TAMPINES", "PASIR RIS", "GEYLANG", "MARINE PARADE"],
+    "West": ["BUKIT BATOK", "BUKIT PANJANG", "CHOA CHU KANG", "CLEMENTI", "JURONG EAST", "JURONG WEST"],
+    "North": ["SEMBAWANG", "WOODLANDS", "YISHUN"],
+    "Northeast": ["ANG MO KIO", "HOUGANG", "PUNGGOL", "SENGKANG", "SERANGOON", "BISHAN"]
+}
+
+MATURE_TOWNS = [
+    "ANG MO KIO", "BEDOK", "BISHAN", "BUKIT MERAH", "BUKIT TIMAH",
+    "CENTRAL AREA", "CLEMENTI", "GEYLANG", "KALLANG/WHAMPOA",
+    "MARINE PARADE", "QUEENSTOWN", "SERANGOON", "TOA PAYOH", "PASIR RIS"
+]
+
+
+def address_key(block, street_name):
+    return f"{str(block).strip().upper()}|{str(street_name).strip().upper()}"
+
+
+def address_keys(blocks, street_names):
+    """
+    Vectorized address_key over two Series
+    """
+    return blocks.astype(str).str.strip().str.upper() + "|" + street_names.astype(str).str.strip().str.upper()
+
+
+class GeocodeCache:
+    """
+    Persistent block + street -> coordinates cache. Addresses OneMap could
+    not resolve are stored too (with NULL coordinates) so they are not
+    retried on every run
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocodes ("
+            "key TEXT PRIMARY KEY, latitude REAL, longitude REAL, address TEXT, postal TEXT, fetched_at REAL)"
+        )
+        self._conn.commit()
+
+    def lookup(self, keys):
+        """
+        Returns a DataFrame indexed by key for the cached subset of `keys`
+        """
+        keys = list(keys)
+        frames = []
+        with self._lock:
+            for start in range(0, len(keys), 900):
+                batch = keys[start:start + 900]
+                frames.append(pd.read_sql_query(
+                    f"SELECT key, latitude, longitude, address FROM geocodes WHERE key IN ({','.join('?' * len(batch))})",
+                    self._conn, params=batch
+                ))
+        if not frames:
+            return pd.DataFrame(columns=["latitude", "longitude", "address"]).rename_axis("key")
+        return pd.concat(frames, ignore_index=True).set_index("key")
+
+    def store(self, rows):
+        """
+        `rows` is a list of (key, latitude, longitude, address, postal)
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?, ?, ?)",
+                [(*row, now) for row in rows]
+            )
+            self._conn.commit()
+
+    def seed(self, df):
+        """
+        Imports block/street/latitude/longitude from an already geocoded
+        file (e.g. hdb_geocoded.csv) without overwriting cached entries
+        """
+        df = df.dropna(subset=["latitude", "longitude"]).drop_duplicates(["block", "street_name"])
+        address = df["geocoded_address"] if "geocoded_address" in df.columns else pd.Series(None, index=df.index)
+        rows = [
+            (address_key(block, street), float(lat), float(lon), addr if isinstance(addr, str) else None, None, time.time())
+            for block, street, lat, lon, addr in zip(df["block"], df["street_name"], df["latitude"], df["longitude"], address)
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO geocodes VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+        return len(rows)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM geocodes").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+def geocode_address(session, block, street_name, base_url=ONEMAP_URL):
+    """
+    Convert address to lat/long coordinates using OneMap API with retry mechanism
+    """
+    params = {
+        "searchVal": f"{block} {street_name} SINGAPORE",
+        "returnGeom": "Y",
+        "getAddrDetails": "Y",
+        "pageNum": 1
+    }
+
+    for attempt in range(GEOCODE_MAX_RETRIES + 1):
+        try:
+            response = session.get(base_url, params=params, timeout=10)
+            if response.status_code == 200:
+                data = response.json()
+                if data.get("found", 0) > 0:
+                    result = data["results"][0]
+                    return float(result["LATITUDE"]), float(result["LONGITUDE"]), result.get("ADDRESS"), result.get("POSTAL")
+                return None, None, None, None
+            if response.status_code != 429 and response.status_code < 500:
+                # An auth or request error says nothing about the address, so it is not cached
+                raise RuntimeError(f"OneMap returned HTTP {response.status_code} for {block} {street_name}")
+        except (requests.ConnectionError, requests.Timeout) as e:
+            logger.debug(f"OneMap {type(e).__name__} for {block} {street_name}")
+        if attempt < GEOCODE_MAX_RETRIES:
+            time.sleep(GEOCODE_BACKOFF_SECONDS * (2 ** attempt) * (0.5 + random.random()))
+
+    raise RuntimeError(f"Geocoding {block} {street_name} failed after {GEOCODE_MAX_RETRIES} retries")
+
+
+def geocode_missing(cache, addresses, workers=GEOCODE_WORKERS, base_url=ONEMAP_URL):
+    """
+    Geocodes the unique (block, street_name) pairs that are not cached yet.
+    Results are written to the cache as they arrive, so an interrupted run
+    keeps its lookups
+    """
+    keys = {address_key(block, street): (block, street) for block, street in addresses}
+    missing = [keys[key] for key in keys.keys() - set(cache.lookup(keys.keys()).index)]
+    if not missing:
+        return 0
+
+    logger.info(f"Geocoding {len(missing)} new addresses with {workers} workers")
+    session = create_session(workers)
+    failed = 0
+
+    def lookup(address):
+        block, street = address
+        return (address_key(block, street), *geocode_address(session, block, street, base_url))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="geocode") as executor:
+        futures = [executor.submit(lookup, address) for address in missing]
+        batch = []
+        for future in futures:
+            try:
+                batch.append(future.result())
+            except RuntimeError as e:
+                logger.warning(str(e))
+                failed += 1
+            if len(batch) >= 100:
+                cache.store(batch)
+                batch = []
+        cache.store(batch)
+
+    session.close()
+    return len(missing) - failed
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in kilometres; works elementwise on arrays
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class StationIndex:
+    """
+    Nearest-station lookup over a haversine BallTree
+    """
+
+    def __init__(self, stations=None):
+        self.stations = pd.DataFrame(stations or MRT_STATIONS)
+        self.tree = BallTree(np.radians(self.stations[["lat", "lon"]].to_numpy()), metric="haversine")
+
+    def nearest(self, latitude, longitude):
+        distances, indices = self.tree.query(np.radians(np.column_stack([latitude, longitude])), k=1)
+        indices = indices[:, 0]
+        return (
+            distances[:, 0] * EARTH_RADIUS_KM,
+            self.stations["name"].to_numpy()[indices],
+            self.stations["line"].to_numpy()[indices]
+        )
+
+
+def add_transaction_features(df):
+    """
+    Vectorized version of the derived columns the collection notebook adds
+    (age, price per sqm, storey range bounds, block number, period)
+    """
+    df = df.copy()
+    for column in ["resale_price", "floor_area_sqm", "lease_commence_date"]:
+        df[column] = pd.to_numeric(df[column], errors="coerce")
+
+    transaction_date = pd.to_datetime(df["month"], format="%Y-%m")
+    df["data_year"] = transaction_date.dt.year
+    df["data_quarter"] = transaction_date.dt.quarter
+    df["property_age"] = datetime.now().year - df["lease_commence_date"]
+    df["price_per_sqm"] = df["resale_price"] / df["floor_area_sqm"]
+    df["transaction_date"] = df["month"].astype(str) + "-01"
+
+    # string parsing runs once per distinct value; there are far fewer
+    # storey ranges and blocks than transactions
+    storey_ranges = pd.Series(df["storey_range"].astype(str).unique())
+    storeys = storey_ranges.str.split(" TO ", expand=True).reindex(columns=[0, 1])
+    df["storey_start"] = df["storey_range"].astype(str).map(dict(zip(storey_ranges, pd.to_numeric(storeys[0], errors="coerce"))))
+    df["storey_end"] = df["storey_range"].astype(str).map(dict(zip(storey_ranges, pd.to_numeric(storeys[1], errors="coerce"))))
+    df["storey_mid"] = (df["storey_start"] + df["storey_end"]) / 2
+
+    blocks = pd.Series(df["block"].astype(str).unique())
+    block_numbers = pd.to_numeric(blocks.str.extract(r"(\d+)")[0], errors="coerce").fillna(0).astype(int)
+    df["block_numeric"] = df["block"].astype(str).map(dict(zip(blocks, block_numbers)))
+    df["period"] = df["data_year"].astype(str) + "-Q" + df["data_quarter"].astype(str)
+    return df
+
+
+def add_location_features(df, cache, station_index):
+    """
+    Joins cached coordinates by block + street and computes the MRT,
+    landmark, region and maturity columns. Everything that depends only on
+    the address is computed once per distinct address
+    """
+    df = df.copy()
+    codes, addresses = pd.MultiIndex.from_frame(df[["block", "street_name"]].astype(str)).factorize()
+    keys = address_keys(pd.Series(addresses.get_level_values(0)), pd.Series(addresses.get_level_values(1)))
+    geocodes = cache.lookup(keys).reindex(keys)
+
+    latitude = geocodes["latitude"].to_numpy(dtype=float)
+    longitude = geocodes["longitude"].to_numpy(dtype=float)
+    located = ~(np.isnan(latitude) | np.isnan(longitude))
+
+    mrt_distance = np.full(len(keys), np.nan)
+    mrt_name = np.full(len(keys), None, dtype=object)
+    mrt_line = np.full(len(keys), None, dtype=object)
+    if located.any():
+        mrt_distance[located], mrt_name[located], mrt_line[located] = station_index.nearest(
+            latitude[located], longitude[located]
+        )
+
+    columns = {
+        "latitude": latitude,
+        "longitude": longitude,
+        "geocoded_address": geocodes["address"].to_numpy(),
+        "nearest_mrt_distance_km": mrt_distance,
+        "nearest_mrt_name": mrt_name,
+        "nearest_mrt_line": mrt_line,
+        "near_mrt_500m": (mrt_distance <= 0.5).astype(int),
+        "near_mrt_1km": (mrt_distance <= 1.0).astype(int)
+    }
+    for name, coords in LANDMARKS.items():
+        columns[f"distance_to_{name.lower().replace(' ', '_')}_km"] = haversine_km(
+            latitude, longitude, coords["lat"], coords["lon"]
+        )
+    for column, values in columns.items():
+        df[column] = values[codes]
+
+    town_region = {town: region for region, towns in REGION_TOWNS.items() for town in towns}
+    df["region"] = df["town"].map(town_region).fillna("Other")
+    df["mature_estate"] = df["town"].isin(MATURE_TOWNS).astype(int)
+    return df
+
+
+def read_table(path):
+    if os.path.isdir(path):
+        return load_partitions(path)
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def enrich(input_path, output_path, cache_path, seed_paths=(), stations=None, workers=GEOCODE_WORKERS,
+           onemap_url=ONEMAP_URL, recompute=False):
+    """
+    Enriches the transactions in `input_path` (a CSV/parquet file or an
+    ingestion directory) whose `_id` is not yet in `output_path`, and
+    appends them. Rows whose address could not be geocoded this run are
+    deferred rather than written without coordinates. With `recompute`
+    every row is rebuilt from the cache
+    """
+    started = time.perf_counter()
+    timings = {}
+
+    transactions = read_table(input_path)
+    existing = None
+    if os.path.exists(output_path) and not recompute:
+        existing = read_table(output_path)
+        transactions = transactions[~transactions["_id"].isin(existing["_id"])]
+    timings["read"] = time.perf_counter() - started
+
+    cache = GeocodeCache(cache_path)
+    for seed_path in seed_paths:
+        logger.info(f"Seeded {cache.seed(read_table(seed_path))} addresses from {seed_path}")
+
+    summary = {"new_rows": len(transactions), "geocoded": 0, "deferred_rows": 0, "cached_addresses": 0}
+    if len(transactions):
+        step = time.perf_counter()
+        addresses = transactions[["block", "street_name"]].drop_duplicates().itertuples(index=False, name=None)
+        summary["geocoded"] = geocode_missing(cache, addresses, workers, onemap_url)
+        timings["geocode"] = time.perf_counter() - step
+
+        # Rows whose address lookup failed (not merely unresolved) stay out
+        # of the output, so the next run picks them up and retries
+        keys = address_keys(transactions["block"], transactions["street_name"])
+        cached = keys.isin(cache.lookup(keys.unique()).index).to_numpy()
+        summary["deferred_rows"] = int((~cached).sum())
+        transactions = transactions[cached]
+        summary["new_rows"] = len(transactions)
+        if summary["deferred_rows"]:
+            logger.warning(f"{summary['deferred_rows']} rows deferred to the next run, their addresses could not be geocoded")
+
+    if len(transactions):
+        step = time.perf_counter()
+        enriched = add_location_features(add_transaction_features(transactions), cache, StationIndex(stations))
+        summary["unlocated_rows"] = int(enriched["latitude"].isna().sum())
+        timings["features"] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        if output_path.endswith(".parquet"):
+            if existing is not None:
+                enriched = pd.concat([existing, enriched[existing.columns]], ignore_index=True)
+            enriched.to_parquet(output_path + ".tmp", index=False)
+            os.replace(output_path + ".tmp", output_path)
+        elif existing is not None:
+            enriched[existing.columns].to_csv(output_path, mode="a", header=False, index=False)
+        else:
+            enriched.to_csv(output_path, index=False)
+        timings["write"] = time.perf_counter() - step
+
+    summary["cached_addresses"] = len(cache)
+    cache.close()
+    summary["timings"] = {name: round(seconds, 3) for name, seconds in timings.items()}
+    summary["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Geocode HDB transactions and add amenity distances")
+    parser.add_argument("input", help="Transactions CSV/parquet, or an ingestion output directory")
+    parser.add_argument("output", help="Enriched CSV or parquet file (appended to on re-runs)")
+    parser.add_argument("--cache", default="data/geocode_cache.sqlite")
+    parser.add_argument("--seed", action="append", default=[], help="Already geocoded file to import into the cache")
+    parser.add_argument("--stations", default=None, help="CSV of MRT stations (name, lat, lon, line)")
+    parser.add_argument("--workers", type=int, default=GEOCODE_WORKERS, help="Concurrent OneMap lookups")
+    parser.add_argument("--onemap-url", default=ONEMAP_URL)
+    parser.add_argument("--recompute", action="store_true", help="Rebuild every row instead of only new ones")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(message)s")
+
+    stations = pd.read_csv(args.stations).to_dict("records") if args.stations else None
+    cache_dir = os.path.dirname(args.cache)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    summary = enrich(
+        args.input, args.output, args.cache, args.seed, stations=stations, workers=args.workers,
+        onemap_url=args.onemap_url, recompute=args.recompute
+    )
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,730 @@
+"""
+Unattended HDB training run that writes everything simple_api.py loads.
+
+Cross-validation folds and candidate configurations are trained in
+parallel worker processes, each booster capped at --threads-per-model
+threads so workers x threads stays within the machine. The engineered
+feature frame and the preprocessed fold matrices are cached on disk
+(keyed by the source CSV and the feature code), so a re-run on unchanged data
+goes straight to model fitting. One run writes:
+
+    hdb_deployment_pipeline.pkl   preprocessing + best model, refit on the training split
+    hdb_feature_lists.pkl         categorical / numeric / all feature names
+    correction_factors.json       per-segment multipliers fitted on out-of-fold predictions
+    confidence_intervals.json     per-segment absolute percentage error after correction
+    conformal_intervals.json      calibrated lower/upper widths per region x flat_type x price band
+    performance_metrics.json      hold-out metrics of the served (corrected) predictions
+    town_to_region.json, feature_store.npz, training_timings.json
+
+    python src/train_hdb.py hdb_resale_data_onemap_enriched.csv property-valuation-folder/backend/ml/hdb \
+        --workers 4 --threads-per-model 2
+
+--incremental instead adds trees fitted on the quarters (data_year /
+data_quarter) after the model's trained_through to the existing booster,
+refreshes the side files and keeps the result only if it passes a guard
+check on held-out rows, so a quarterly update costs time in proportion
+to the new quarter rather than the whole history:
+
+    python src/train_hdb.py hdb_resale_data_onemap_enriched.csv property-valuation-folder/backend/ml/hdb --incremental
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle
+import shutil
+import sys
+import time
+from copy import deepcopy
+from itertools import product
+
+import numpy as np
+import pandas as pd
+from joblib import Memory, Parallel, delayed, parallel_backend
+from sklearn.compose import make_column_transformer
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import KFold, train_test_split
+from sklearn.pipeline import Pipeline, make_pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from dataset import default_path, is_stale, convert, load
+
+ML_DIR = os.environ.get("HDB_ML_DIR", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "property-valuation-folder", "backend", "ml"
+))
+sys.path.insert(0, ML_DIR)
+from api import conformal  # noqa: E402
+from api.feature_store import STORE_FEATURES, FeatureStore, parse_remaining_lease  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+THREADS_PER_MODEL = int(os.environ.get("TRAIN_THREADS_PER_MODEL", "2"))
+RANDOM_STATE = 42
+
+CATEGORICAL_FEATURES = ["town", "flat_type", "flat_model"]
+CATEGORICAL_DEFAULTS = {"town": "ANG MO KIO", "flat_type": "4 ROOM", "flat_model": "Standard"}
+
+SERVING_FEATURES = [
+    "area_cbd_interaction_scaled", "remaining_lease_at_transaction", "location_score",
+    "area_premium_for_flattype", "floor_mrt_premium_scaled"
+]
+
+# "alternative" is the feature set the notebook deployed
+FEATURE_SETS = {
+    "alternative": SERVING_FEATURES,
+    "store": SERVING_FEATURES + STORE_FEATURES
+}
+
+SOURCE_COLUMNS = [
+    "town", "flat_type", "flat_model", "block", "street_name", "floor_area_sqm", "storey_mid",
+    "remaining_lease", "nearest_mrt_distance_km", "region", "resale_price", "data_year", "data_quarter"
+]
+
+# The same constants prepare_hdb_prediction_batch uses at serving time
+REGION_SCORES = {"Central": 9, "East": 7, "Northeast": 6, "North": 5, "West": 5}
+TYPICAL_AREAS = [
+    ("1 ROOM", 35), ("2 ROOM", 45), ("3 ROOM", 65),
+    ("4 ROOM", 90), ("5 ROOM", 110), ("EXECUTIVE", 130)
+]
+
+DEFAULT_GRID = {
+    "random_forest": {"n_estimators": [100], "max_depth": [None, 24], "min_samples_leaf": [1, 3]},
+    "xgboost": {"n_estimators": [300, 600], "max_depth": [6, 8], "learning_rate": [0.05, 0.1]}
+}
+
+CORRECTION_DIMENSIONS = ["region", "flat_type", "town", "flat_model"]
+INTERVAL_DIMENSIONS = ["region", "flat_type"]
+CORRECTION_CLIP = (0.8, 1.25)
+STORE_FOLDS = 5
+# Fewest new rows each of the fit, calibration and guard parts of an incremental update may have
+MIN_INCREMENTAL_PART_ROWS = 2
+
+
+def period_of(frame):
+    """
+    Quarter ordinal (year * 4 + quarter - 1) of each transaction
+    """
+    return frame["data_year"].to_numpy(dtype=int) * 4 + frame["data_quarter"].to_numpy(dtype=int) - 1
+
+
+def format_period(ordinal):
+    return f"{ordinal // 4}-Q{ordinal % 4 + 1}"
+
+
+def parse_period(period):
+    year, _, quarter = str(period).upper().partition("-Q")
+    return int(year) * 4 + int(quarter) - 1
+
+
+def typical_area(flat_type):
+    for key, area in TYPICAL_AREAS:
+        if key in flat_type:
+            return area
+    return 90
+
+
+def engineer_features(df):
+    """
+    Model inputs computed from transaction columns with the formulas
+    prepare_hdb_prediction_batch applies to request fields, so the model
+    is trained on exactly what it is served
+    """
+    area = df["floor_area_sqm"].to_numpy(dtype=float)
+    mrt = df["nearest_mrt_distance_km"].to_numpy(dtype=float)
+    has_mrt = ~np.isnan(mrt)
+    storey = df["storey_mid"].to_numpy(dtype=float)
+
+    frame = pd.DataFrame(index=df.index)
+    for column in CATEGORICAL_FEATURES:
+        values = df[column].astype(object)
+        frame[column] = values.where(values.notna(), CATEGORICAL_DEFAULTS[column]).astype(str).to_numpy(dtype=object)
+
+    frame["area_cbd_interaction_scaled"] = area / (1 + np.where(has_mrt, mrt, 5.0)) / 100
+    frame["remaining_lease_at_transaction"] = np.floor(parse_remaining_lease(df["remaining_lease"]).to_numpy(dtype=float))
+    region_score = df["region"].astype(object).map(REGION_SCORES).fillna(5).to_numpy(dtype=float)
+    mrt_score = np.select([~has_mrt, mrt < 0.3, mrt < 0.6, mrt < 1.0], [5.0, 9.0, 7.0, 5.0], 3.0)
+    frame["location_score"] = (region_score + mrt_score) / 2
+    flat_types = frame["flat_type"].str.upper()
+    frame["area_premium_for_flattype"] = area / flat_types.map({t: typical_area(t) for t in flat_types.unique()}).to_numpy(dtype=float)
+    mrt_factor = np.select([~has_mrt, mrt < 0.3, mrt < 0.6, mrt < 1.0], [1.0, 1.3, 1.2, 1.1], 1.0)
+    frame["floor_mrt_premium_scaled"] = (np.minimum(storey / 40, 1) * 0.7 + 0.3) * mrt_factor
+
+    for column in ["block", "street_name", "floor_area_sqm", "storey_mid", "remaining_lease", "resale_price",
+                   "data_year", "data_quarter"]:
+        frame[column] = df[column].to_numpy()
+    frame["region"] = df["region"].astype(object).to_numpy()
+    return frame
+
+
+def frame_key(csv_path):
+    """
+    Cache key of the feature frame: the CSV's identity plus the code and
+    columns that build the frame, so editing either invalidates the cache
+    """
+    stat = os.stat(csv_path)
+    code = hashlib.sha256((inspect.getsource(engineer_features) + repr(SOURCE_COLUMNS)).encode()).hexdigest()[:12]
+    return f"{os.path.abspath(csv_path)}:{stat.st_size}:{stat.st_mtime}:{code}"
+
+
+def build_feature_frame(csv_path, source_key):
+    """
+    Engineered frame for every transaction; cached under `source_key`
+    """
+    cache_path = default_path(csv_path)
+    if is_stale(cache_path, csv_path):
+        convert(csv_path, cache_path)
+    df = load(cache_path, columns=SOURCE_COLUMNS)
+    df = df[df["resale_price"].notna()].reset_index(drop=True)
+    return engineer_features(df)
+
+
+def make_preprocessor(numeric_features):
+    return make_column_transformer(
+        (OneHotEncoder(handle_unknown="ignore"), CATEGORICAL_FEATURES),
+        (make_pipeline(SimpleImputer(strategy="median"), StandardScaler()), numeric_features)
+    )
+
+
+def make_model(kind, params, threads):
+    if kind == "random_forest":
+        return RandomForestRegressor(n_jobs=threads, random_state=RANDOM_STATE, **params)
+    if kind == "xgboost":
+        from xgboost import XGBRegressor
+        return XGBRegressor(tree_method="hist", n_jobs=threads, random_state=RANDOM_STATE, **params)
+    raise ValueError(f"Unknown model type: {kind}")
+
+
+def candidates(grid):
+    for kind, space in grid.items():
+        names = sorted(space)
+        for values in product(*(space[name] for name in names)):
+            yield kind, dict(zip(names, values))
+
+
+def with_store_features(frame, train_rows, rows, feature_set):
+    """
+    Adds store features from a store built on `train_rows` only, so
+    validation rows never see their own prices. For the training rows
+    themselves each encoding comes from a store built on the other
+    STORE_FOLDS - 1 parts, otherwise a block seen once would encode its
+    own price
+    """
+    if not any(feature in STORE_FEATURES for feature in FEATURE_SETS[feature_set]):
+        return frame.iloc[rows], None
+    store = FeatureStore.from_transactions(frame.iloc[train_rows])
+    subset = frame.iloc[rows]
+    if rows is not train_rows:
+        return pd.concat([subset, store.transform(subset)], axis=1), store
+
+    encoded = pd.DataFrame(index=subset.index, columns=STORE_FEATURES, dtype=float)
+    for fit, held_out in KFold(n_splits=STORE_FOLDS, shuffle=True, random_state=RANDOM_STATE).split(rows):
+        part = subset.iloc[held_out]
+        encoded.loc[part.index] = FeatureStore.from_transactions(subset.iloc[fit]).transform(part)[STORE_FEATURES]
+    return pd.concat([subset, encoded], axis=1), store
+
+
+def prepare_fold(frame, train_rows, valid_rows, feature_set, source_key, fold):
+    """
+    Preprocessed matrices for one fold; cached under (source_key, feature_set, fold)
+    """
+    numeric = FEATURE_SETS[feature_set]
+    train, _ = with_store_features(frame, train_rows, train_rows, feature_set)
+    valid, _ = with_store_features(frame, train_rows, valid_rows, feature_set)
+    preprocessor = make_preprocessor(numeric)
+    features = CATEGORICAL_FEATURES + numeric
+    return {
+        "X_train": preprocessor.fit_transform(train[features]),
+        "y_train": train["resale_price"].to_numpy(dtype=float),
+        "X_valid": preprocessor.transform(valid[features]),
+        "y_valid": valid["resale_price"].to_numpy(dtype=float),
+        "valid_rows": valid_rows
+    }
+
+
+def fit_and_score(kind, params, threads, fold):
+    started = time.perf_counter()
+    model = make_model(kind, params, threads)
+    model.fit(fold["X_train"], fold["y_train"])
+    fit_seconds = time.perf_counter() - started
+    predictions = model.predict(fold["X_valid"])
+    return {
+        "rmse": float(np.sqrt(mean_squared_error(fold["y_valid"], predictions))),
+        "r2": float(r2_score(fold["y_valid"], predictions)),
+        "fit_seconds": fit_seconds,
+        "predictions": predictions
+    }
+
+
+def fit_correction_factors(segments, actual, predicted, min_count):
+    """
+    Multipliers fitted one dimension at a time on what the previous
+    dimensions left over: the median actual/predicted ratio of a segment,
+    shrunk towards 1 for small segments and clipped
+    """
+    factors = {}
+    multiplier = np.ones(len(actual))
+    for dimension in CORRECTION_DIMENSIONS:
+        ratio = pd.Series(actual / (predicted * multiplier))
+        stats = ratio.groupby(segments[dimension].to_numpy()).agg(["median", "count"])
+        stats = stats[stats["count"] >= min_count]
+        factor = 1 + (stats["median"] - 1) * stats["count"] / (stats["count"] + min_count)
+        factor = factor.clip(*CORRECTION_CLIP).round(3)
+        factors[dimension] = {str(value): float(f) for value, f in factor.items()}
+        multiplier *= segments[dimension].map(factors[dimension]).fillna(1.0).to_numpy(dtype=float)
+    return factors, multiplier
+
+
+def correction_multiplier(segments, correction_factors):
+    """
+    The product of the factors serving applies to each row; segments
+    without a factor count as 1
+    """
+    multiplier = np.ones(len(segments))
+    for dimension in CORRECTION_DIMENSIONS:
+        multiplier *= segments[dimension].map(correction_factors.get(dimension, {})).fillna(1.0).to_numpy(dtype=float)
+    return multiplier
+
+
+def fit_confidence_intervals(segments, actual, predicted, min_count):
+    ape = pd.Series(np.abs(predicted - actual) / actual * 100)
+
+    def summarize(groups):
+        stats = ape.groupby(groups).agg(["mean", "std", "count"])
+        stats = stats[stats["count"] >= min_count]
+        return {
+            str(value): {"mean": round(float(row["mean"]), 2), "ci_95": round(float(1.96 * row["std"] / np.sqrt(row["count"])), 2)}
+            for value, row in stats.iterrows()
+        }
+
+    intervals = {dimension: summarize(segments[dimension].to_numpy()) for dimension in INTERVAL_DIMENSIONS}
+    intervals["combined"] = summarize((segments["region"].astype(str) + "|" + segments["flat_type"].astype(str)).to_numpy())
+    return intervals
+
+
+def regression_metrics(actual, predicted):
+    ape = np.abs(predicted - actual) / actual * 100
+    return {
+        "rmse": round(float(np.sqrt(mean_squared_error(actual, predicted))), 2),
+        "mae": round(float(mean_absolute_error(actual, predicted)), 2),
+        "r2": round(float(r2_score(actual, predicted)), 4),
+        "mape": round(float(np.mean(ape)), 2),
+        "mdape": round(float(np.median(ape)), 2)
+    }
+
+
+def _write(path, write):
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_json(path, data):
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+    _write(path, write)
+
+
+def write_pickle(path, obj):
+    def write(tmp_path):
+        with open(tmp_path, "wb") as f:
+            pickle.dump(obj, f)
+    _write(path, write)
+
+
+def town_to_region(frame):
+    regions = frame.dropna(subset=["region"]).groupby("town")["region"].agg(lambda r: r.value_counts().index[0])
+    return {str(town): str(region) for town, region in regions.items()}
+
+
+def train(csv_path, out_dir, feature_set="alternative", grid=None, folds=5, workers=None,
+          threads_per_model=THREADS_PER_MODEL, cache_dir=None, test_size=0.2, min_segment=30, until=None,
+          coverage=conformal.DEFAULT_COVERAGE):
+    """
+    Runs the whole training job and returns the timing/metrics summary.
+    `until` ("2024-Q4") leaves later quarters for incremental updates
+    """
+    started = time.perf_counter()
+    timings = {}
+    grid = grid or DEFAULT_GRID
+    cpu_count = os.cpu_count() or 1
+    workers = workers or max(1, cpu_count // threads_per_model)
+    memory = Memory(cache_dir, verbose=0)
+    source_key = frame_key(csv_path)
+
+    stage = time.perf_counter()
+    frame = memory.cache(build_feature_frame)(csv_path, source_key)
+    if until:
+        frame = frame[period_of(frame) <= parse_period(until)].reset_index(drop=True)
+        source_key = f"{source_key}:{until}"
+    timings["features"] = time.perf_counter() - stage
+    logger.info(f"Feature frame: {len(frame)} rows ({timings['features']:.2f}s)")
+
+    train_rows, test_rows = train_test_split(np.arange(len(frame)), test_size=test_size, random_state=RANDOM_STATE)
+
+    stage = time.perf_counter()
+    cached_prepare = memory.cache(prepare_fold, ignore=["frame", "train_rows", "valid_rows"])
+    splits = KFold(n_splits=folds, shuffle=True, random_state=RANDOM_STATE).split(train_rows)
+    fold_data = [
+        cached_prepare(frame, train_rows[fit], train_rows[valid], feature_set, f"{source_key}:{test_size}:{folds}", fold)
+        for fold, (fit, valid) in enumerate(splits)
+    ]
+    timings["fold_matrices"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    configs = list(candidates(grid))
+    tasks = [(index, fold) for index in range(len(configs)) for fold in range(folds)]
+    logger.info(f"Searching {len(configs)} configurations x {folds} folds with {workers} workers x {threads_per_model} threads")
+    with parallel_backend("loky", inner_max_num_threads=threads_per_model):
+        scores = Parallel(n_jobs=workers)(
+            delayed(fit_and_score)(configs[index][0], configs[index][1], threads_per_model, fold_data[fold])
+            for index, fold in tasks
+        )
+    timings["search"] = time.perf_counter() - stage
+
+    results = []
+    for index, (kind, params) in enumerate(configs):
+        fold_scores = [score for (i, _), score in zip(tasks, scores) if i == index]
+        results.append({
+            "model": kind,
+            "params": params,
+            "mean_r2": round(float(np.mean([s["r2"] for s in fold_scores])), 4),
+            "mean_rmse": round(float(np.mean([s["rmse"] for s in fold_scores])), 2),
+            "fit_seconds": round(float(sum(s["fit_seconds"] for s in fold_scores)), 3)
+        })
+    best_index = max(range(len(configs)), key=lambda i: results[i]["mean_r2"])
+    best_kind, best_params = configs[best_index]
+    logger.info(f"Best configuration: {best_kind} {best_params} (mean R2 {results[best_index]['mean_r2']})")
+
+    # Out-of-fold predictions of the best configuration cover the whole training split
+    oof = np.empty(len(frame))
+    for (index, fold), score in zip(tasks, scores):
+        if index == best_index:
+            oof[fold_data[fold]["valid_rows"]] = score["predictions"]
+    train_segments = frame.iloc[train_rows]
+    train_actual = train_segments["resale_price"].to_numpy(dtype=float)
+    correction_factors, oof_multiplier = fit_correction_factors(train_segments, train_actual, oof[train_rows], min_segment)
+    confidence_intervals = fit_confidence_intervals(
+        train_segments, train_actual, oof[train_rows] * oof_multiplier, min_segment
+    )
+    # The out-of-fold predictions are the calibration split; the hold-out split checks the coverage
+    conformal_intervals = conformal.calibrate(
+        train_segments[INTERVAL_DIMENSIONS].reset_index(drop=True), oof[train_rows] * oof_multiplier, train_actual,
+        coverage=coverage, min_rows=min_segment
+    )
+
+    stage = time.perf_counter()
+    numeric = FEATURE_SETS[feature_set]
+    features = CATEGORICAL_FEATURES + numeric
+    train_frame, store = with_store_features(frame, train_rows, train_rows, feature_set)
+    pipeline = make_pipeline(make_preprocessor(numeric), make_model(best_kind, best_params, workers * threads_per_model))
+    pipeline.fit(train_frame[features], train_frame["resale_price"].to_numpy(dtype=float))
+    timings["refit"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    test_frame, _ = with_store_features(frame, train_rows, test_rows, feature_set)
+    test_actual = test_frame["resale_price"].to_numpy(dtype=float)
+    test_predicted = pipeline.predict(test_frame[features])
+    test_multiplier = correction_multiplier(test_frame, correction_factors)
+    performance = regression_metrics(test_actual, test_predicted * test_multiplier)
+    performance["uncorrected"] = regression_metrics(test_actual, test_predicted)
+    performance["interval_coverage"] = conformal.ConformalIntervals(conformal_intervals).coverage_on(
+        test_frame, test_predicted * test_multiplier, test_actual
+    )
+    performance.update(model=best_kind, params=best_params, feature_set=feature_set, train_rows=len(train_rows),
+                       test_rows=len(test_rows), cv=results[best_index],
+                       trained_through=format_period(int(period_of(frame).max())))
+    timings["evaluate"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    write_pickle(os.path.join(out_dir, "hdb_deployment_pipeline.pkl"), pipeline)
+    write_pickle(os.path.join(out_dir, "hdb_feature_lists.pkl"), {
+        "categorical_features": CATEGORICAL_FEATURES,
+        "numeric_features": numeric,
+        "all_features": features
+    })
+    write_json(os.path.join(out_dir, "correction_factors.json"), correction_factors)
+    write_json(os.path.join(out_dir, "confidence_intervals.json"), confidence_intervals)
+    write_json(os.path.join(out_dir, "conformal_intervals.json"), conformal_intervals)
+    write_json(os.path.join(out_dir, "performance_metrics.json"), performance)
+    write_json(os.path.join(out_dir, "town_to_region.json"), town_to_region(train_segments))
+    (store or FeatureStore.from_transactions(train_segments)).snapshot(os.path.join(out_dir, "feature_store.npz"))
+    timings["artifacts"] = time.perf_counter() - stage
+    timings["total"] = time.perf_counter() - started
+
+    summary = {
+        "timings": {name: round(seconds, 3) for name, seconds in timings.items()},
+        "cpu_count": cpu_count,
+        "workers": workers,
+        "threads_per_model": threads_per_model,
+        "folds": folds,
+        "candidates": results,
+        "best": results[best_index],
+        "performance": {key: performance[key] for key in ("rmse", "mae", "r2", "mape", "mdape", "interval_coverage")}
+    }
+    write_json(os.path.join(out_dir, "training_timings.json"), summary)
+    return summary
+
+
+def warm_start(model, X, y, extra_trees, threads, learning_rate=None):
+    """
+    A copy of `model` with `extra_trees` more trees fitted on (X, y) only;
+    the existing trees are kept as they are. `learning_rate` shrinks the
+    new boosting rounds (forests ignore it)
+    """
+    if type(model).__name__ == "XGBRegressor":
+        updated = type(model)(**model.get_params())
+        updated.set_params(n_estimators=extra_trees, n_jobs=threads)
+        if learning_rate is not None:
+            updated.set_params(learning_rate=learning_rate)
+        updated.fit(X, y, xgb_model=model.get_booster())
+        return updated
+    if isinstance(model, RandomForestRegressor):
+        updated = deepcopy(model)
+        updated.set_params(warm_start=True, n_estimators=model.n_estimators + extra_trees, n_jobs=threads)
+        updated.fit(X, y)
+        return updated
+    raise ValueError(f"{type(model).__name__} cannot be updated incrementally, retrain from scratch")
+
+
+def merge_segments(previous, fitted):
+    """
+    Fitted values override the previous ones; segments the new slice was
+    too small for keep what they had
+    """
+    merged = deepcopy(previous or {})
+    for dimension, values in fitted.items():
+        merged[dimension] = {**merged.get(dimension, {}), **values}
+    return merged
+
+
+def read_json(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def split_new_rows(new_rows, calibration_fraction, guard_fraction):
+    """
+    Splits the new rows into the parts the added trees are fitted on, the
+    side files are recalibrated on and the guard check runs on. Returns
+    None when there are too few rows for every part to get
+    MIN_INCREMENTAL_PART_ROWS
+    """
+    guard_size = max(MIN_INCREMENTAL_PART_ROWS, int(round(len(new_rows) * guard_fraction)))
+    calibration_size = max(MIN_INCREMENTAL_PART_ROWS, int(round(len(new_rows) * calibration_fraction)))
+    if len(new_rows) - guard_size - calibration_size < MIN_INCREMENTAL_PART_ROWS:
+        return None
+    rest, guard_rows = train_test_split(new_rows, test_size=guard_size, random_state=RANDOM_STATE)
+    fit_rows, calibration_rows = train_test_split(rest, test_size=calibration_size, random_state=RANDOM_STATE)
+    return fit_rows, calibration_rows, guard_rows
+
+
+def train_incremental(csv_path, model_dir, out_dir=None, since=None, extra_trees=100, learning_rate=None,
+                      calibration_fraction=0.2, guard_fraction=0.2, guard_tolerance=0.05, threads=None,
+                      cache_dir=None, min_segment=30):
+    """
+    Appends trees fitted on the quarters after `since` (default: the
+    model's trained_through) to the booster in `model_dir` and writes the
+    updated artifacts to `out_dir`, unless the guard check fails: on a
+    held-out part of the new quarters and on the last trained quarter the
+    updated model's RMSE may not exceed the current model's by more than
+    `guard_tolerance`. Correction factors and intervals are recalibrated on
+    a separate part of the new quarters, so the guard rows only score the
+    update
+    """
+    started = time.perf_counter()
+    timings = {}
+    out_dir = out_dir or model_dir
+    threads = threads or os.cpu_count() or 1
+    memory = Memory(cache_dir, verbose=0)
+
+    stage = time.perf_counter()
+    frame = memory.cache(build_feature_frame)(csv_path, frame_key(csv_path))
+    periods = period_of(frame)
+    performance = read_json(os.path.join(model_dir, "performance_metrics.json")) or {}
+    since = since or performance.get("trained_through")
+    if not since:
+        raise ValueError(f"{model_dir} does not record trained_through, pass since")
+    new_rows = np.flatnonzero(periods > parse_period(since))
+    if len(new_rows) == 0:
+        return {"status": "up_to_date", "trained_through": since}
+    history = periods[periods <= parse_period(since)]
+    history_rows = np.flatnonzero(periods == history.max()) if len(history) else np.array([], dtype=int)
+    parts = split_new_rows(new_rows, calibration_fraction, guard_fraction)
+    if parts is None:
+        logger.warning(f"Only {len(new_rows)} rows after {since}, too few to fit, calibrate and guard an update")
+        return {"status": "too_few_rows", "since": since, "new_rows": len(new_rows)}
+    fit_rows, calibration_rows, guard_rows = parts
+    timings["features"] = time.perf_counter() - stage
+
+    with open(os.path.join(model_dir, "hdb_deployment_pipeline.pkl"), "rb") as f:
+        pipeline = pickle.load(f)
+    with open(os.path.join(model_dir, "hdb_feature_lists.pkl"), "rb") as f:
+        feature_lists = pickle.load(f)
+    features = feature_lists["all_features"]
+    store_path = os.path.join(model_dir, "feature_store.npz")
+    store = FeatureStore.restore(store_path) if os.path.exists(store_path) else None
+    if store is None and any(feature in STORE_FEATURES for feature in features):
+        raise ValueError(f"The model uses store features but {store_path} is missing")
+
+    def inputs(rows):
+        subset = frame.iloc[rows]
+        if store is not None:
+            subset = pd.concat([subset, store.transform(subset)], axis=1)
+        return subset[features], subset["resale_price"].to_numpy(dtype=float)
+
+    stage = time.perf_counter()
+    preprocessor = Pipeline(pipeline.steps[:-1])
+    step_name, model = pipeline.steps[-1]
+    X_fit, y_fit = inputs(fit_rows)
+    updated = Pipeline(pipeline.steps[:-1] + [
+        (step_name, warm_start(model, preprocessor.transform(X_fit), y_fit, extra_trees, threads, learning_rate))
+    ])
+    timings["fit"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    guard = {}
+    for name, rows in (("new", guard_rows), ("history", history_rows)):
+        if len(rows) == 0:
+            continue
+        X, y = inputs(rows)
+        guard[name] = {
+            "rows": len(rows),
+            "before": regression_metrics(y, pipeline.predict(X)),
+            "after": regression_metrics(y, updated.predict(X))
+        }
+    passed = all(
+        check["after"]["rmse"] <= check["before"]["rmse"] * (1 + guard_tolerance) for check in guard.values()
+    )
+    timings["guard"] = time.perf_counter() - stage
+
+    summary = {
+        "status": "updated" if passed else "rejected",
+        "since": since,
+        "trained_through": format_period(int(periods.max())),
+        "new_rows": len(new_rows),
+        "fit_rows": len(fit_rows),
+        "calibration_rows": len(calibration_rows),
+        "guard_rows": len(guard_rows),
+        "extra_trees": extra_trees,
+        "guard": guard
+    }
+    if not passed:
+        logger.warning(f"Incremental update rejected by the guard check: {guard}")
+        summary["timings"] = {name: round(seconds, 3) for name, seconds in timings.items()}
+        return summary
+
+    stage = time.perf_counter()
+    X_calibration, y_calibration = inputs(calibration_rows)
+    calibration_segments = frame.iloc[calibration_rows]
+    calibration_predicted = updated.predict(X_calibration)
+    fitted_factors, _ = fit_correction_factors(calibration_segments, y_calibration, calibration_predicted, min_segment)
+    correction_factors = merge_segments(read_json(os.path.join(model_dir, "correction_factors.json")), fitted_factors)
+    calibration_predicted = calibration_predicted * correction_multiplier(calibration_segments, correction_factors)
+    confidence_intervals = merge_segments(
+        read_json(os.path.join(model_dir, "confidence_intervals.json")),
+        fit_confidence_intervals(calibration_segments, y_calibration, calibration_predicted, min_segment)
+    )
+    # Recalibrate in the previous price bands; cells the calibration rows are too thin for keep their widths
+    previous_intervals = read_json(os.path.join(model_dir, "conformal_intervals.json"))
+    conformal_intervals = conformal.merge(previous_intervals, conformal.calibrate(
+        calibration_segments[INTERVAL_DIMENSIONS].reset_index(drop=True), calibration_predicted, y_calibration,
+        coverage=previous_intervals["coverage"] if previous_intervals else conformal.DEFAULT_COVERAGE,
+        min_rows=min_segment, band_edges=previous_intervals["band_edges"] if previous_intervals else None
+    ))
+
+    # Like train(), the metrics describe the served (corrected) predictions on rows nothing was fitted on
+    X_guard, y_guard = inputs(guard_rows)
+    guard_segments = frame.iloc[guard_rows]
+    guard_predicted = updated.predict(X_guard)
+    guard_corrected = guard_predicted * correction_multiplier(guard_segments, correction_factors)
+
+    os.makedirs(out_dir, exist_ok=True)
+    write_pickle(os.path.join(out_dir, "hdb_deployment_pipeline.pkl"), updated)
+    if os.path.abspath(out_dir) != os.path.abspath(model_dir):
+        shutil.copy(os.path.join(model_dir, "hdb_feature_lists.pkl"), os.path.join(out_dir, "hdb_feature_lists.pkl"))
+    write_json(os.path.join(out_dir, "correction_factors.json"), correction_factors)
+    write_json(os.path.join(out_dir, "confidence_intervals.json"), confidence_intervals)
+    write_json(os.path.join(out_dir, "conformal_intervals.json"), conformal_intervals)
+    write_json(os.path.join(out_dir, "town_to_region.json"), town_to_region(frame))
+    if store is not None:
+        store.update(frame.iloc[new_rows])
+        store.snapshot(os.path.join(out_dir, "feature_store.npz"))
+    performance.update(regression_metrics(y_guard, guard_corrected))
+    performance["uncorrected"] = regression_metrics(y_guard, guard_predicted)
+    performance["interval_coverage"] = conformal.ConformalIntervals(conformal_intervals).coverage_on(
+        guard_segments, guard_corrected, y_guard
+    )
+    performance.update(test_rows=len(guard_rows), trained_through=summary["trained_through"], incremental={
+        key: summary[key] for key in ("since", "new_rows", "fit_rows", "calibration_rows", "guard_rows", "extra_trees")
+    })
+    write_json(os.path.join(out_dir, "performance_metrics.json"), performance)
+    timings["artifacts"] = time.perf_counter() - stage
+    timings["total"] = time.perf_counter() - started
+
+    summary["timings"] = {name: round(seconds, 3) for name, seconds in timings.items()}
+    write_json(os.path.join(out_dir, "training_timings.json"), summary)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the HDB valuation model and write the serving artifacts")
+    parser.add_argument("data", help="Enriched transactions CSV")
+    parser.add_argument("out", help="Artifact directory (e.g. property-valuation-folder/backend/ml/hdb or a registry version)")
+    parser.add_argument("--feature-set", choices=sorted(FEATURE_SETS), default="alternative")
+    parser.add_argument("--grid", default=None, help="JSON file of {model: {param: [values]}} to search instead of the default")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None, help="Parallel fits (default: cores / threads per model)")
+    parser.add_argument("--threads-per-model", type=int, default=THREADS_PER_MODEL)
+    parser.add_argument("--cache-dir", default=os.path.join("data", ".train_cache"))
+    parser.add_argument("--min-segment", type=int, default=30, help="Smallest segment that gets its own factor or interval")
+    parser.add_argument("--coverage", type=float, default=conformal.DEFAULT_COVERAGE,
+                        help="Target coverage of the conformal intervals")
+    parser.add_argument("--until", default=None, help="Train on quarters up to this one only (e.g. 2024-Q4)")
+    parser.add_argument("--incremental", action="store_true", help="Add trees for new quarters to an existing model")
+    parser.add_argument("--model-dir", default=None, help="Model to update with --incremental (default: out)")
+    parser.add_argument("--since", default=None, help="Last quarter the model was trained on (default: from its metrics)")
+    parser.add_argument("--extra-trees", type=int, default=100)
+    parser.add_argument("--learning-rate", type=float, default=None, help="Learning rate of the added boosting rounds")
+    parser.add_argument("--calibration-fraction", type=float, default=0.2,
+                        help="Share of new rows the correction factors and intervals are recalibrated on")
+    parser.add_argument("--guard-fraction", type=float, default=0.2, help="Share of new rows held out for the guard check")
+    parser.add_argument("--guard-tolerance", type=float, default=0.05, help="Allowed relative RMSE increase")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.incremental:
+        summary = train_incremental(
+            args.data, args.model_dir or args.out, out_dir=args.out, since=args.since, extra_trees=args.extra_trees,
+            learning_rate=args.learning_rate, calibration_fraction=args.calibration_fraction,
+            guard_fraction=args.guard_fraction, guard_tolerance=args.guard_tolerance,
+            threads=args.threads_per_model, cache_dir=args.cache_dir, min_segment=args.min_segment
+        )
+        print(json.dumps(summary, indent=2))
+        if summary["status"] == "rejected":
+            sys.exit(1)
+        return
+
+    grid = None
+    if args.grid:
+        with open(args.grid, "r") as f:
+            grid = json.load(f)
+
+    summary = train(
+        args.data, args.out, feature_set=args.feature_set, grid=grid, folds=args.folds, workers=args.workers,
+        threads_per_model=args.threads_per_model, cache_dir=args.cache_dir, min_segment=args.min_segment,
+        until=args.until, coverage=args.coverage
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
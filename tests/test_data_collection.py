@@ -0,0 +1,179 @@
+"""
+Runs the ingestion pipeline against a local stand-in for the data.gov.sg
+datastore API.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import data_collection
+
+SERVER_PAGE_LIMIT = 5
+
+
+class StandInDatastore:
+    """Serves `records` per month in _id order, capping pages like the real API, and logs every request."""
+
+    def __init__(self):
+        self.records = {}
+        self.failures = {}
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def add(self, month, count):
+        with self.lock:
+            rows = self.records.setdefault(month, [])
+            start = sum(len(month_rows) for month_rows in self.records.values()) + 1
+            for i in range(count):
+                rows.append({
+                    "_id": start + i,
+                    "month": month,
+                    "town": "BEDOK",
+                    "flat_type": "4 ROOM",
+                    "floor_area_sqm": "92",
+                    "resale_price": str(500000 + start + i)
+                })
+
+    def fail(self, month, *statuses):
+        self.failures[month] = list(statuses)
+
+    def respond(self, query):
+        month = json.loads(query["filters"][0])["month"]
+        offset, limit = int(query["offset"][0]), min(int(query["limit"][0]), SERVER_PAGE_LIMIT)
+        with self.lock:
+            self.requests.append((month, offset))
+            if self.failures.get(month):
+                return self.failures[month].pop(0), {"success": False}
+            rows = self.records.get(month, [])
+            return 200, {"success": True, "result": {"records": rows[offset:offset + limit], "total": len(rows)}}
+
+    def requested(self, month):
+        return [offset for requested_month, offset in self.requests if requested_month == month]
+
+
+@pytest.fixture
+def datastore():
+    store = StandInDatastore()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            assert url.path == data_collection.DATASTORE_PATH
+            status, body = store.respond(parse_qs(url.query))
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            if status != 200:
+                self.send_header("Retry-After", "0")
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    store.url = f"http://127.0.0.1:{server.server_port}"
+    yield store
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fast_paging(monkeypatch):
+    monkeypatch.setattr(data_collection, "PAGE_SIZE", SERVER_PAGE_LIMIT)
+    monkeypatch.setattr(data_collection, "BACKOFF_SECONDS", 0.001)
+
+
+def quarter_months():
+    """The first month of the current quarter and of a quarter two years back, which is closed."""
+    today = datetime.now()
+    quarter = (today.month - 1) // 3 + 1
+    current = f"{today.year}-{data_collection.QUARTER_MONTHS[quarter][0]}"
+    closed = f"{today.year - 2}-01"
+    return today.year - 2, current, closed
+
+
+def partition_of(month):
+    year, month_number = int(month[:4]), int(month[5:])
+    return year, (month_number - 1) // 3 + 1
+
+
+def run(datastore, out_dir, start_year):
+    return data_collection.ingest(
+        str(out_dir), start_year, workers=4, base_url=datastore.url, file_format="csv", refresh_quarters=1
+    )
+
+
+def ingested_ids(out_dir):
+    return data_collection.load_partitions(str(out_dir))["_id"].tolist()
+
+
+def test_pages_through_months_and_retries_throttling(datastore, tmp_path):
+    start_year, current, closed = quarter_months()
+    datastore.add(closed, 12)
+    datastore.add(current, 3)
+    datastore.fail(closed, 429, 503)
+
+    summary = run(datastore, tmp_path, start_year)
+
+    assert summary["failed"] == {}
+    assert summary["new_rows"] == 15
+    assert sorted(ingested_ids(tmp_path)) == list(range(1, 16))
+    # Two throttled attempts, then pages at offsets 0, 5 and 10
+    assert datastore.requested(closed) == [0, 0, 0, 5, 10]
+
+
+def test_rerun_fetches_only_new_records_and_skips_closed_partitions(datastore, tmp_path):
+    start_year, current, closed = quarter_months()
+    datastore.add(closed, 7)
+    datastore.add(current, 6)
+    run(datastore, tmp_path, start_year)
+    datastore.requests.clear()
+
+    datastore.add(current, 4)
+    summary = run(datastore, tmp_path, start_year)
+
+    assert summary["new_rows"] == 4
+    assert datastore.requested(closed) == []
+    assert datastore.requested(current) == [6]
+    ids = ingested_ids(tmp_path)
+    assert len(ids) == len(set(ids)) == 17
+    # The new rows land in a second part file next to the first run's
+    parts = data_collection.partition_files(data_collection.partition_dir(str(tmp_path), *partition_of(current)))
+    assert len(parts) == 2
+
+
+def test_rows_already_on_disk_are_dropped_by_id(datastore, tmp_path):
+    start_year, current, closed = quarter_months()
+    datastore.add(current, 8)
+    run(datastore, tmp_path, start_year)
+
+    # Without the state file every month is fetched from offset 0 again
+    os.remove(os.path.join(tmp_path, data_collection.STATE_FILE))
+    datastore.add(current, 2)
+    summary = run(datastore, tmp_path, start_year)
+
+    assert summary["new_rows"] == 2
+    assert sorted(ingested_ids(tmp_path)) == list(range(1, 11))
+
+
+def test_gives_up_after_max_retries(datastore, tmp_path, monkeypatch):
+    monkeypatch.setattr(data_collection, "MAX_RETRIES", 2)
+    start_year, current, closed = quarter_months()
+    datastore.add(current, 3)
+    datastore.fail(current, 503, 503, 503)
+
+    summary = run(datastore, tmp_path, start_year)
+
+    assert list(summary["failed"]) == [data_collection.partition_key(*partition_of(current))]
+    assert datastore.requested(current) == [0, 0, 0]
+    state = data_collection.load_state(str(tmp_path), data_collection.RESOURCE_ID)
+    assert data_collection.partition_key(*partition_of(current)) not in state["partitions"]
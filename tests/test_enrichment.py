@@ -0,0 +1,127 @@
+"""
+Runs the enrichment step against a local stand-in for the OneMap search API.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+import enrichment
+
+LOCATIONS = {
+    "101 BEDOK NTH AVE 4 SINGAPORE": (1.3330, 103.9400),
+    "202 TAMPINES ST 21 SINGAPORE": (1.3530, 103.9520)
+}
+
+
+class StandInOneMap:
+    """Answers searches from LOCATIONS, failing addresses listed in `down` with HTTP 503."""
+
+    def __init__(self):
+        self.down = set()
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def respond(self, query):
+        search = query["searchVal"][0]
+        with self.lock:
+            self.requests.append(search)
+        if search in self.down:
+            return 503, {}
+        if search not in LOCATIONS:
+            return 200, {"found": 0, "results": []}
+        lat, lon = LOCATIONS[search]
+        return 200, {"found": 1, "results": [{"LATITUDE": str(lat), "LONGITUDE": str(lon), "ADDRESS": search, "POSTAL": "460101"}]}
+
+
+@pytest.fixture
+def onemap(monkeypatch):
+    monkeypatch.setattr(enrichment, "GEOCODE_MAX_RETRIES", 1)
+    monkeypatch.setattr(enrichment, "GEOCODE_BACKOFF_SECONDS", 0.001)
+    service = StandInOneMap()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, body = service.respond(parse_qs(urlparse(self.path).query))
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    service.url = f"http://127.0.0.1:{server.server_port}/api/common/elastic/search"
+    yield service
+    server.shutdown()
+    server.server_close()
+
+
+def write_transactions(path, addresses):
+    pd.DataFrame([
+        {
+            "_id": i + 1,
+            "month": "2024-01",
+            "town": "BEDOK",
+            "flat_type": "4 ROOM",
+            "block": block,
+            "street_name": street,
+            "storey_range": "04 TO 06",
+            "floor_area_sqm": 92,
+            "flat_model": "Model A",
+            "lease_commence_date": 1985,
+            "resale_price": 500000 + i
+        }
+        for i, (block, street) in enumerate(addresses)
+    ]).to_csv(path, index=False)
+
+
+def run(onemap, tmp_path):
+    return enrichment.enrich(
+        str(tmp_path / "transactions.csv"), str(tmp_path / "enriched.csv"), str(tmp_path / "cache.sqlite"),
+        workers=2, onemap_url=onemap.url
+    )
+
+
+def test_failed_lookups_are_deferred_and_retried(onemap, tmp_path):
+    write_transactions(tmp_path / "transactions.csv", [
+        ("101", "BEDOK NTH AVE 4"), ("202", "TAMPINES ST 21"), ("202", "TAMPINES ST 21"), ("9", "NOWHERE RD")
+    ])
+    onemap.down.add("202 TAMPINES ST 21 SINGAPORE")
+
+    summary = run(onemap, tmp_path)
+
+    assert summary["deferred_rows"] == 2
+    # An address OneMap does not know is cached as unresolved and written without coordinates
+    enriched = pd.read_csv(tmp_path / "enriched.csv")
+    assert sorted(enriched["_id"]) == [1, 4]
+    assert enriched.set_index("_id")["latitude"].isna().to_dict() == {1: False, 4: True}
+
+    onemap.down.clear()
+    onemap.requests.clear()
+    summary = run(onemap, tmp_path)
+
+    assert summary["deferred_rows"] == 0
+    assert summary["new_rows"] == 2
+    assert onemap.requests == ["202 TAMPINES ST 21 SINGAPORE"]
+    enriched = pd.read_csv(tmp_path / "enriched.csv")
+    assert sorted(enriched["_id"]) == [1, 2, 3, 4]
+    assert enriched.set_index("_id").loc[[2, 3], "latitude"].tolist() == [1.3530, 1.3530]
+
+
+def test_request_errors_are_not_cached_as_unresolved(onemap, tmp_path, monkeypatch):
+    write_transactions(tmp_path / "transactions.csv", [("101", "BEDOK NTH AVE 4")])
+    monkeypatch.setattr(StandInOneMap, "respond", lambda self, query: (403, {"error": "forbidden"}))
+
+    summary = run(onemap, tmp_path)
+
+    assert summary["deferred_rows"] == 1
+    assert summary["cached_addresses"] == 0
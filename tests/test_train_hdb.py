@@ -0,0 +1,45 @@
+"""
+Checks how incremental updates divide the new quarters.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import train_hdb
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "hdb_resale_data_onemap_enriched.csv")
+
+
+def test_new_rows_are_split_into_disjoint_parts():
+    new_rows = np.arange(100, 150)
+
+    fit_rows, calibration_rows, guard_rows = train_hdb.split_new_rows(new_rows, 0.2, 0.2)
+
+    assert (len(fit_rows), len(calibration_rows), len(guard_rows)) == (30, 10, 10)
+    assert sorted(np.concatenate([fit_rows, calibration_rows, guard_rows])) == list(new_rows)
+
+
+def test_small_slices_keep_every_part_populated():
+    parts = train_hdb.split_new_rows(np.arange(6), 0.2, 0.2)
+
+    assert [len(rows) for rows in parts] == [train_hdb.MIN_INCREMENTAL_PART_ROWS] * 3
+    assert train_hdb.split_new_rows(np.arange(5), 0.2, 0.2) is None
+
+
+def test_too_few_new_rows_leave_the_model_alone(tmp_path):
+    frame = pd.read_csv(DATA_PATH)
+    latest = frame[["data_year", "data_quarter"]].drop_duplicates().sort_values(["data_year", "data_quarter"]).iloc[-1]
+    in_latest = (frame["data_year"] == latest["data_year"]) & (frame["data_quarter"] == latest["data_quarter"])
+    csv_path = tmp_path / "transactions.csv"
+    pd.concat([frame[~in_latest], frame[in_latest].head(3)]).to_csv(csv_path, index=False)
+    model_dir = tmp_path / "model"
+    model_dir.mkdir()
+    previous = train_hdb.format_period(int(train_hdb.period_of(frame[~in_latest]).max()))
+    (model_dir / "performance_metrics.json").write_text(json.dumps({"trained_through": previous}))
+
+    summary = train_hdb.train_incremental(str(csv_path), str(model_dir))
+
+    assert summary == {"status": "too_few_rows", "since": previous, "new_rows": 3}
+    assert os.listdir(model_dir) == ["performance_metrics.json"]